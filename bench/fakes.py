@@ -0,0 +1,185 @@
+"""Just enough of discord.py's Context/Interaction/Message surface to drive cog callbacks."""
+import itertools
+import time
+
+from core.router import MessageRouter
+
+_ids = itertools.count(1_000_000_000_000_000_000)
+
+# Anything sent containing one of these is counted as a failed invocation
+ERROR_MARKERS = (
+    "❌", "error occured", "error occurred", "failed", "check logs", "error:",
+    "beatmap found!",  # the osu! fallback embed, shown when the API lookup failed
+)
+
+
+def _payload_text(content=None, embed=None, embeds=None, **kwargs):
+    parts = [str(content or "")]
+    for e in ([embed] if embed else []) + list(embeds or []):
+        parts.append(f"{e.title or ''} {e.description or ''}")
+        parts.extend(f"{field.name} {field.value}" for field in e.fields)
+    return " ".join(parts)
+
+
+class FakeUser:
+    def __init__(self, name="bench-user"):
+        self.id = next(_ids)
+        self.name = name
+        self.display_name = name
+        self.avatar = None
+        self.bot = False
+        self.mention = f"<@{self.id}>"
+
+    def __eq__(self, other):
+        return isinstance(other, FakeUser) and other.id == self.id
+
+    def __hash__(self):
+        return hash(self.id)
+
+
+class Recorder:
+    """Keeps what a command sent and when it first responded"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.first_response = None
+        self.sent = []
+
+    def record(self, **payload):
+        if self.first_response is None:
+            self.first_response = time.perf_counter()
+        self.sent.append(_payload_text(**payload))
+
+    @property
+    def failed(self):
+        text = " ".join(self.sent).lower()
+        return any(marker in text for marker in ERROR_MARKERS)
+
+
+class FakeChannel:
+    def __init__(self, recorder: Recorder):
+        self.id = next(_ids)
+        self.recorder = recorder
+
+    async def send(self, content=None, **kwargs):
+        self.recorder.record(content=content, **kwargs)
+        return FakeMessage("", FakeUser(), self)
+
+
+class FakeMessage:
+    def __init__(self, content: str, author: FakeUser, channel: FakeChannel):
+        self.id = next(_ids)
+        self.content = content
+        self.author = author
+        self.channel = channel
+        self.guild = None
+        self.jump_url = f"https://discord.com/channels/@me/{channel.id}/{self.id}"
+
+    async def reply(self, content=None, **kwargs):
+        return await self.channel.send(content, **kwargs)
+
+    async def edit(self, **kwargs):
+        if "embed" in kwargs or "content" in kwargs:
+            self.channel.recorder.record(**{k: v for k, v in kwargs.items() if k in ("content", "embed", "embeds")})
+        return self
+
+    async def delete(self):
+        pass
+
+
+class FakeContext:
+    """Stands in for commands.Context when calling a hybrid command's callback"""
+
+    def __init__(self, author: FakeUser = None):
+        self.recorder = Recorder()
+        self.author = author or FakeUser()
+        self.channel = FakeChannel(self.recorder)
+        self.message = FakeMessage("", self.author, self.channel)
+        self.guild = None
+        self.prefix = "nt!"
+        self.interaction = None
+        self.command = None
+
+    async def defer(self, *, ephemeral=False):
+        pass
+
+    async def send(self, content=None, **kwargs):
+        return await self.channel.send(content, **kwargs)
+
+    async def reply(self, content=None, **kwargs):
+        return await self.channel.send(content, **kwargs)
+
+
+class FakeResponse:
+    def __init__(self, interaction):
+        self._interaction = interaction
+        self._done = False
+
+    def is_done(self):
+        return self._done
+
+    async def defer(self, *, ephemeral=False, thinking=False):
+        self._done = True
+
+    async def send_message(self, content=None, **kwargs):
+        self._done = True
+        self._interaction.recorder.record(content=content, **kwargs)
+
+    async def edit_message(self, **kwargs):
+        self._done = True
+        self._interaction.recorder.record(**{k: v for k, v in kwargs.items() if k in ("content", "embed", "embeds")})
+
+    async def send_modal(self, modal):
+        self._done = True
+
+    async def autocomplete(self, choices):
+        self._done = True
+        self._interaction.recorder.record(content=" ".join(c.name for c in choices))
+
+
+class FakeFollowup:
+    def __init__(self, interaction):
+        self._interaction = interaction
+
+    async def send(self, content=None, **kwargs):
+        self._interaction.recorder.record(content=content, **kwargs)
+        return self._interaction.message
+
+
+class FakeInteraction:
+    """Stands in for discord.Interaction when calling an app command's callback"""
+
+    def __init__(self, user: FakeUser = None):
+        self.recorder = Recorder()
+        self.id = next(_ids)
+        self.token = f"bench-{self.id}"
+        self.user = user or FakeUser()
+        self.guild = None
+        self.guild_id = None
+        self.channel = FakeChannel(self.recorder)
+        self.channel_id = self.channel.id
+        self.message = FakeMessage("", self.user, self.channel)
+        self.command = None
+        self.namespace = None
+        self.response = FakeResponse(self)
+        self.followup = FakeFollowup(self)
+
+    async def original_response(self):
+        return self.message
+
+    async def edit_original_response(self, **kwargs):
+        return await self.message.edit(**kwargs)
+
+
+class FakeBot:
+    """The attributes of commands.Bot the cogs actually touch"""
+
+    def __init__(self, http_session):
+        self.http_session = http_session
+        self.router = MessageRouter(self)
+        self.user = FakeUser("nyoetools")
+        self.latency = 0.042
+        self.guilds = []
+
+    def dispatch(self, event, *args, **kwargs):
+        pass
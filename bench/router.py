@@ -0,0 +1,119 @@
+"""
+Micro-benchmark of on_message link matching: the per-cog regex chains the bot used
+to run on every message against core.router's prefilter and combined pattern.
+
+    python -m bench.router --messages 20000 --link-rate 0.05
+"""
+import argparse
+import random
+import re
+import string
+import time
+
+from core.router import MessageRouter
+
+# What Utils.on_message and OsuBeatmapConverter.on_message searched, in order
+LEGACY_PATTERNS = [
+    re.compile(r"(https://(www.)?(twitter|x)\.com/[a-zA-Z0-9_]+/status/[0-9]+)"),
+    re.compile(r"(https://(www.)?(pixiv)\.net/en/artworks/[0-9]+)"),
+    re.compile(r"(https://(www.)?(reddit)\.com/r/[^/]+/(?:comments|s)/[a-zA-Z0-9]+/?)"),
+    re.compile(r"https?:\/\/(www\.)?instagram\.com\/(p\/[a-zA-Z0-9_-]+|reel\/[a-zA-Z0-9_-]+|[a-zA-Z0-9._-]+)\/?(\?[^\s]*)?"),
+    re.compile(r"https?:\/\/bsky\.app\/[^\s]+"),
+    re.compile(r"^.*https:\/\/(?:m|www|vm)?\.?tiktok\.com\/((?:.*\b(?:(?:usr|v|embed|user|video)\/|\?shareId=|\&item_id=)(\d+))|\w+)\/.*"),
+]
+LEGACY_OSU = re.compile(r'(?:beatmapsets|b)/(\d+)')
+
+LINKS = [
+    "https://x.com/someone/status/1790000000000000000",
+    "https://www.pixiv.net/en/artworks/118000000",
+    "https://www.reddit.com/r/osugame/comments/1abcde/",
+    "https://www.instagram.com/reel/C7abcdEFgh/",
+    "https://bsky.app/profile/someone.bsky.social/post/3kabc",
+    "https://vm.tiktok.com/ZMabcdEf/",
+    "https://osu.ppy.sh/beatmapsets/39804",
+    "https://osu.ppy.sh/b/129891",
+    "https://github.com/nyoemii/nyoetools/pull/12",
+    "https://tenor.com/view/cat-dance-gif-1234567",
+]
+
+
+def legacy_match(content):
+    """The old two listeners: the utils elif chain, then the osu search"""
+    found = {}
+    stripped = content.strip("<>")
+    for index, pattern in enumerate(LEGACY_PATTERNS):
+        match = pattern.search(stripped if index < 2 else content)
+        if match:
+            found["embed"] = match.group(0)
+            break
+    if LEGACY_OSU.search(content):
+        found["osu"] = LEGACY_OSU.findall(content)
+    return found
+
+
+def corpus(count, link_rate, seed=1):
+    """
+    Messages with the shape of real chat: mostly a few words (median around 40
+    characters), a long tail up to Discord's 2000 character limit, a few links
+    """
+    rng = random.Random(seed)
+    words = ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(1, 9))) for _ in range(500)]
+    words += ["lol", "fc", "pp", "gg", "1.5x", "<:kek:123>", ":3", "?"]
+    messages = []
+    for _ in range(count):
+        length = min(2000, int(rng.lognormvariate(3.7, 1.0)))
+        parts, size = [], 0
+        while size < length:
+            word = rng.choice(words)
+            parts.append(word)
+            size += len(word) + 1
+        if rng.random() < link_rate:
+            parts.insert(rng.randint(0, len(parts)), rng.choice(LINKS))
+        messages.append(" ".join(parts))
+    return messages
+
+
+def timed(function, messages, rounds):
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for content in messages:
+            function(content)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=20000, help="messages in the corpus")
+    parser.add_argument("--link-rate", type=float, default=0.05, help="fraction of messages with a link")
+    parser.add_argument("--rounds", type=int, default=5, help="best of this many passes")
+    args = parser.parse_args()
+
+    # Imported late, the cogs pull in their dependencies
+    from cogs.osu import BEATMAP_LINK
+    from cogs.utils import EMBED_FIXES
+
+    router = MessageRouter(None)
+    for name, pattern, _ in EMBED_FIXES:
+        router.register(name, pattern, None, group="embed_fix", starts="h")
+    router.register("osu_beatmap", BEATMAP_LINK.pattern, None, starts="b")
+
+    messages = corpus(args.messages, args.link_rate)
+    lengths = sorted(len(m) for m in messages)
+    print(f"{len(messages)} messages, median {lengths[len(lengths) // 2]} chars, "
+          f"p99 {lengths[int(len(lengths) * 0.99)]} chars, {args.link_rate:.0%} with a link")
+
+    # Both have to agree on which messages get handled
+    for content in messages:
+        assert bool(legacy_match(content)) == bool(router.match(content)), content
+
+    legacy = timed(legacy_match, messages, args.rounds)
+    routed = timed(router.match, messages, args.rounds)
+    per = lambda seconds: f"{seconds / len(messages) * 1e6:6.2f}µs/message"
+    print(f"legacy   {per(legacy)}")
+    print(f"router   {per(routed)}  ({legacy / routed:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+"""
+Drive the cogs against local fake upstreams at a controlled concurrency and
+report throughput and tail latency per command.
+
+    python -m bench.run --requests 200 --concurrency 20 --latency-ms 50
+    python -m bench.run --commands train,beatmap --set db.latency_ms=300 --set osu.error_rate=0.1
+"""
+import argparse
+import asyncio
+import importlib
+import itertools
+import logging
+import math
+import os
+import statistics
+import tempfile
+import time
+
+from bench import servers
+from bench.fakes import FakeBot, FakeChannel, FakeContext, FakeInteraction, FakeMessage, FakeUser
+
+
+def scenario(cogs):
+    """command name -> (coroutine factory taking a fresh fake, fake class)"""
+    db, fun, utils, osu = cogs["db"], cogs["fun"], cogs["utils"], cogs["osu"]
+
+    def beatmap(ctx):
+        message = FakeMessage("check this map https://osu.ppy.sh/beatmapsets/39804", FakeUser(), ctx.channel)
+        return osu.bot.router.dispatch(message)
+
+    # A pasted mappack: 15 sets, a few of them twice, plus 6 single difficulty links (two of the same set)
+    mappack_links = [f"https://osu.ppy.sh/beatmapsets/{39800 + i}" for i in range(15)]
+    mappack_links += mappack_links[:4] + [f"https://osu.ppy.sh/b/{129890 + i}" for i in range(6)]
+
+    def mappack(ctx):
+        message = FakeMessage("\n".join(mappack_links), FakeUser(), ctx.channel)
+        return osu.bot.router.dispatch(message)
+
+    # A busy osu! channel: everyone keeps linking the same handful of maps
+    busy_channel = FakeChannel(None)
+    turns = itertools.count()
+
+    def osubusy(ctx):
+        channel = FakeChannel(ctx.recorder)
+        channel.id = busy_channel.id
+        link = f"https://osu.ppy.sh/beatmapsets/{39800 + next(turns) % 5}"
+        return osu.bot.router.dispatch(FakeMessage(f"have you played {link}", FakeUser(), channel))
+
+    return {
+        "train": (lambda i: db.train.callback(db, i, "München Hbf", "Berlin Hbf"), FakeInteraction),
+        "trainwindow": (lambda i: db.train.callback(db, i, "München Hbf", "Berlin Hbf", within=3, sort_by="duration"), FakeInteraction),
+        "departures": (lambda i: db.departures.callback(db, i, "München Hbf"), FakeInteraction),
+        "currency": (lambda c: fun.currency.callback(fun, c, 10, "EUR", "USD"), FakeContext),
+        "github": (lambda c: utils.github.callback(utils, c, "nyoetools", "nyoemii", "main"), FakeContext),
+        "ghcode": (lambda c: utils.ghcode.callback(utils, c, "nyoetools", "nyoemii"), FakeContext),
+        "mcname": (lambda c: utils.mcname.callback(utils, c, "Notch"), FakeContext),
+        "urban": (lambda c: utils.urban.callback(utils, c, "yeet"), FakeContext),
+        "httpcat": (lambda c: utils.httpcat.callback(utils, c, 418), FakeContext),
+        "beatmap": (beatmap, FakeContext),
+        "mappack": (mappack, FakeContext),
+        "osubusy": (osubusy, FakeContext),
+        "pp": (lambda c: osu.pp.callback(osu, c, "https://osu.ppy.sh/beatmapsets/43263#osu/129891", "HDDT", 98.5, 1), FakeContext),
+    }
+
+
+class Result:
+    def __init__(self, command):
+        self.command = command
+        self.latencies = []
+        self.first_responses = []
+        self.errors = 0
+        self.wall_time = 0.0
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    # nearest-rank
+    return values[max(0, math.ceil(p / 100 * len(values)) - 1)]
+
+
+async def drive(command, factory, fake_cls, requests, concurrency):
+    result = Result(command)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            fake = fake_cls()
+            start = fake.recorder.started = time.perf_counter()
+            try:
+                await factory(fake)
+            except Exception:
+                result.errors += 1
+            else:
+                if fake.recorder.failed:
+                    result.errors += 1
+            end = time.perf_counter()
+            result.latencies.append(end - start)
+            if fake.recorder.first_response is not None:
+                result.first_responses.append(fake.recorder.first_response - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    result.wall_time = time.perf_counter() - start
+    return result
+
+
+def report(results):
+    header = f"{'command':<10} {'n':>5} {'err':>5} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8} {'ttfr p50':>9}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        ms = lambda v: f"{v * 1000:6.1f}ms"
+        print(
+            f"{r.command:<10} {len(r.latencies):>5} {r.errors:>5} {len(r.latencies) / r.wall_time:>8.1f} "
+            f"{ms(percentile(r.latencies, 50)):>8} {ms(percentile(r.latencies, 95)):>8} "
+            f"{ms(percentile(r.latencies, 99)):>8} {ms(max(r.latencies, default=0)):>8} "
+            f"{ms(statistics.median(r.first_responses) if r.first_responses else 0):>9}"
+        )
+
+
+def parse_behaviours(args):
+    behaviours = {
+        name: servers.Behaviour(
+            latency=args.latency_ms / 1000, jitter=args.jitter_ms / 1000, error_rate=args.error_rate
+        )
+        for name in servers.UPSTREAMS
+    }
+    for override in args.set:
+        target, _, value = override.partition("=")
+        name, _, field = target.partition(".")
+        if name not in behaviours or field not in ("latency_ms", "jitter_ms", "error_rate", "error_status"):
+            raise SystemExit(f"Invalid --set {override!r}, expected <upstream>.<latency_ms|jitter_ms|error_rate|error_status>=<value>")
+        behaviour = behaviours[name]
+        if field == "latency_ms":
+            behaviour.latency = float(value) / 1000
+        elif field == "jitter_ms":
+            behaviour.jitter = float(value) / 1000
+        elif field == "error_status":
+            behaviour.error_status = int(value)
+        else:
+            behaviour.error_rate = float(value)
+    return behaviours
+
+
+async def main(args):
+    upstreams = servers.FakeUpstreams(parse_behaviours(args))
+    urls = await upstreams.start()
+
+    # The cogs read their upstream URLs at import time, so they're imported only now
+    os.environ.update(urls)
+    os.environ.setdefault("OSU_CLIENT_ID", "bench")
+    os.environ.setdefault("OSU_CLIENT_SECRET", "bench")
+    # Start every run cold unless a cache file is given on purpose
+    scratch = tempfile.TemporaryDirectory()
+    os.environ.setdefault("OSU_CACHE_FILE", os.path.join(scratch.name, "osu_cache.sqlite3"))
+    os.environ.setdefault("OSU_TOKEN_FILE", os.path.join(scratch.name, "osu_token"))
+    os.environ.setdefault("OSU_BEATMAP_DIR", os.path.join(scratch.name, "osu_beatmaps"))
+    # The fake osu! API has no quota, pass OSU_RATE_LIMIT=60 to bench against the real one's
+    os.environ.setdefault("OSU_RATE_LIMIT", "100000")
+    os.environ.setdefault("OSU_RATE_BURST", "1000")
+    from core import cache, http, singleflight
+
+    modules = {name: importlib.import_module(f"cogs.{name}") for name in ("db", "fun", "utils", "osu")}
+
+    async with http.create_session() as session:
+        bot = FakeBot(session)
+        cogs = {
+            "db": modules["db"].DeutscheBahn(bot),
+            "fun": modules["fun"].Fun(bot),
+            "utils": modules["utils"].Utils(bot),
+            "osu": modules["osu"].OsuBeatmapConverter(bot),
+        }
+        for cog in cogs.values():
+            await cog.cog_load()
+
+        scenarios = scenario(cogs)
+        selected = args.commands.split(",") if args.commands else list(scenarios)
+        unknown = [c for c in selected if c not in scenarios]
+        if unknown:
+            raise SystemExit(f"Unknown command(s): {', '.join(unknown)}. Available: {', '.join(scenarios)}")
+
+        # Silence the cogs' own error logging so it doesn't skew the numbers
+        logging.disable(logging.CRITICAL)
+        try:
+            results = []
+            for command in selected:
+                factory, fake_cls = scenarios[command]
+                results.append(await drive(command, factory, fake_cls, args.requests, args.concurrency))
+        finally:
+            logging.disable(logging.NOTSET)
+
+        for cog in cogs.values():
+            await cog.cog_unload()
+
+    await upstreams.stop()
+
+    print(f"{args.requests} requests per command, concurrency {args.concurrency}, "
+          f"upstream latency {args.latency_ms:.0f}±{args.jitter_ms:.0f}ms, error rate {args.error_rate:.0%}")
+    report(results)
+    print("upstream requests: " + ", ".join(f"{name}={b.requests}" for name, b in upstreams.behaviours.items()))
+    print("coalesced: " + ", ".join(
+        f"{name}={group.hits}/{group.hits + group.misses}" for name, group in sorted(singleflight.groups.items())
+    ))
+    print("cache hits: " + ", ".join(
+        f"{name}={entry.hits}/{entry.hits + entry.misses}" for name, entry in sorted(cache.caches.items())
+    ))
+    scratch.cleanup()
+
+
+def cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--commands", help="comma separated commands to run (default: all)")
+    parser.add_argument("--requests", type=int, default=100, help="invocations per command")
+    parser.add_argument("--concurrency", type=int, default=10, help="invocations in flight at once")
+    parser.add_argument("--latency-ms", type=float, default=50, help="base upstream latency")
+    parser.add_argument("--jitter-ms", type=float, default=20, help="random extra upstream latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of upstream requests that fail")
+    parser.add_argument("--set", action="append", default=[], metavar="UPSTREAM.FIELD=VALUE",
+                        help="per-upstream override, e.g. db.latency_ms=300 or osu.error_status=429")
+    asyncio.run(main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    cli()
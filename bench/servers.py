@@ -0,0 +1,271 @@
+"""Local stand-ins for every upstream API the cogs talk to, serving recorded fixtures."""
+import asyncio
+import copy
+import json
+import pathlib
+import random
+from datetime import datetime, timedelta
+
+from aiohttp import web
+
+FIXTURES = pathlib.Path(__file__).parent / "fixtures"
+
+# 1x1 transparent PNG, enough for http.cat
+PNG = bytes.fromhex(
+    "89504e470d0a1a0a0000000d4948445200000001000000010806000000"
+    "1f15c4890000000d49444154789c6360000002000100e221bc330000000049454e44ae426082"
+)
+
+
+def fixture(name: str):
+    with open(FIXTURES / f"{name}.json", encoding="utf-8") as f:
+        return json.load(f)
+
+
+class Behaviour:
+    """Latency and error injection for one fake upstream"""
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0, error_status: int = 500):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.requests = 0
+
+
+def _middleware(behaviour: Behaviour):
+    @web.middleware
+    async def inject(request, handler):
+        behaviour.requests += 1
+        delay = behaviour.latency + random.uniform(0, behaviour.jitter)
+        if delay:
+            await asyncio.sleep(delay)
+        if behaviour.error_rate and random.random() < behaviour.error_rate:
+            headers = {"Retry-After": "1"} if behaviour.error_status == 429 else None
+            return web.json_response({"error": "injected"}, status=behaviour.error_status, headers=headers)
+        return await handler(request)
+
+    return inject
+
+
+TIME_FIELDS = ("departure", "plannedDeparture", "arrival", "plannedArrival")
+
+
+def shift_journeys(journeys: list, departure: datetime) -> list:
+    """Move the recorded journeys so the first one leaves a few minutes after the requested departure"""
+    first = datetime.fromisoformat(journeys[0]["legs"][0]["departure"])
+    if departure.tzinfo is None:
+        departure = departure.astimezone()
+    offset = departure - first
+    shifted = copy.deepcopy(journeys)
+    for journey in shifted:
+        for leg in journey["legs"]:
+            for field in TIME_FIELDS:
+                if leg.get(field):
+                    leg[field] = (datetime.fromisoformat(leg[field]) + offset).isoformat()
+    return shifted
+
+
+def db_routes(app):
+    locations = fixture("db_locations")
+    journeys = fixture("db_journeys")
+    departures = fixture("db_departures")
+
+    async def get_locations(request):
+        return web.json_response(locations[: int(request.query.get("results", 10))])
+
+    async def get_journeys(request):
+        # The real refs are opaque, ours just carry the departure to continue after
+        later_than = request.query.get("laterThan")
+        if later_than:
+            departure = datetime.fromisoformat(later_than.removeprefix("later|")) + timedelta(minutes=1)
+        else:
+            departure = request.query.get("departure")
+            departure = datetime.fromisoformat(departure) if departure else datetime.now()
+        shifted = shift_journeys(journeys["journeys"], departure)
+        later_ref = "later|" + shifted[-1]["legs"][0]["departure"]
+        return web.json_response({**journeys, "journeys": shifted, "laterRef": later_ref})
+
+    async def get_departures(request):
+        # Board starts now, and delays drift a little between polls like the real thing
+        offset = datetime.now().astimezone() - datetime.fromisoformat(departures["departures"][0]["plannedWhen"])
+        board = copy.deepcopy(departures["departures"])
+        for departure in board:
+            planned = datetime.fromisoformat(departure["plannedWhen"]) + offset
+            departure["plannedWhen"] = planned.isoformat()
+            if departure.get("delay") is not None:
+                departure["delay"] += random.choice((0, 0, 0, 60))
+                departure["when"] = (planned + timedelta(seconds=departure["delay"])).isoformat()
+        return web.json_response({**departures, "departures": board})
+
+    app.router.add_get("/locations", get_locations)
+    app.router.add_get("/journeys", get_journeys)
+    app.router.add_get("/stops/{id}/departures", get_departures)
+
+
+def osu_file(beatmap_id: int) -> str:
+    """A made up .osu file: jumps, a stream, sliders and a spinner at 180 BPM"""
+    rng = random.Random(beatmap_id)
+    objects = []
+    time = 1000
+    for i in range(400):
+        if i % 50 == 49:
+            objects.append(f"256,192,{time},12,0,{time + 2000},0:0:0:0:")
+            time += 2500
+        elif i % 7 == 0:
+            objects.append(f"{rng.randint(0, 512)},{rng.randint(0, 384)},{time},2,0,B|{rng.randint(0, 512)}:{rng.randint(0, 384)},1,140")
+            time += 333
+        elif i % 50 < 20:
+            objects.append(f"{200 + (i % 4) * 20},{180 + (i % 3) * 20},{time},1,0,0:0:0:0:")
+            time += 83
+        else:
+            objects.append(f"{rng.randint(0, 512)},{rng.randint(0, 384)},{time},1,0,0:0:0:0:")
+            time += 333
+    return "\n".join([
+        "osu file format v14", "", "[General]", "Mode: 0", "", "[Metadata]",
+        "Title:Bench Song", "Artist:nyoetools", "Creator:bench", f"Version:Insane {beatmap_id}", f"BeatmapID:{beatmap_id}",
+        "", "[Difficulty]", "HPDrainRate:6", "CircleSize:4", "OverallDifficulty:8", "ApproachRate:9",
+        "SliderMultiplier:1.4", "SliderTickRate:1", "", "[TimingPoints]", "1000,333.33,4,2,1,60,1,0", "",
+        "[HitObjects]", *objects,
+    ])
+
+
+def osu_routes(app):
+    token = fixture("osu_token")
+    beatmapset = fixture("osu_beatmapset")
+
+    async def post_token(request):
+        return web.json_response(token)
+
+    async def get_beatmapset(request):
+        if request.headers.get("Authorization") != f"Bearer {token['access_token']}":
+            return web.json_response({"authentication": "basic"}, status=401)
+        return web.json_response(dict(beatmapset, id=int(request.match_info["id"])))
+
+    async def get_beatmaps(request):
+        if request.headers.get("Authorization") != f"Bearer {token['access_token']}":
+            return web.json_response({"authentication": "basic"}, status=401)
+        # Every beatmap belongs to the set with a third of its id, ids past 10^7 don't exist
+        ids = [int(i) for i in request.query.getall("ids[]", [])][:50]
+        template = beatmapset["beatmaps"][0]
+        return web.json_response({"beatmaps": [
+            dict(template, id=i, beatmapset_id=i // 3) for i in ids if i < 10_000_000
+        ]})
+
+    async def lookup_beatmap(request):
+        if request.headers.get("Authorization") != f"Bearer {token['access_token']}":
+            return web.json_response({"authentication": "basic"}, status=401)
+        # Any checksum is a beatmap, its id made from the first digits
+        checksum = request.query.get("checksum", "")
+        digits = "".join(c for c in checksum if c.isdigit())[:6]
+        if not digits:
+            return web.json_response({"error": None}, status=404)
+        beatmap_id = int(digits)
+        return web.json_response(dict(beatmapset["beatmaps"][0], id=beatmap_id, beatmapset_id=beatmap_id // 3))
+
+    async def get_osu_file(request):
+        beatmap_id = int(request.match_info["id"])
+        if beatmap_id >= 10_000_000:
+            return web.Response(body=b"")
+        return web.Response(text=osu_file(beatmap_id))
+
+    app.router.add_post("/oauth/token", post_token)
+    app.router.add_get("/api/v2/beatmaps/lookup", lookup_beatmap)
+    app.router.add_get("/osu/{id}", get_osu_file)
+    app.router.add_get("/api/v2/beatmapsets/{id}", get_beatmapset)
+    app.router.add_get("/api/v2/beatmaps", get_beatmaps)
+
+
+def github_routes(app):
+    commit = fixture("github_commit")
+    languages = fixture("github_languages")
+
+    async def get_commit(request):
+        return web.json_response(commit)
+
+    async def get_languages(request):
+        return web.json_response(languages)
+
+    app.router.add_get("/repos/{user}/{repo}/commits/{ref}", get_commit)
+    app.router.add_get("/repos/{user}/{repo}/languages", get_languages)
+
+
+def mojang_routes(app):
+    profile = fixture("mojang_profile")
+
+    async def get_profile(request):
+        name = request.match_info["name"]
+        if name.lower().startswith("free"):
+            return web.Response(status=204)
+        return web.json_response(dict(profile, name=name))
+
+    app.router.add_get("/users/profiles/minecraft/{name}", get_profile)
+
+
+def frankfurter_routes(app):
+    latest = fixture("frankfurter_latest")
+
+    async def get_latest(request):
+        symbol = request.query.get("symbols", "USD")
+        rates = {symbol: latest["rates"].get(symbol, 1.0)}
+        return web.json_response(dict(latest, base=request.query.get("base", "EUR"), rates=rates))
+
+    app.router.add_get("/v1/latest", get_latest)
+
+
+def urban_routes(app):
+    search = fixture("urban_search")
+
+    async def get_search(request):
+        return web.json_response(dict(search, term=request.query.get("term", "")))
+
+    app.router.add_get("/api/search", get_search)
+
+
+def httpcat_routes(app):
+    async def get_cat(request):
+        code = int(request.match_info["code"])
+        if not 100 <= code < 600:
+            return web.Response(status=404)
+        return web.Response(body=PNG, content_type="image/png")
+
+    app.router.add_get(r"/{code:\d+}", get_cat)
+
+
+# upstream name -> (environment variable the cogs read the base URL from, route installer)
+UPSTREAMS = {
+    "db": ("DB_API_URL", db_routes),
+    "osu": ("OSU_API_URL", osu_routes),
+    "github": ("GITHUB_API_URL", github_routes),
+    "mojang": ("MOJANG_API_URL", mojang_routes),
+    "frankfurter": ("FRANKFURTER_API_URL", frankfurter_routes),
+    "urban": ("URBAN_API_URL", urban_routes),
+    "httpcat": ("HTTPCAT_URL", httpcat_routes),
+}
+
+
+class FakeUpstreams:
+    """Runs one local HTTP server per upstream, each on its own ephemeral port"""
+
+    def __init__(self, behaviours: dict):
+        self.behaviours = behaviours
+        self.urls = {}
+        self._runners = []
+
+    async def start(self):
+        for name, (env, install_routes) in UPSTREAMS.items():
+            app = web.Application(middlewares=[_middleware(self.behaviours[name])])
+            install_routes(app)
+            runner = web.AppRunner(app, access_log=None)
+            await runner.setup()
+            site = web.TCPSite(runner, "127.0.0.1", 0)
+            await site.start()
+            host, port = runner.addresses[0][:2]
+            self.urls[env] = f"http://{host}:{port}"
+            self._runners.append(runner)
+        return self.urls
+
+    async def stop(self):
+        for runner in self._runners:
+            await runner.cleanup()
+        self._runners.clear()
@@ -1,12 +1,64 @@
 import discord
 from discord import app_commands
 from discord.ext import commands
-import requests
-from datetime import datetime
-from typing import List, Dict, Optional
-from requests import HTTPError
+import aiohttp
+import asyncio
+import logging
+import os
+import pytz
+import time as timer
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import List, Dict, Literal, Optional, Tuple
 
-url = "https://v6.db.transport.rest"
+from core import metrics
+from core.cache import TTLCache
+from core.singleflight import SingleFlight
+from transit.dataset import StationDataset
+from transit.models import Departure, Journey, deep_sizeof
+from transit.stations import StationIndex, normalize
+
+log = logging.getLogger(__name__)
+
+url = os.environ.get("DB_API_URL", "https://v6.db.transport.rest")
+# Dates and times users type are German local time, like the API's own
+BERLIN = pytz.timezone("Europe/Berlin")
+
+# Station names barely ever change, so search results can be kept for a long time
+STATION_CACHE_TTL = int(os.environ.get("DB_STATION_CACHE_TTL", 24 * 60 * 60))
+STATION_CACHE_SIZE = int(os.environ.get("DB_STATION_CACHE_SIZE", 2048))
+# How long autocomplete waits on the API before answering with whatever the local index has
+AUTOCOMPLETE_TIMEOUT = 2.0
+# Optional local stops dataset (GTFS stops.txt or CSV) to resolve station names without the API
+STATIONS_FILE = os.environ.get("DB_STATIONS_FILE")
+STATIONS_INDEX = os.environ.get("DB_STATIONS_INDEX")
+# How often (seconds) the dataset is checked for changes
+STATIONS_CHECK_INTERVAL = int(os.environ.get("DB_STATIONS_CHECK_INTERVAL", 300))
+# Journey searches are cached per route and departure window (seconds). The TTL stays short
+# because results carry live delays and remarks.
+JOURNEY_WINDOW = int(os.environ.get("DB_JOURNEY_WINDOW", 10 * 60))
+JOURNEY_CACHE_TTL = int(os.environ.get("DB_JOURNEY_CACHE_TTL", 60))
+# Extra journeys fetched per window so later searches in the same window still get a full page
+JOURNEY_OVERFETCH = 3
+# Open /train views are capped (oldest gets its buttons removed) and so are the journeys each one
+# can page through, which bounds the memory held by searches people have walked away from
+MAX_VIEWS = int(os.environ.get("DB_MAX_VIEWS", 200))
+MAX_VIEW_JOURNEYS = int(os.environ.get("DB_MAX_VIEW_JOURNEYS", 50))
+# Live departure boards: how long a message keeps updating (interaction tokens expire after
+# 15 minutes, so edits have to stop before that) and the range the polling interval adapts in
+BOARD_DURATION = min(int(os.environ.get("DB_BOARD_DURATION", 10 * 60)), 14 * 60)
+BOARD_MIN_INTERVAL = int(os.environ.get("DB_BOARD_MIN_INTERVAL", 30))
+BOARD_MAX_INTERVAL = int(os.environ.get("DB_BOARD_MAX_INTERVAL", 120))
+# "within N hours" searches query one departure every SEARCH_STEP minutes of the window, all at once
+SEARCH_STEP = int(os.environ.get("DB_SEARCH_STEP", 60))
+SORT_KEYS = {
+    "departure": lambda j: j.departure,
+    "duration": lambda j: (j.arrival - j.departure, j.departure),
+    "transfers": lambda j: (len(j.legs), j.arrival - j.departure, j.departure),
+    "price": lambda j: (j.price is None, j.price or 0, j.departure),
+}
+# Set DB_DEBUG=1 to get a per-stage timing breakdown with every /train result
+DEBUG = os.environ.get("DB_DEBUG", "0") == "1"
 
 class RemarksModal(discord.ui.Modal, title="Journey Remarks"):
     """Modal to display remarks for a journey."""
@@ -26,20 +78,122 @@ class RemarksModal(discord.ui.Modal, title="Journey Remarks"):
 class ConnectionView(discord.ui.View):
     """View with navigation buttons for train connections."""
 
-    def __init__(self, embeds: List[discord.Embed], user_id: int, journeys: List[Dict]):
+    def __init__(self, cog, user_id: int, journeys: List[Journey], later_ref: Optional[str], from_station: Dict, to_station: Dict, sort_by: str = "departure"):
         super().__init__(timeout=300)  # 5 minutes timeout
-        self.embeds = embeds
+        self.cog = cog
+        self.message = None
+        self.sort_by = sort_by
+        self.pending = 0  # searches still running that will merge into this view
+        self.navigated = False
         self.current_page = 0
         self.user_id = user_id
         self.journeys = journeys
+        self.later_ref = later_ref
+        self.from_station = from_station
+        self.to_station = to_station
+        self.prefetch = None
+        self.batch_starts = [0]  # index of the first journey of each loaded batch
         self.update_buttons()
-    
+
+    def render(self) -> discord.Embed:
+        """Build the embed for the current page (pages are only rendered when shown)."""
+        embed = self.cog.create_connection_embed(
+            self.journeys[self.current_page],
+            self.current_page + 1,
+            len(self.journeys),
+            self.from_station['name'],
+            self.to_station['name'],
+            self.from_station['id'],
+            self.to_station['id']
+        )
+        if self.pending:
+            embed.set_footer(text=f"Deutsche Bahn API • Still searching ({self.pending} more departure times)...")
+        return embed
+
+    def merge(self, journeys: List[Journey]):
+        """Add journeys from another search, skipping ones already shown, and re-rank.
+        Shows the new best one unless the user has started paging, then it stays on their journey."""
+        current = self.journeys[self.current_page] if self.journeys else None
+        seen = {j.key for j in self.journeys}
+        for journey in journeys:
+            if journey.key not in seen:
+                seen.add(journey.key)
+                self.journeys.append(journey)
+        self.journeys.sort(key=SORT_KEYS[self.sort_by])
+        del self.journeys[MAX_VIEW_JOURNEYS:]
+        if self.navigated and current in self.journeys:
+            self.current_page = self.journeys.index(current)
+        else:
+            self.current_page = 0
+        self.update_buttons()
+
+    def start_prefetch(self):
+        """Fetch the next batch in the background once the user reaches the last loaded journey."""
+        if self.later_ref and self.prefetch is None and self.current_page == len(self.journeys) - 1:
+            self.prefetch = asyncio.create_task(self.load_later())
+
+    async def load_later(self):
+        journeys, later_ref = await self.cog.get_later_connections(
+            self.from_station['id'], self.to_station['id'], self.later_ref
+        )
+        if journeys:
+            self.batch_starts.append(len(self.journeys))
+        self.journeys.extend(journeys[:MAX_VIEW_JOURNEYS - len(self.journeys)])
+        # No new journeys means there is nothing later, stop offering it
+        self.later_ref = later_ref if journeys and len(self.journeys) < MAX_VIEW_JOURNEYS else None
+        self.prefetch = None
+
+    def next_batch(self) -> Optional[int]:
+        return next((start for start in self.batch_starts if start > self.current_page), None)
+
+    async def wait_for_later(self, interaction: discord.Interaction):
+        """Make sure the batch after the loaded journeys is there (usually it was already prefetched)."""
+        if self.prefetch is None and self.later_ref:
+            self.prefetch = asyncio.create_task(self.load_later())
+        if self.prefetch is None:
+            return
+        await interaction.response.defer()
+        try:
+            await self.prefetch
+        except Exception:
+            log.exception("Loading later connections failed")
+            self.prefetch = None
+            self.later_ref = None
+
+    async def show(self, interaction: discord.Interaction):
+        self.navigated = True
+        self.update_buttons()
+        self.start_prefetch()
+        if interaction.response.is_done():
+            await interaction.edit_original_response(embed=self.render(), view=self)
+        else:
+            await interaction.response.edit_message(embed=self.render(), view=self)
+
     def update_buttons(self):
         """Update button states based on current page."""
+        last_loaded = self.current_page == len(self.journeys) - 1
         self.previous_btn.disabled = self.current_page == 0
-        self.next_btn.disabled = self.current_page == len(self.embeds) - 1
+        self.next_btn.disabled = last_loaded and not self.later_ref
+        self.later_btn.disabled = self.next_batch() is None and not self.later_ref
         self.previous_btn.label = f"← Previous"
         self.next_btn.label = f"Next →"
+
+    def memory(self) -> int:
+        """Approximate bytes held by this view's journeys"""
+        return deep_sizeof(self.journeys)
+
+    def release(self):
+        """Stop the view and drop everything it holds."""
+        if self.prefetch:
+            self.prefetch.cancel()
+            self.prefetch = None
+        self.journeys = []
+        self.later_ref = None
+        self.stop()
+
+    async def on_timeout(self):
+        self.cog.forget_view(self)
+        self.release()
     
     @discord.ui.button(label="← Previous", style=discord.ButtonStyle.primary, disabled=True)
     async def previous_btn(self, interaction: discord.Interaction, button: discord.ui.Button):
@@ -50,8 +204,7 @@ class ConnectionView(discord.ui.View):
         
         if self.current_page > 0:
             self.current_page -= 1
-            self.update_buttons()
-            await interaction.response.edit_message(embed=self.embeds[self.current_page], view=self)
+            await self.show(interaction)
     
     @discord.ui.button(label="Next →", style=discord.ButtonStyle.primary)
     async def next_btn(self, interaction: discord.Interaction, button: discord.ui.Button):
@@ -60,10 +213,25 @@ class ConnectionView(discord.ui.View):
             await interaction.response.send_message("This is not your search!", ephemeral=True)
             return
         
-        if self.current_page < len(self.embeds) - 1:
+        if self.current_page == len(self.journeys) - 1:
+            await self.wait_for_later(interaction)
+        if self.current_page < len(self.journeys) - 1:
             self.current_page += 1
-            self.update_buttons()
-            await interaction.response.edit_message(embed=self.embeds[self.current_page], view=self)
+        await self.show(interaction)
+
+    @discord.ui.button(label="⏩ Later", style=discord.ButtonStyle.secondary)
+    async def later_btn(self, interaction: discord.Interaction, button: discord.ui.Button):
+        """Jump to the first connection of the next batch."""
+        if interaction.user.id != self.user_id:
+            await interaction.response.send_message("This is not your search!", ephemeral=True)
+            return
+
+        if self.next_batch() is None:
+            await self.wait_for_later(interaction)
+        start = self.next_batch()
+        if start is not None:
+            self.current_page = start
+        await self.show(interaction)
     
     @discord.ui.button(label="📝 Remarks", style=discord.ButtonStyle.secondary)
     async def remarks_btn(self, interaction: discord.Interaction, button: discord.ui.Button):
@@ -76,34 +244,26 @@ class ConnectionView(discord.ui.View):
         remarks_list = []
 
         # Collect remarks from all legs
-        for i, leg in enumerate(journey.get('legs', []), 1):
-            leg_remarks = leg.get('remarks', [])
-            if leg_remarks:
-                line_name = leg.get('line', {}).get('name', 'Walk')
-                origin = leg['origin']['name']
-                dest = leg['destination']['name']
-                remarks_list.append(f"**Leg {i}: {line_name}** ({origin} → {dest})")
-
-                for remark in leg_remarks:
-                    remark_text = remark.get('text', '')
-                    remark_summary = remark.get('summary', '')
-                    if remark_summary:
-                        remarks_list.append(f"• {remark_summary}: {remark_text}")
-                    elif remark_text:
-                        remarks_list.append(f"• {remark_text}")
+        for i, leg in enumerate(journey.legs, 1):
+            if leg.remarks:
+                line_name = leg.line_name or 'Walk'
+                remarks_list.append(f"**Leg {i}: {line_name}** ({leg.origin} → {leg.destination})")
+
+                for remark in leg.remarks:
+                    if remark.summary:
+                        remarks_list.append(f"• {remark.summary}: {remark.text or ''}")
+                    elif remark.text:
+                        remarks_list.append(f"• {remark.text}")
                 remarks_list.append("")  # Empty line between legs
 
         # Collect journey-level remarks
-        journey_remarks = journey.get('remarks', [])
-        if journey_remarks:
+        if journey.remarks:
             remarks_list.append("**Journey Remarks:**")
-            for remark in journey_remarks:
-                remark_text = remark.get('text', '')
-                remark_summary = remark.get('summary', '')
-                if remark_summary:
-                    remarks_list.append(f"• {remark_summary}: {remark_text}")
-                elif remark_text:
-                    remarks_list.append(f"• {remark_text}")
+            for remark in journey.remarks:
+                if remark.summary:
+                    remarks_list.append(f"• {remark.summary}: {remark.text or ''}")
+                elif remark.text:
+                    remarks_list.append(f"• {remark.text}")
 
         if remarks_list:
             remarks_text = "\n".join(remarks_list)
@@ -123,63 +283,394 @@ class ConnectionView(discord.ui.View):
             return
 
         await interaction.message.delete()
+        self.cog.forget_view(self)
+        self.release()
+
+class DepartureBoard:
+    """
+    Polls the departures of one station and keeps every message showing that station up to date.
+    Everyone watching the same station shares this one poller; it stops once nobody is left.
+    """
+
+    def __init__(self, cog, station: Dict):
+        self.cog = cog
+        self.station = station
+        self.subscribers = {}  # interaction id -> message (None until it has been sent)
+        self.embed = None
+        self.state = None
+        self.interval = BOARD_MIN_INTERVAL
+        self.ready = asyncio.Event()
+        self.task = asyncio.create_task(self.run())
+
+    def subscribe(self, key: int):
+        self.subscribers[key] = None
+
+    def attach(self, key: int, message: discord.Message):
+        if key in self.subscribers:
+            self.subscribers[key] = message
+
+    def unsubscribe(self, key: int):
+        self.subscribers.pop(key, None)
+
+    async def run(self):
+        try:
+            while self.subscribers:
+                try:
+                    await self.poll()
+                except Exception:
+                    log.exception("Departure board for %s failed", self.station['name'])
+                    self.interval = BOARD_MAX_INTERVAL
+                self.ready.set()
+                await asyncio.sleep(self.interval)
+        finally:
+            self.ready.set()
+            if self.cog.boards.get(self.station['id']) is self:
+                del self.cog.boards[self.station['id']]
+
+    async def poll(self):
+        departures = await self.cog.get_departures(self.station['id'])
+        state = None if departures is None else tuple(d.state for d in departures)
+
+        if departures is not None and state != self.state:
+            self.state = state
+            self.embed = self.cog.create_departures_embed(self.station, departures)
+            # Something moved, look again soon
+            self.interval = BOARD_MIN_INTERVAL
+            if self.ready.is_set():
+                await self.broadcast()
+        else:
+            # Nothing new (or the API is struggling), back off
+            self.interval = min(self.interval * 1.5, BOARD_MAX_INTERVAL)
+            if self.embed is None:
+                self.embed = discord.Embed(
+                    title=f"🚉 {self.station['name']}",
+                    description="❌ Couldn't load departures, retrying...",
+                    color=0xff0000
+                )
+
+    async def broadcast(self):
+        """Edit every subscribed message with the current board."""
+        subscribed = [(key, message) for key, message in self.subscribers.items() if message]
+        results = await asyncio.gather(
+            *(message.edit(embed=self.embed) for _, message in subscribed),
+            return_exceptions=True
+        )
+        for (key, _), result in zip(subscribed, results):
+            # Deleted message or expired interaction, stop updating it
+            if isinstance(result, discord.HTTPException):
+                self.unsubscribe(key)
+
+class BoardView(discord.ui.View):
+    """Stop button for a live departure board; updates end when the view times out."""
+
+    def __init__(self, board: DepartureBoard, key: int, user_id: int):
+        super().__init__(timeout=BOARD_DURATION)
+        self.board = board
+        self.key = key
+        self.user_id = user_id
+
+    async def on_timeout(self):
+        message = self.board.subscribers.get(self.key)
+        self.board.unsubscribe(self.key)
+        if message:
+            try:
+                await message.edit(view=None)
+            except discord.HTTPException:
+                pass
+
+    @discord.ui.button(label="⏹️ Stop updating", style=discord.ButtonStyle.secondary)
+    async def stop_btn(self, interaction: discord.Interaction, button: discord.ui.Button):
+        if interaction.user.id != self.user_id:
+            await interaction.response.send_message("This is not your board!", ephemeral=True)
+            return
+
+        self.board.unsubscribe(self.key)
         self.stop()
+        await interaction.response.edit_message(view=None)
 
 class DeutscheBahn(commands.Cog):
     """Deutsche Bahn train connection search commands."""
     
     def __init__(self, bot):
         self.bot = bot
-    
-    def search_stations(self, query: str, limit: int = 25) -> List[Dict]:
+        self.station_lookups = SingleFlight("db_locations")
+        self.station_cache = TTLCache("db_stations", maxsize=STATION_CACHE_SIZE, ttl=STATION_CACHE_TTL)
+        self.station_index = StationIndex()
+        self.journey_lookups = SingleFlight("db_journeys")
+        self.journey_cache = TTLCache("db_journeys", maxsize=512, ttl=JOURNEY_CACHE_TTL)
+        self.dataset = StationDataset(STATIONS_FILE, STATIONS_INDEX) if STATIONS_FILE else None
+        self.dataset_watcher = None
+        self.views = OrderedDict()
+        self.boards = {}  # station id -> DepartureBoard
+
+        metrics.registry.gauge("nyoetools_db_open_views", "Open /train result views").set_function(lambda: len(self.views))
+        metrics.registry.gauge(
+            "nyoetools_db_view_bytes", "Approximate memory held by open /train views"
+        ).set_function(lambda: sum(view.memory() for view in self.views.values()))
+        metrics.registry.gauge("nyoetools_db_boards", "Stations with a live departure board being polled").set_function(lambda: len(self.boards))
+        metrics.registry.gauge(
+            "nyoetools_db_board_subscribers", "Messages showing a live departure board"
+        ).set_function(lambda: sum(len(board.subscribers) for board in self.boards.values()))
+
+    def register_view(self, view: ConnectionView):
+        """Track an open view, evicting the oldest ones beyond MAX_VIEWS."""
+        self.views[id(view)] = view
+        while len(self.views) > MAX_VIEWS:
+            _, oldest = self.views.popitem(last=False)
+            oldest.release()
+            if oldest.message:
+                asyncio.create_task(self.remove_buttons(oldest.message))
+
+    def forget_view(self, view: ConnectionView):
+        self.views.pop(id(view), None)
+
+    async def remove_buttons(self, message: discord.Message):
+        try:
+            await message.edit(view=None)
+        except discord.HTTPException:
+            pass
+
+    async def cog_load(self):
+        if self.dataset is not None:
+            await self.refresh_dataset()
+            self.dataset_watcher = asyncio.create_task(self.watch_dataset())
+
+    async def cog_unload(self):
+        for view in self.views.values():
+            view.release()
+        self.views.clear()
+        for board in list(self.boards.values()):
+            board.task.cancel()
+        if self.dataset_watcher:
+            self.dataset_watcher.cancel()
+        if self.dataset is not None:
+            self.dataset.close()
+
+    async def refresh_dataset(self):
+        """Rebuild the station index in a thread if the dataset changed, then swap it in.
+        The mapping is swapped here on the event loop, where searches run, never from the thread."""
+        try:
+            rebuilt = await asyncio.to_thread(self.dataset.rebuild)
+            if rebuilt or not self.dataset:
+                self.dataset.open()
+        except (OSError, ValueError) as e:
+            log.warning("Could not load station dataset %s: %s", STATIONS_FILE, e)
+
+    async def watch_dataset(self):
+        while True:
+            await asyncio.sleep(STATIONS_CHECK_INTERVAL)
+            await self.refresh_dataset()
+
+    async def search_stations(self, query: str, limit: int = 25) -> List[Dict]:
         """Search for train stations by name."""
+        # Autocomplete hands us station ids, those never need a lookup
+        station = self.station_index.get(query.strip()) or (self.dataset and self.dataset.get(query.strip()))
+        if station:
+            return [station]
+
+        if self.dataset:
+            stations = self.dataset.search(query, limit)
+            if stations:
+                return stations
+
+        key = (normalize(query), limit)
+        # The stations themselves are cached, not their ids: the index stops growing once
+        # it's full, and a cache hit must never return less than the lookup it stands for
+        cached = self.station_cache.get(key)
+        if cached is not None:
+            return list(cached)
+
+        stations = await self.station_lookups.do(key, self._fetch_stations, query, limit)
+        for s in stations:
+            self.station_index.add(s)
+        # Failed lookups come back empty, don't pin those for a day
+        if stations:
+            self.station_cache.set(key, tuple(stations))
+        return stations
+
+    async def _fetch_stations(self, query: str, limit: int) -> List[Dict]:
         try:
-            response = requests.get(
+            async with self.bot.http_session.get(
                 f"{url}/locations",
                 params={"query": query, "results": limit}
-            )
-            response.raise_for_status()
-            stations = response.json()
-            return [s for s in stations if s.get('type') in ['station', 'stop']]
-        except requests.RequestException as e:
-            print(f"Error searching stations: {e}")
+            ) as response:
+                response.raise_for_status()
+                stations = await response.json()
+            return [
+                {"type": s["type"], "id": s["id"], "name": s["name"]}
+                for s in stations if s.get('type') in ['station', 'stop']
+            ]
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            log.warning("Error searching stations: %s", e)
             return []
-    
-    def get_connections(self, from_id: str, to_id: str, departure: str, results: int = 5) -> List[Dict]:
-        """Get train connections between two stations."""
+
+    async def get_connections(self, from_id: str, to_id: str, departure: str, results: int = 5) -> Tuple[List[Journey], Optional[str]]:
+        """Get train connections between two stations, plus the ref for fetching later ones."""
+        requested = datetime.fromisoformat(departure)
+        if requested.tzinfo is None:
+            requested = BERLIN.localize(requested)
+
+        # Searches a few minutes apart share one query made from the start of their window,
+        # then each gets only the journeys that leave at or after its own departure time
+        window_start = int(requested.timestamp()) // JOURNEY_WINDOW * JOURNEY_WINDOW
+        key = (from_id, to_id, window_start, results)
+        cached = self.journey_cache.get(key)
+        if cached is None:
+            window_departure = datetime.fromtimestamp(window_start, requested.tzinfo).isoformat()
+            cached = await self.journey_lookups.do(
+                key, self._fetch_connections, {"departure": window_departure}, from_id, to_id, results + JOURNEY_OVERFETCH
+            )
+            if cached[0]:
+                self.journey_cache.set(key, cached)
+
+        journeys, later_ref = cached
+        matching = [j for j in journeys if j.departure >= requested]
+        if len(matching) < results and len(journeys) >= results + JOURNEY_OVERFETCH:
+            # The window was busier than the overfetch covers, ask for this exact time (to the minute) instead
+            minute = int(requested.timestamp()) // 60 * 60
+            exact_key = (from_id, to_id, minute, results, "exact")
+            exact = self.journey_cache.get(exact_key)
+            if exact is None:
+                exact_departure = datetime.fromtimestamp(minute, requested.tzinfo).isoformat()
+                exact = await self.journey_lookups.do(
+                    exact_key, self._fetch_connections, {"departure": exact_departure}, from_id, to_id, results
+                )
+                if exact[0]:
+                    self.journey_cache.set(exact_key, exact)
+            # Callers sort and extend the list they get, keep the cached one untouched
+            return list(exact[0]), exact[1]
+        # Everything matching is returned (not just `results`) so later_ref still continues right after it
+        return matching, later_ref
+
+    async def get_later_connections(self, from_id: str, to_id: str, later_ref: str, results: int = 5) -> Tuple[List[Journey], Optional[str]]:
+        """Get the connections following an earlier search, using its later ref."""
+        return await self._fetch_connections({"laterThan": later_ref}, from_id, to_id, results)
+
+    async def _fetch_connections(self, when: Dict[str, str], from_id: str, to_id: str, results: int) -> Tuple[List[Journey], Optional[str]]:
         try:
-            response = requests.get(
+            async with self.bot.http_session.get(
                 f"{url}/journeys",
                 params={
                     "from": from_id,
                     "to": to_id,
-                    "departure": departure,
+                    **when,
                     "results": results
                 }
-            )
-            response.raise_for_status()
-            data = response.json()
-            return data.get('journeys', [])
-        except requests.RequestException as e:
-            print(f"Error fetching connections: {e}")
-            return []
+            ) as response:
+                response.raise_for_status()
+                data = await response.json()
+            journeys = [Journey.from_api(j) for j in data.get('journeys', []) if j.get('legs')]
+            return journeys, data.get('laterRef')
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            log.warning("Error fetching connections: %s", e)
+            return [], None
     
+    async def search_window(self, interaction: discord.Interaction, from_station: Dict, to_station: Dict,
+                            departure: datetime, hours: int, sort_by: str) -> Optional[ConnectionView]:
+        """
+        Search several departure times across the next `hours` at once and stream the merged results
+        into one view: it's sent as soon as the first search has something, the rest merge in as they finish.
+        """
+        start = departure if departure.tzinfo else BERLIN.localize(departure)
+        end = start + timedelta(hours=hours)
+        steps = max(1, hours * 60 // SEARCH_STEP)
+        searches = [
+            asyncio.create_task(self.get_connections(
+                from_station['id'], to_station['id'], (start + timedelta(minutes=SEARCH_STEP * k)).isoformat()
+            ))
+            for k in range(steps)
+        ]
+
+        view = None
+        try:
+            for pending, search in enumerate(asyncio.as_completed(searches), 1):
+                journeys, _ = await search
+                journeys = [j for j in journeys if j.departure <= end]
+                if view is None and not journeys:
+                    continue
+
+                if view is None:
+                    # Later refs don't mean much across a window, this view only pages what was found
+                    view = ConnectionView(self, interaction.user.id, [], None, from_station, to_station, sort_by)
+                    view.pending = steps - pending
+                    view.merge(journeys)
+                    view.message = await interaction.followup.send(embed=view.render(), view=view)
+                else:
+                    view.pending = steps - pending
+                    view.merge(journeys)
+                    if view.message and not view.is_finished():
+                        await view.message.edit(embed=view.render(), view=view)
+        finally:
+            for search in searches:
+                search.cancel()
+
+        if view is None:
+            await interaction.followup.send(
+                f"❌ No connections found from **{from_station['name']}** to **{to_station['name']}** in the next {hours}h"
+            )
+        return view
+
+    async def get_departures(self, station_id: str, duration: int = 60, results: int = 12) -> Optional[List[Departure]]:
+        """Get the upcoming departures of a station, None if the API failed."""
+        try:
+            async with self.bot.http_session.get(
+                f"{url}/stops/{station_id}/departures",
+                params={"duration": duration, "results": results}
+            ) as response:
+                response.raise_for_status()
+                data = await response.json()
+            departures = data.get('departures', []) if isinstance(data, dict) else data
+            return [Departure.from_api(d) for d in departures if d.get('plannedWhen') or d.get('when')]
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            log.warning("Error fetching departures: %s", e)
+            return None
+
+    def create_departures_embed(self, station: Dict, departures: List[Departure]) -> discord.Embed:
+        """Create the departure board embed for a station."""
+        lines = []
+        for departure in departures:
+            time = departure.planned.strftime('%H:%M')
+            delay = ""
+            if departure.delay:
+                delay = f" **+{departure.delay // 60}**"
+            platform = f" · Gl. {departure.platform}" if departure.platform else ""
+            line = f"`{time}`{delay} **{departure.line_name}** → {departure.direction}{platform}"
+            lines.append(f"~~{line}~~ 🚫" if departure.cancelled else line)
+
+        embed = discord.Embed(
+            title=f"🚉 Departures: {station['name']}",
+            description="\n".join(lines) or "No departures in the next hour.",
+            color=0x667eea,
+            timestamp=datetime.now().astimezone()
+        )
+        embed.set_footer(text="Deutsche Bahn API • Live, last updated")
+        return embed
+
+    def format_timings(self, timings: Dict[str, float]) -> str:
+        """Format the per-stage timings of a /train search for debug output."""
+        labels = {
+            "from": "Departure lookup",
+            "to": "Destination lookup",
+            "stations": "Stations (parallel)",
+            "journeys": "Journeys",
+            "total": "Total",
+        }
+        lines = [f"{labels[k]:<20} {timings[k] * 1000:8.1f} ms" for k in labels if k in timings]
+        return "🐛 **Timings**\n```\n" + "\n".join(lines) + "\n```"
+
     def format_duration(self, minutes: int) -> str:
         """Format duration in minutes to hours and minutes."""
         hours = minutes // 60
         mins = minutes % 60
         return f"{hours}h {mins}m"
     
-    def create_connection_embed(self, journey: Dict, idx: int, total: int, from_name: str, to_name: str, from_id: str, to_id: str) -> discord.Embed:
+    def create_connection_embed(self, journey: Journey, idx: int, total: int, from_name: str, to_name: str, from_id: str, to_id: str) -> discord.Embed:
         """Create an embed for a single connection."""
-        first_leg = journey['legs'][0]
-        last_leg = journey['legs'][-1]
-
-        dep_time = datetime.fromisoformat(first_leg['departure'].replace('Z', '+00:00'))
-        arr_time = datetime.fromisoformat(last_leg['arrival'].replace('Z', '+00:00'))
+        dep_time = journey.departure
+        arr_time = journey.arrival
 
         duration_mins = int((arr_time - dep_time).total_seconds() / 60)
-        transfers = len(journey['legs']) - 1
+        transfers = len(journey.legs) - 1
 
         embed = discord.Embed(
             title=f"🚄 Connection {idx} of {total}",
@@ -213,29 +704,20 @@ class DeutscheBahn(commands.Cog):
         )
 
         # Add price if available
-        price_info = journey.get('price')
-        if price_info:
-            amount = price_info.get('amount')
-            currency = price_info.get('currency', 'EUR')
-            if amount is not None:
-                embed.add_field(
-                    name="💰 Price",
-                    value=f"{amount:.2f} {currency}",
-                    inline=True
-                )
+        if journey.price is not None:
+            embed.add_field(
+                name="💰 Price",
+                value=f"{journey.price:.2f} {journey.currency}",
+                inline=True
+            )
 
         route_lines = []
-        for leg in journey['legs']:
-            line_name = leg.get('line', {}).get('name', '🚶 Walk')
-            origin = leg['origin']['name']
-            dest = leg['destination']['name']
-            
-            dep = datetime.fromisoformat(leg['departure'].replace('Z', '+00:00'))
-            arr = datetime.fromisoformat(leg['arrival'].replace('Z', '+00:00'))
+        for leg in journey.legs:
+            line_name = leg.line_name or '🚶 Walk'
             
             route_lines.append(
                 f"**{line_name}**\n"
-                f"{origin} ({dep.strftime('%H:%M')}) → {dest} ({arr.strftime('%H:%M')})"
+                f"{leg.origin} ({leg.departure.strftime('%H:%M')}) → {leg.destination} ({leg.arrival.strftime('%H:%M')})"
             )
         
         embed.add_field(
@@ -258,7 +740,9 @@ class DeutscheBahn(commands.Cog):
         from_station="Departure station (e.g., München Hbf)",
         to_station="Destination station (e.g., Berlin Hbf)",
         date="Date (YYYY-MM-DD, default: today)",
-        time="Time (HH:MM, default: now)"
+        time="Time (HH:MM, default: now)",
+        within="Search every departure in the next N hours instead of just the next few",
+        sort_by="How to order the connections (default: departure)"
     )
     async def train(
         self,
@@ -266,16 +750,31 @@ class DeutscheBahn(commands.Cog):
         from_station: str,
         to_station: str,
         date: Optional[str] = None,
-        time: Optional[str] = None
+        time: Optional[str] = None,
+        within: Optional[app_commands.Range[int, 1, 6]] = None,
+        sort_by: Literal["departure", "duration", "transfers", "price"] = "departure"
     ):
         """Search for train connections between two stations."""
         await interaction.response.defer()
         
         try:
+            started = timer.perf_counter()
+            timings = {}
+
+            async def timed(stage, coro):
+                stage_started = timer.perf_counter()
+                try:
+                    return await coro
+                finally:
+                    timings[stage] = timer.perf_counter() - stage_started
+
+            # Both ends are independent, so resolve them at the same time
+            from_stations, to_stations = await asyncio.gather(
+                timed("from", self.search_stations(from_station)),
+                timed("to", self.search_stations(to_station))
+            )
+            timings["stations"] = timer.perf_counter() - started
 
-            from_stations = self.search_stations(from_station)
-            to_stations = self.search_stations(to_station)
-            
             if not from_stations:
                 await interaction.followup.send(
                     f"❌ No station found for: `{from_station}`",
@@ -297,10 +796,10 @@ class DeutscheBahn(commands.Cog):
                 if date and time:
                     departure_time = datetime.strptime(f"{date} {time}", "%Y-%m-%d %H:%M")
                 elif time:
-                    today = datetime.now().date()
+                    today = datetime.now(BERLIN).date()
                     departure_time = datetime.strptime(f"{today} {time}", "%Y-%m-%d %H:%M")
                 else:
-                    departure_time = datetime.now()
+                    departure_time = datetime.now(BERLIN)
             except ValueError:
                 await interaction.followup.send(
                     "❌ Invalid date or time format. Use YYYY-MM-DD for date and HH:MM for time.",
@@ -308,44 +807,113 @@ class DeutscheBahn(commands.Cog):
                 )
                 return
             
-            departure_iso = departure_time.isoformat()
-            journeys = self.get_connections(
-                from_station_obj['id'],
-                to_station_obj['id'],
-                departure_iso
-            )
-            
-            if not journeys:
-                await interaction.followup.send(
-                    f"❌ No connections found from **{from_station_obj['name']}** to **{to_station_obj['name']}**"
-                )
-                return
-            
-            embeds = []
-            journey_list = journeys[:5]
-            for idx, journey in enumerate(journey_list, 1):
-                embed = self.create_connection_embed(
-                    journey,
-                    idx,
-                    len(journey_list),
-                    from_station_obj['name'],
-                    to_station_obj['name'],
+            if within:
+                view = await timed("journeys", self.search_window(
+                    interaction, from_station_obj, to_station_obj, departure_time, within, sort_by
+                ))
+                if view is None:
+                    return
+            else:
+                departure_iso = departure_time.isoformat()
+                journeys, later_ref = await timed("journeys", self.get_connections(
                     from_station_obj['id'],
-                    to_station_obj['id']
-                )
-                embeds.append(embed)
+                    to_station_obj['id'],
+                    departure_iso
+                ))
+                
+                if not journeys:
+                    await interaction.followup.send(
+                        f"❌ No connections found from **{from_station_obj['name']}** to **{to_station_obj['name']}**"
+                    )
+                    return
+                
+                journeys.sort(key=SORT_KEYS[sort_by])
+                view = ConnectionView(self, interaction.user.id, journeys, later_ref, from_station_obj, to_station_obj, sort_by)
+                view.start_prefetch()
 
-            view = ConnectionView(embeds, interaction.user.id, journey_list)
+                view.message = await interaction.followup.send(embed=view.render(), view=view)
+            self.register_view(view)
+            timings["total"] = timer.perf_counter() - started
 
-            await interaction.followup.send(embed=embeds[0], view=view)
+            log.debug("train timings", extra={f"{k}_ms": round(v * 1000, 1) for k, v in timings.items()})
+            if DEBUG:
+                await interaction.followup.send(self.format_timings(timings), ephemeral=True)
 
-        except HTTPError as httpe:
-            print(httpe)
+        except aiohttp.ClientResponseError as httpe:
+            log.exception("train command failed", extra={"upstream_status": httpe.status})
             await interaction.followup.send(f"An error occured:\n```bash\n{httpe}```")
         except Exception as e:
-            print(e)
+            log.exception("train command failed")
             await interaction.followup.send(f"An error occured:\n```bash\n{e}```")
 
+    @app_commands.command(
+        name="departures",
+        description="Live departure board for a station in Germany"
+    )
+    @app_commands.allowed_installs(guilds=True, users=True)
+    @app_commands.allowed_contexts(guilds=True, dms=True, private_channels=True)
+    @app_commands.describe(station="Station (e.g., München Hbf)")
+    async def departures(self, interaction: discord.Interaction, station: str):
+        """Show a departure board that keeps updating for a while."""
+        await interaction.response.defer()
+
+        try:
+            stations = await self.search_stations(station)
+            if not stations:
+                await interaction.followup.send(f"❌ No station found for: `{station}`", ephemeral=True)
+                return
+            station_obj = stations[0]
+
+            # Join the board other people are already watching, or start polling this station
+            board = self.boards.get(station_obj['id'])
+            if board is None:
+                board = self.boards[station_obj['id']] = DepartureBoard(self, station_obj)
+            board.subscribe(interaction.id)
+            attached = False
+            try:
+                await board.ready.wait()
+                if board.embed is None:
+                    await interaction.followup.send("❌ Couldn't load departures, try again later.", ephemeral=True)
+                    return
+
+                view = BoardView(board, interaction.id, interaction.user.id)
+                message = await interaction.followup.send(embed=board.embed, view=view)
+                board.attach(interaction.id, message)
+                attached = True
+            finally:
+                # A subscriber without a message would keep the board polling forever
+                if not attached:
+                    board.unsubscribe(interaction.id)
+
+        except Exception as e:
+            log.exception("departures command failed")
+            await interaction.followup.send(f"An error occured:\n```bash\n{e}```")
+
+    @departures.autocomplete('station')
+    @train.autocomplete('from_station')
+    @train.autocomplete('to_station')
+    async def station_autocomplete(self, interaction: discord.Interaction, current: str) -> List[app_commands.Choice[str]]:
+        """Suggest stations while the user is typing."""
+        if len(normalize(current)) < 2:
+            return []
+
+        if self.dataset:
+            stations = self.dataset.search(current, limit=25)
+            if stations:
+                return [app_commands.Choice(name=s['name'][:100], value=s['id']) for s in stations]
+
+        stations = self.station_index.search(current, limit=25)
+        if len(stations) < 5:
+            # Not much known locally yet, ask the API but don't let a slow response eat the 3s deadline.
+            # The lookup is shielded so it still finishes in the background and fills the index.
+            try:
+                await asyncio.wait_for(asyncio.shield(self.search_stations(current)), AUTOCOMPLETE_TIMEOUT)
+            except asyncio.TimeoutError:
+                pass
+            stations = self.station_index.search(current, limit=25)
+
+        return [app_commands.Choice(name=s['name'][:100], value=s['id']) for s in stations]
+
 async def setup(bot):
     """Required setup function for cog loading"""
     await bot.add_cog(DeutscheBahn(bot))
@@ -3,12 +3,17 @@ import discord
 from discord import app_commands
 from discord.ext import commands
 import random
+import logging
 import os
-import requests
 import time
-from openai import OpenAI
 from typing import Optional, Union
 
+from core.singleflight import SingleFlight
+
+log = logging.getLogger(__name__)
+
+FRANKFURTER_API_URL = os.environ.get("FRANKFURTER_API_URL", "https://api.frankfurter.dev")
+
 currencies = {
     "Australian Dollar": "AUD",
     "Brazilian Real": "BRL",
@@ -40,6 +45,20 @@ currencies = {
 class Fun(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
+        self.rate_lookups = SingleFlight("frankfurter_rates")
+
+    async def get_rates(self, currencyfrom: str, currencyto: str):
+        """Latest exchange rate data from Frankfurter, or None if the lookup failed"""
+        return await self.rate_lookups.do(
+            (currencyfrom.upper(), currencyto.upper()), self._fetch_rates, currencyfrom, currencyto
+        )
+
+    async def _fetch_rates(self, currencyfrom: str, currencyto: str):
+        url = f"{FRANKFURTER_API_URL}/v1/latest?base={currencyfrom}&symbols={currencyto}"
+        async with self.bot.http_session.get(url) as response:
+            if response.status != 200:
+                return None
+            return await response.json()
 
     @commands.hybrid_command(
         name="currency",
@@ -97,15 +116,11 @@ class Fun(commands.Cog):
         app_commands.Choice(name="United States Dollar", value="USD")
     ])
     async def currency(self, ctx: commands.Context, amount: int, currencyfrom: str, currencyto: str):
-        url = f"https://api.frankfurter.dev/v1/latest?base={currencyfrom}&symbols={currencyto}"
-
         try:
             await ctx.defer()
-            response = requests.get(url)
-
-            if response.status_code == 200:
-                data = response.json()
+            data = await self.get_rates(currencyfrom, currencyto)
 
+            if data is not None:
                 rate = data['rates'][f'{currencyto}']
                 raw_result = amount * rate
                 result = str(round(raw_result, 2))
@@ -122,7 +137,7 @@ class Fun(commands.Cog):
                 return
         except Exception as e:
             await ctx.send("Conversion has failed. Check logs.")
-            print(e)
+            log.exception("currency command failed")
 
 
     @commands.hybrid_command(
@@ -141,7 +156,7 @@ class Fun(commands.Cog):
 
             if amount <= 25:
                 rolls = [str(random.randint(1, sides)) for _ in range(amount)]
-                print(rolls)
+                log.debug("Rolled %s", rolls)
 
                 embed = discord.Embed(
                     title=f"{sides}-sided dice roll for {amount} times",
@@ -155,7 +170,7 @@ class Fun(commands.Cog):
                 await ctx.send("Amount too high, please lower it.")
                 return
         except Exception as e:
-            print(e)
+            log.exception("roll command failed")
             await ctx.send(f"An error occured:\n```{e}```")
 
 async def setup(bot):
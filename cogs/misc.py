@@ -1,6 +1,5 @@
 # type: ignore
 import sys
-import requests 
 import os
 from subprocess import run
 from typing import List, Union
@@ -12,6 +11,8 @@ from discord import app_commands
 from discord.ext import commands
 import psutil
 
+from core import sharding
+
 class HumanBytes:
     METRIC_LABELS: List[str] = ["B", "kB", "MB", "GB", "TB", "PB", "EB", "ZB", "YB"]
     BINARY_LABELS: List[str] = ["B", "KiB", "MiB", "GiB", "TiB", "PiB", "EiB", "ZiB", "YiB"]
@@ -58,6 +59,12 @@ class HumanBytes:
 
 size = HumanBytes.format
 
+def shard_latencies(bot: commands.Bot) -> str:
+    """One line per shard run by this process, empty if the bot isn't sharded"""
+    if not isinstance(bot, commands.AutoShardedBot):
+        return ""
+    return "\n".join(f"Shard {shard_id}: {latency * 1000:.1f} ms" for shard_id, latency in bot.latencies)
+
 class Misc(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
@@ -70,11 +77,21 @@ class Misc(commands.Cog):
     @app_commands.allowed_installs(guilds=True, users=True)
     @app_commands.allowed_contexts(guilds=True, dms=True, private_channels=True)
     async def ping(self, ctx: commands.Context):
+        description = f"-# **Latency**: {self.bot.latency * 1000:.1f} ms • **Memory usage**: {size(self.proc.memory_info().rss)}"
+        if isinstance(self.bot, commands.AutoShardedBot):
+            shard_id = ctx.guild.shard_id if ctx.guild else 0
+            shard = self.bot.get_shard(shard_id)
+            if shard is not None:
+                description += f"\n-# **Shard {shard_id}**: {shard.latency * 1000:.1f} ms • **Cluster**: {sharding.CLUSTER_ID}"
+
         embed = discord.Embed(
             color=discord.Color.green(),
             title="Pong!",
-            description=f"-# **Latency**: {self.bot.latency * 1000:.1f} ms • **Memory usage**: {size(self.proc.memory_info().rss)}"
+            description=description
         )
+        latencies = shard_latencies(self.bot)
+        if latencies:
+            embed.add_field(name="Shard Latencies", value=latencies[:1024])
         await ctx.send(embed=embed)
 
     @commands.hybrid_command(
@@ -97,6 +114,13 @@ class Misc(commands.Cog):
         embed.add_field(name="Uptime", value=f"<t:{psutil.boot_time():.0f}:R>")
         embed.add_field(name="Python Version", value=f"`{sys.version}`")
         embed.add_field(name="Discord.py Version", value=f"`{discord.__version__}`")
+        latencies = shard_latencies(self.bot)
+        if latencies:
+            embed.add_field(
+                name=f"Shards (Cluster {sharding.CLUSTER_ID}, {self.bot.shard_count} total)",
+                value=latencies[:1024],
+                inline=False
+            )
         await ctx.send(embed=embed, ephemeral=ephemeral)
 
     @commands.hybrid_command(
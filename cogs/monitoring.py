@@ -0,0 +1,207 @@
+# type: ignore
+import logging
+import os
+from datetime import datetime
+
+import discord
+from discord import app_commands
+from discord.ext import commands
+
+from core import cache, command_metrics, metrics, sharding, singleflight
+from core.watchdog import LoopWatchdog
+
+log = logging.getLogger(__name__)
+
+OWNER_ID = 277830029399031818
+
+
+class Monitoring(commands.Cog):
+    """Runtime health checks for the bot itself"""
+
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self.watchdog = LoopWatchdog(
+            threshold=float(os.environ.get("LOOP_STALL_THRESHOLD_MS", 250)) / 1000,
+            resolve_command=self.resolve_command,
+        )
+        self._command_codes = {}
+        self._metrics_runner = None
+        self._original_tree_on_error = None
+
+        loop_lag = metrics.registry.gauge("nyoetools_event_loop_lag_seconds", "Most recent event loop lag")
+        loop_lag.set_function(lambda: self.watchdog.last_lag)
+
+    async def cog_load(self):
+        if os.environ.get("LOOP_WATCHDOG", "1") != "0":
+            self.watchdog.start()
+
+        command_metrics.install()
+        self._original_tree_on_error = self.bot.tree.on_error
+        self.bot.tree.on_error = self.on_app_command_error
+
+        port = int(os.environ.get("METRICS_PORT", 9464))
+        if port:
+            # Every cluster process gets its own port
+            port += sharding.CLUSTER_ID
+            try:
+                self._metrics_runner = await metrics.start_server(port=port)
+                log.info("Serving metrics on http://127.0.0.1:%d/metrics", port)
+            except OSError as e:
+                log.error("Failed to start metrics server: %s", e)
+
+    async def cog_unload(self):
+        self.watchdog.stop()
+        command_metrics.uninstall()
+        self.bot.tree.on_error = self._original_tree_on_error
+        if self._metrics_runner is not None:
+            await self._metrics_runner.cleanup()
+
+    def resolve_command(self, code):
+        """Map a stack frame's code object to the command whose callback it is"""
+        name = self._command_codes.get(code)
+        if name is None and not self._command_codes:
+            self._index_commands()
+            name = self._command_codes.get(code)
+        return name
+
+    def _index_commands(self):
+        codes = {}
+        for command in self.bot.walk_commands():
+            codes[command.callback.__code__] = command.qualified_name
+        for command in self.bot.tree.walk_commands():
+            if isinstance(command, app_commands.Command):
+                codes.setdefault(command.callback.__code__, command.qualified_name)
+        self._command_codes = codes
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        # All cogs are loaded by now, (re)build the callback lookup table
+        self._index_commands()
+
+    @commands.Cog.listener()
+    async def on_command(self, ctx: commands.Context):
+        origin = ctx.interaction or ctx.message
+        command_metrics.start(
+            command_metrics.context_key(ctx), "slash" if ctx.interaction else "prefix", origin.created_at
+        )
+
+    @commands.Cog.listener()
+    async def on_interaction(self, interaction: discord.Interaction):
+        if interaction.type == discord.InteractionType.application_command:
+            command_metrics.start(interaction.token, "slash", interaction.created_at)
+
+    @commands.Cog.listener()
+    async def on_command_completion(self, ctx: commands.Context):
+        command_metrics.finish(command_metrics.context_key(ctx), ctx.command.qualified_name)
+
+    @commands.Cog.listener()
+    async def on_command_error(self, ctx: commands.Context, error):
+        if ctx.command is not None:
+            command_metrics.finish(command_metrics.context_key(ctx), ctx.command.qualified_name, failed=True)
+
+    @commands.Cog.listener()
+    async def on_app_command_completion(self, interaction: discord.Interaction, command):
+        command_metrics.finish(interaction.token, command.qualified_name)
+
+    async def on_app_command_error(self, interaction: discord.Interaction, error):
+        command = interaction.command
+        command_metrics.finish(
+            interaction.token, command.qualified_name if command else "unknown", failed=True
+        )
+        await self._original_tree_on_error(interaction, error)
+
+    @commands.hybrid_command(
+        name="stalls",
+        description="Show the worst event loop stalls since startup (Owner Only)"
+    )
+    @app_commands.allowed_installs(guilds=True, users=True)
+    @app_commands.allowed_contexts(guilds=True, dms=True, private_channels=True)
+    async def stalls(self, ctx: commands.Context):
+        if ctx.author.id != OWNER_ID:
+            await ctx.send("Missing permissions.", ephemeral=True)
+            return
+
+        watchdog = self.watchdog
+        embed = discord.Embed(
+            title="Event loop stalls",
+            description=(
+                f"Threshold: {watchdog.threshold * 1000:.0f} ms • "
+                f"Max lag: {watchdog.max_lag * 1000:.0f} ms • "
+                f"Last lag: {watchdog.last_lag * 1000:.1f} ms"
+            ),
+            color=discord.Color.orange(),
+            timestamp=datetime.now()
+        )
+
+        offenders = watchdog.worst_offenders()
+        if not offenders:
+            embed.add_field(name="No stalls", value="Nothing blocked the loop so far.", inline=False)
+        for stall in offenders:
+            embed.add_field(
+                name=f"{stall.command or 'unknown command'} • worst {stall.worst * 1000:.0f} ms",
+                value=(
+                    f"`{stall.location or 'unknown location'}`\n"
+                    f"{stall.count}x, {stall.total * 1000:.0f} ms total"
+                ),
+                inline=False
+            )
+
+        if watchdog.started_at:
+            embed.set_footer(text="Watching since")
+            embed.timestamp = datetime.fromtimestamp(watchdog.started_at)
+
+        await ctx.send(embed=embed)
+
+    @commands.hybrid_command(
+        name="coalescing",
+        description="Show how many upstream requests were saved by coalescing (Owner Only)"
+    )
+    @app_commands.allowed_installs(guilds=True, users=True)
+    @app_commands.allowed_contexts(guilds=True, dms=True, private_channels=True)
+    async def coalescing(self, ctx: commands.Context):
+        if ctx.author.id != OWNER_ID:
+            await ctx.send("Missing permissions.", ephemeral=True)
+            return
+
+        embed = discord.Embed(title="Request coalescing", color=discord.Color.blue(), timestamp=datetime.now())
+        for name, group in sorted(singleflight.groups.items()):
+            embed.add_field(
+                name=name,
+                value=(
+                    f"Upstream: {group.misses} • Shared: {group.hits}\n"
+                    f"Saved: {group.hit_rate:.1%} • In flight: {group.in_flight}"
+                ),
+                inline=False
+            )
+        if not singleflight.groups:
+            embed.description = "No coalescing groups registered."
+
+        await ctx.send(embed=embed)
+
+    @commands.hybrid_command(
+        name="caches",
+        description="Show cache hit rates (Owner Only)"
+    )
+    @app_commands.allowed_installs(guilds=True, users=True)
+    @app_commands.allowed_contexts(guilds=True, dms=True, private_channels=True)
+    async def caches(self, ctx: commands.Context):
+        if ctx.author.id != OWNER_ID:
+            await ctx.send("Missing permissions.", ephemeral=True)
+            return
+
+        embed = discord.Embed(title="Caches", color=discord.Color.blue(), timestamp=datetime.now())
+        for name, entry in sorted(cache.caches.items()):
+            embed.add_field(
+                name=name,
+                value=f"Hits: {entry.hits} • Misses: {entry.misses}\nHit rate: {entry.hit_rate:.1%} • Entries: {len(entry)}",
+                inline=False
+            )
+        if not cache.caches:
+            embed.description = "No caches registered."
+
+        await ctx.send(embed=embed)
+
+
+async def setup(bot):
+    """Required setup function for cog loading"""
+    await bot.add_cog(Monitoring(bot))
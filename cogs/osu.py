@@ -1,17 +1,53 @@
 # type: ignore
 import discord
+from discord import app_commands
 from discord.ext import commands
+import asyncio
 import re
-import aiohttp
 import json
+import logging
 import os
 import dotenv
-from datetime import datetime, timedelta
+from datetime import datetime
+from typing import Optional
 from osrparse import Replay
 from osrparse.utils import GameMode
 
+from core.cache import TTLCache
+from core.singleflight import SingleFlight
+from osuapi.beatmap import BeatmapFiles
+from osuapi.cache import BeatmapsetCache
+from osuapi.client import BACKGROUND, INTERACTIVE, OsuClient
+from osuapi.difficulty import DifficultyCalculator, hits_for_accuracy, performance
+from osuapi.mods import decode_mods, parse_mods
+from osuapi.token import TokenManager
+
 dotenv.load_dotenv()
 
+log = logging.getLogger(__name__)
+
+# Base URL for the OAuth and API v2 endpoints
+OSU_API_URL = os.environ.get("OSU_API_URL", "https://osu.ppy.sh")
+
+# beatmapsets/<set id>, or b/<beatmap id> and beatmaps/<beatmap id> for a single difficulty
+BEATMAP_LINK = re.compile(r'beatmapsets/(\d+)|(?:\bb|beatmaps)/(\d+)')
+# A single difficulty: its id, b/<id>, beatmaps/<id> or beatmapsets/<set id>#osu/<id>
+DIFFICULTY_LINK = re.compile(r'^(\d+)$|(?:#osu|\bb|beatmaps)/(\d+)')
+# The bulk /beatmaps endpoint takes at most this many ids per request
+BULK_LIMIT = 50
+# Beatmapset lookups running at once for one message
+LOOKUP_CONCURRENCY = int(os.environ.get("OSU_LOOKUP_CONCURRENCY", 4))
+# Previews sent for one message, Discord fits 10 embeds in a message
+MAX_PREVIEWS = int(os.environ.get("OSU_MAX_PREVIEWS", 20))
+EMBEDS_PER_MESSAGE = 10
+# How often popular beatmapsets are refreshed ahead of their expiry, and how many at a time
+WARM_INTERVAL = int(os.environ.get("OSU_WARM_INTERVAL", 10 * 60))
+WARM_BATCH = 20
+# Seconds a beatmap that couldn't be found (or fetched) isn't asked for again
+NEGATIVE_TTL = int(os.environ.get("OSU_NEGATIVE_TTL", 120))
+# Seconds a preview is reused when the same map is linked in the channel again
+PREVIEW_WINDOW = int(os.environ.get("OSU_PREVIEW_WINDOW", 5 * 60))
+
 class OsuBeatmapView(discord.ui.View):
     def __init__(self, beatmap_data, beatmap_id):
         super().__init__(timeout=300)
@@ -34,60 +70,110 @@ class OsuBeatmapView(discord.ui.View):
 class OsuBeatmapConverter(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.client_id = os.environ.get("OSU_CLIENT_ID")
-        self.client_secret = os.environ.get("OSU_CLIENT_SECRET")
-        self.access_token = None
-        self.token_expires = None
-        self.session = None
+        self.tokens = TokenManager(
+            lambda: self.session,
+            f'{OSU_API_URL}/oauth/token',
+            os.environ.get("OSU_CLIENT_ID"),
+            os.environ.get("OSU_CLIENT_SECRET")
+        )
+        self.api = OsuClient(lambda: self.session, OSU_API_URL, self.tokens)
+        self.beatmapset_lookups = SingleFlight("osu_beatmapset")
+        self.beatmapsets = BeatmapsetCache()
+        self.warmer = None
+        # ("s", set id) / ("b", beatmap id) that came back missing or failed
+        self.missing = TTLCache("osu_missing", maxsize=4096, ttl=NEGATIVE_TTL)
+        # (channel id, "s"/"b", id) -> jump URL of the message that previewed it
+        self.recent_previews = TTLCache("osu_recent_previews", maxsize=4096, ttl=PREVIEW_WINDOW)
+        self.difficulty = DifficultyCalculator(BeatmapFiles(lambda: self.session, OSU_API_URL))
+        # Replays only know their beatmap by checksum, which never changes for a version of a map
+        self.checksums = TTLCache("osu_checksums", maxsize=1024, ttl=7 * 24 * 60 * 60)
 
     async def cog_load(self):
-        """Initialize aiohttp session when cog loads"""
-        self.session = aiohttp.ClientSession()
+        self.tokens.start()
+        self.warmer = asyncio.create_task(self.warm_cache())
+        self.bot.router.register("osu_beatmap", BEATMAP_LINK.pattern, self.preview_links, starts="b")
 
     async def cog_unload(self):
-        """Cleanup aiohttp session when cog unloads"""
-        if self.session and not self.session.closed:
-            await self.session.close()
+        self.bot.router.unregister("osu_beatmap")
+        self.tokens.stop()
+        if self.warmer:
+            self.warmer.cancel()
+        self.beatmapsets.close()
+
+    async def warm_cache(self):
+        """Refresh beatmapsets people keep asking for before they expire"""
+        while True:
+            await asyncio.sleep(WARM_INTERVAL)
+            # Anything expiring before the next round is fetched now, behind every interactive lookup
+            for beatmapset_id in self.beatmapsets.warm_candidates(WARM_INTERVAL, WARM_BATCH):
+                try:
+                    beatmap_data = await self._fetch_beatmapset_info(beatmapset_id, priority=BACKGROUND)
+                    if beatmap_data:
+                        await self.beatmapsets.set(beatmapset_id, beatmap_data)
+                except Exception:
+                    log.exception("Warming beatmapset %s failed", beatmapset_id)
+
+    @property
+    def session(self):
+        """The bot-wide pooled HTTP session"""
+        return self.bot.http_session
 
     async def get_access_token(self):
         """Get OAuth2 access token for osu! API v2"""
-        if self.access_token and self.token_expires and datetime.now() < self.token_expires:
-            return self.access_token
-
-        if not self.client_id or not self.client_secret:
-            return None
-
-        data = {
-            'client_id': self.client_id,
-            'client_secret': self.client_secret,
-            'grant_type': 'client_credentials',
-            'scope': 'public'
-        }
-
-        async with self.session.post('https://osu.ppy.sh/oauth/token', data=data) as resp:
-            if resp.status == 200:
-                token_data = await resp.json()
-                self.access_token = token_data['access_token']
-                self.token_expires = datetime.now() + timedelta(seconds=token_data['expires_in'] - 60)
-                return self.access_token
-            return None
+        return await self.tokens.get()
 
     async def get_beatmapset_info(self, beatmapset_id):
         """Fetch beatmapset information from osu! API v2"""
-        token = await self.get_access_token()
-        if not token:
+        beatmapset_id = int(beatmapset_id)
+        beatmap_data = await self.beatmapsets.get(beatmapset_id)
+        if beatmap_data is not None:
+            return beatmap_data
+        if self.missing.get(("s", beatmapset_id)):
             return None
 
-        headers = {
-            'Authorization': f'Bearer {token}',
-            'Content-Type': 'application/json',
-            'Accept': 'application/json'
-        }
-
-        async with self.session.get(f'https://osu.ppy.sh/api/v2/beatmapsets/{beatmapset_id}', headers=headers) as resp:
-            if resp.status == 200:
-                return await resp.json()
-            return None
+        # Identical lookups in flight at the same time (a link posted in a busy channel) share one request
+        return await self.beatmapset_lookups.do(beatmapset_id, self._lookup_beatmapset, beatmapset_id)
+
+    async def _lookup_beatmapset(self, beatmapset_id):
+        # Runs once per coalesced lookup, so only the leader writes the result to the cache
+        beatmap_data = await self._fetch_beatmapset_info(beatmapset_id)
+        if beatmap_data:
+            await self.beatmapsets.set(beatmapset_id, beatmap_data)
+        else:
+            self.missing.set(("s", beatmapset_id), True)
+        return beatmap_data
+
+    async def _fetch_beatmapset_info(self, beatmapset_id, priority=INTERACTIVE):
+        return await self.api.get(f'beatmapsets/{beatmapset_id}', priority=priority)
+
+    async def get_beatmaps(self, beatmap_ids):
+        """Fetch single difficulties in bulk, returns beatmap id -> beatmap"""
+        beatmap_ids = [beatmap_id for beatmap_id in beatmap_ids if not self.missing.get(("b", beatmap_id))]
+        if not beatmap_ids:
+            return {}
+
+        async def fetch(chunk):
+            data = await self.api.get('beatmaps', params=[('ids[]', beatmap_id) for beatmap_id in chunk])
+            return (data or {}).get('beatmaps', [])
+
+        chunks = [beatmap_ids[i:i + BULK_LIMIT] for i in range(0, len(beatmap_ids), BULK_LIMIT)]
+        results = await asyncio.gather(*(fetch(chunk) for chunk in chunks))
+        found = {beatmap['id']: beatmap for beatmaps in results for beatmap in beatmaps}
+        for beatmap_id in beatmap_ids:
+            if beatmap_id not in found:
+                self.missing.set(("b", beatmap_id), True)
+        return found
+
+    async def beatmap_id_for_checksum(self, checksum):
+        """The beatmap id for a .osu file's MD5 (what replays store), None if the API doesn't know it"""
+        beatmap_id = self.checksums.get(checksum)
+        if beatmap_id is None:
+            beatmap = await self.api.get('beatmaps/lookup', params={'checksum': checksum})
+            if not beatmap:
+                return None
+            beatmap_id = beatmap['id']
+            self.checksums.set(checksum, beatmap_id)
+        return beatmap_id
 
     def create_beatmap_embed(self, beatmap_data, beatmap_id):
         """Create a rich embed with beatmap information"""
@@ -129,45 +215,197 @@ class OsuBeatmapConverter(commands.Cog):
         embed.set_footer(text=f"Beatmapset ID: {beatmap_id}")
         return embed
 
-    def create_fallback_embed(self, beatmap_id):
+    def create_compact_embed(self, beatmap_data, beatmap_id):
+        """Create a one-line embed for messages with several beatmaps"""
+        embed = discord.Embed(
+            title=f"{beatmap_data['artist']} - {beatmap_data['title']}",
+            url=f"https://osu.ppy.sh/s/{beatmap_id}",
+            description=(
+                f"👤 {beatmap_data['creator']} • ⭐ {beatmap_data['status'].replace('_', ' ').title()} • "
+                f"🎯 {beatmap_data.get('bpm', 'N/A')} BPM • 🎮 {len(beatmap_data.get('beatmaps', []))} diffs"
+            ),
+            color=0xff69b4
+        )
+        if beatmap_data.get('covers', {}).get('list'):
+            embed.set_thumbnail(url=beatmap_data['covers']['list'])
+        return embed
+
+    def create_fallback_embed(self, beatmap_id, link="s"):
         """Create a simple embed when API data is not available"""
         embed = discord.Embed(
             title="🎵 Beatmap Found!",
             description=f"Found a beatmap with ID: {beatmap_id}",
-            url=f"https://osu.ppy.sh/s/{beatmap_id}",
+            url=f"https://osu.ppy.sh/{link}/{beatmap_id}",
             color=0x00ff00
         )
-        embed.add_field(name="🌐 View Online", value=f"[Click here](https://osu.ppy.sh/s/{beatmap_id})", inline=False)
-        embed.set_footer(text=f"Beatmapset ID: {beatmap_id}")
+        embed.add_field(name="🌐 View Online", value=f"[Click here](https://osu.ppy.sh/{link}/{beatmap_id})", inline=False)
+        embed.set_footer(text=f"Beatmapset ID: {beatmap_id}" if link == "s" else f"Beatmap ID: {beatmap_id}")
         return embed
 
-    @commands.Cog.listener()
-    async def on_message(self, message):
-        if message.author == self.bot.user:
+    def parse_links(self, content):
+        """Every distinct beatmap link in a message as ("s", set id) or ("b", beatmap id)"""
+        links = []
+        for match in BEATMAP_LINK.finditer(content):
+            set_id, beatmap_id = match.groups()
+            links.append(("s", int(set_id)) if set_id else ("b", int(beatmap_id)))
+        return list(dict.fromkeys(links))
+
+    async def resolve_links(self, links):
+        """
+        Look up parsed links all at once.
+        Returns (link, beatmapset id, beatmapset data) per beatmapset, data is None when the lookup failed
+        and the id is None when a single beatmap link couldn't be resolved to its set.
+        """
+        try:
+            beatmaps = await self.get_beatmaps([link_id for link, link_id in links if link == "b"])
+        except Exception:
+            log.exception("Error fetching beatmaps")
+            beatmaps = {}
+
+        # Several difficulties of one set (or the set itself) only get one preview
+        targets = {}
+        for link, link_id in links:
+            set_id = link_id if link == "s" else beatmaps.get(link_id, {}).get('beatmapset_id')
+            targets.setdefault(set_id or ("b", link_id), (link, link_id, set_id))
+
+        semaphore = asyncio.Semaphore(LOOKUP_CONCURRENCY)
+
+        async def lookup(link, link_id, set_id):
+            if set_id is None:
+                return link, link_id, None, None
+            async with semaphore:
+                try:
+                    return link, link_id, set_id, await self.get_beatmapset_info(set_id)
+                except Exception:
+                    log.exception("Error fetching beatmap %s", set_id)
+                    return link, link_id, set_id, None
+
+        return await asyncio.gather(*(lookup(*target) for target in targets.values()))
+
+    def remember_preview(self, channel_id, sent, link, link_id, set_id):
+        self.recent_previews.set((channel_id, link, link_id), sent.jump_url)
+        if set_id:
+            self.recent_previews.set((channel_id, "s", set_id), sent.jump_url)
+
+    async def preview_links(self, message, links):
+        """Post previews for the beatmap links the message router found"""
+        channel_id = message.channel.id
+        links = self.parse_links(" ".join(links))
+
+        # Maps previewed in this channel a moment ago just get a link to that preview
+        recent, fresh = [], []
+        for link, link_id in links:
+            jump_url = self.recent_previews.get((channel_id, link, link_id))
+            if jump_url:
+                recent.append(jump_url)
+            else:
+                fresh.append((link, link_id))
+
+        results = []
+        if fresh:
+            results = await self.resolve_links(fresh)
+            # A difficulty link resolves to its set only now
+            for result in list(results):
+                link, link_id, set_id, beatmap_data = result
+                jump_url = set_id and self.recent_previews.get((channel_id, "s", set_id))
+                if jump_url:
+                    recent.append(jump_url)
+                    self.recent_previews.set((channel_id, link, link_id), jump_url)
+                    results.remove(result)
+
+        recent = list(dict.fromkeys(recent))
+        note = "🔁 Previewed just now: " + " ".join(recent[:5]) if recent else None
+        if not results:
+            await message.reply(note, mention_author=False)
             return
 
-        pattern = r'(?:beatmapsets|b)/(\d+)'
-        matches = re.findall(pattern, message.content)
+        shown = results[:MAX_PREVIEWS]
+        if len(shown) == 1:
+            link, link_id, set_id, beatmap_data = shown[0]
+            if beatmap_data:
+                embed = self.create_beatmap_embed(beatmap_data, set_id)
+                view = OsuBeatmapView(beatmap_data, set_id)
+            elif set_id:
+                embed = self.create_fallback_embed(set_id)
+                view = OsuBeatmapView(None, set_id)
+            else:
+                embed = self.create_fallback_embed(link_id, link)
+                view = None
+            sent = await message.channel.send(note, embed=embed, view=view)
+            self.remember_preview(channel_id, sent, link, link_id, set_id)
+            return
 
-        if matches:
-            for beatmap_id in matches:
-                try:
-                    beatmap_data = await self.get_beatmapset_info(beatmap_id)
+        # A whole list of maps: one compact embed each, ten to a message
+        embeds = []
+        for link, link_id, set_id, beatmap_data in shown:
+            if beatmap_data:
+                embeds.append(self.create_compact_embed(beatmap_data, set_id))
+            else:
+                embeds.append(self.create_fallback_embed(set_id or link_id, "s" if set_id else link))
+
+        for start in range(0, len(embeds), EMBEDS_PER_MESSAGE):
+            last = start + EMBEDS_PER_MESSAGE >= len(embeds)
+            lines = []
+            if last and len(results) > len(shown):
+                lines.append(f"...and {len(results) - len(shown)} more")
+            if last and note:
+                lines.append(note)
+            sent = await message.channel.send("\n".join(lines) or None, embeds=embeds[start:start + EMBEDS_PER_MESSAGE])
+            for result in shown[start:start + EMBEDS_PER_MESSAGE]:
+                self.remember_preview(channel_id, sent, *result[:3])
+
+    @commands.hybrid_command(
+        name="pp",
+        description="Estimate star rating and pp for a beatmap with mods"
+    )
+    @app_commands.describe(
+        beatmap="Beatmap ID or link to a difficulty",
+        mods="Mods like HDDT (default: none)",
+        accuracy="Accuracy in percent (default: 100)",
+        misses="Number of misses",
+        combo="Max combo (default: full combo)"
+    )
+    @app_commands.allowed_installs(guilds=True, users=True)
+    @app_commands.allowed_contexts(guilds=True, dms=True, private_channels=True)
+    async def pp(self, ctx: commands.Context, beatmap: str, mods: str = "NM",
+                 accuracy: app_commands.Range[float, 0, 100] = 100.0,
+                 misses: app_commands.Range[int, 0] = 0, combo: Optional[app_commands.Range[int, 0]] = None):
+        match = DIFFICULTY_LINK.search(beatmap.strip())
+        if not match:
+            await ctx.send("❌ Give me a beatmap ID or a link to a difficulty (not just the set).")
+            return
+        try:
+            mods_int = parse_mods(mods)
+        except ValueError as e:
+            await ctx.send(f"❌ {e}")
+            return
 
-                    if beatmap_data:
-                        embed = self.create_beatmap_embed(beatmap_data, beatmap_id)
-                        view = OsuBeatmapView(beatmap_data, beatmap_id)
-                        await message.channel.send(embed=embed, view=view)
-                    else:
-                        embed = self.create_fallback_embed(beatmap_id)
-                        view = OsuBeatmapView(None, beatmap_id)
-                        await message.channel.send(embed=embed, view=view)
-
-                except Exception as e:
-                    embed = self.create_fallback_embed(beatmap_id)
-                    view = OsuBeatmapView(None, beatmap_id)
-                    await message.channel.send(embed=embed, view=view)
-                    print(f"Error fetching beatmap {beatmap_id}: {e}")
+        await ctx.defer()
+        beatmap_id = int(match.group(1) or match.group(2))
+        attributes = await self.difficulty.attributes(beatmap_id, mods_int)
+        if attributes is None:
+            await ctx.send(f"❌ Couldn't get an osu!standard beatmap with ID {beatmap_id}.")
+            return
+
+        n300, n100, n50 = hits_for_accuracy(attributes.objects, accuracy, misses)
+        pp = performance(attributes, mods_int, n300, n100, n50, misses, combo)
+        fc_pp = performance(attributes, mods_int, n300 + misses, n100, n50)
+
+        embed = discord.Embed(
+            title=attributes.name,
+            url=f"https://osu.ppy.sh/b/{beatmap_id}",
+            color=0xff69b4
+        )
+        embed.add_field(name="⭐ Stars (est.)", value=f"~{attributes.stars:.2f}", inline=True)
+        embed.add_field(name="💯 PP (est.)", value=f"~{pp:.0f}pp", inline=True)
+        if misses or (combo is not None and combo < attributes.max_combo):
+            embed.add_field(name="✨ If FC (est.)", value=f"~{fc_pp:.0f}pp", inline=True)
+        embed.add_field(name="🎯 Accuracy", value=f"{accuracy:.2f}% ({n300}/{n100}/{n50}/{misses})", inline=True)
+        embed.add_field(name="🔥 Combo", value=f"{attributes.max_combo if combo is None else combo}/{attributes.max_combo}x", inline=True)
+        embed.add_field(name="🎮 Mods", value=decode_mods(mods_int), inline=True)
+        embed.set_footer(text=f"AR {attributes.ar:.1f} • OD {attributes.od:.1f} • CS {attributes.cs:.1f} • Aim {attributes.aim:.2f} • Speed {attributes.speed:.2f} • "
+                              "Classic ppv2 estimate, may differ from osu!")
+        await ctx.send(embed=embed)
 
 async def setup(bot):
     """Required setup function for cog loading"""
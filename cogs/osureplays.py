@@ -2,38 +2,16 @@
 import discord
 from discord import app_commands
 from discord.ext import commands
+import logging
 import os
 import re
 from osrparse import Replay
+from osrparse.utils import GameMode
 
-def calculate_mods(mods: list):
-    return sum(MOD_VALUES.get(mod, 0) for mod in mods)
+from osuapi.difficulty import performance
+from osuapi.mods import MOD_VALUES, calculate_mods, decode_mods
 
-MOD_VALUES = {
-    "NF": 1,
-    "EZ": 2,
-    "HD": 8,
-    "HR": 16,
-    "SD": 32,
-    "DT": 64,
-    "RX": 128,
-    "HT": 256,
-    "NC": 576,
-    "FL": 1024,
-    "SO": 4096,
-    "PF": 16416
-}
-
-def decode_mods(mods_int):
-    """Decode the mods integer into a readable mod string."""
-    if mods_int == 0:
-        return "+NM"
-    mods_list = []
-    for mod, value in sorted(MOD_VALUES.items(), key=lambda x: -x[1]): # Sorts by value descending
-        if mods_int & value: # Checks if the mod is active
-            mods_list.append(mod)
-            mods_int -= value
-    return "+" + "".join(mods_list)
+log = logging.getLogger(__name__)
 
 class OsuReplayData(commands.Cog):
     def __init__(self, bot):
@@ -74,13 +52,43 @@ class OsuReplayData(commands.Cog):
             embed.add_field(name="50s", value=replay.count_50, inline=True)
             embed.add_field(name="Misses", value=replay.count_miss, inline=True)
             embed.add_field(name="Mods", value=mods_display, inline=True)
+
+            if replay.mode == GameMode.STD:
+                await self.add_difficulty(embed, replay)
             
             await ctx.send(embed=embed)
             return
             
         except Exception as e:
             await ctx.send("An error occured, check the logs for more info.")
-            print(e)
+            log.exception("replayinfo command failed")
+
+    async def add_difficulty(self, embed, replay):
+        """Estimated (classic ppv2) stars and pp of the play, if the beatmap can be found from the replay's checksum"""
+        osu = self.bot.get_cog("OsuBeatmapConverter")
+        if osu is None:
+            return
+        try:
+            beatmap_id = await osu.beatmap_id_for_checksum(replay.beatmap_hash)
+            if beatmap_id is None:
+                return
+            mods_int = int(replay.mods)
+            attributes = await osu.difficulty.attributes(beatmap_id, mods_int, replay.beatmap_hash)
+            if attributes is None:
+                return
+        except Exception:
+            log.exception("Looking up the replay's beatmap failed")
+            return
+
+        pp = performance(
+            attributes, mods_int, replay.count_300, replay.count_100, replay.count_50,
+            replay.count_miss, replay.max_combo
+        )
+        fc_pp = performance(attributes, mods_int, replay.count_300 + replay.count_miss, replay.count_100, replay.count_50)
+        embed.add_field(name="Beatmap", value=f"[{attributes.name}](https://osu.ppy.sh/b/{beatmap_id})", inline=False)
+        embed.add_field(name="Stars (est.)", value=f"~{attributes.stars:.2f}", inline=True)
+        embed.add_field(name="PP (est.)", value=f"~{pp:.2f}", inline=True)
+        embed.add_field(name="PP if FC (est.)", value=f"~{fc_pp:.2f}", inline=True)
 
 async def setup(bot):
     """Required setup function for cog loading"""
@@ -1,29 +1,45 @@
 # type: ignore
 import base64
+import functools
 import json
+import logging
 import os
 import re
 from datetime import datetime, timedelta
 from typing import Optional, Union
 
-import deepl
 import discord
 from discord import app_commands
 from discord.ext import commands
 import pytz
-import requests
-import pytesseract
+import aiohttp
+import asyncio
 import io
-import dns.resolver
-import whois
-from openai import OpenAI
-from requests import HTTPError
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from PIL import Image
+
+from core import tree_sync
+from core.singleflight import SingleFlight
+from core.store import JsonStore
+from core.lazy import lazy_import
+
+# Heavy third-party modules are only imported on first use (or by the warm-up task)
+deepl = lazy_import("deepl")
+pytesseract = lazy_import("pytesseract")
+dns_resolver = lazy_import("dns.resolver")
+openai = lazy_import("openai")
+webdriver = lazy_import("selenium.webdriver")
+selenium_ui = lazy_import("selenium.webdriver.support.ui")
+Image = lazy_import("PIL.Image")
+
+log = logging.getLogger(__name__)
+
+# Upstream API base URLs, overridable so the bot can be pointed at local stand-ins
+GITHUB_API_URL = os.environ.get("GITHUB_API_URL", "https://api.github.com")
+MOJANG_API_URL = os.environ.get("MOJANG_API_URL", "https://api.mojang.com")
+URBAN_API_URL = os.environ.get("URBAN_API_URL", "https://unofficialurbandictionaryapi.com")
+HTTPCAT_URL = os.environ.get("HTTPCAT_URL", "https://http.cat")
+
+# Per-user settings (timezones), shared safely between cluster processes
+users_store = JsonStore(os.environ.get("USERS_FILE", "/root/noemi/nyoetools.py/users.json"))
 
 tld_cache = {}
 
@@ -36,10 +52,10 @@ def is_valid_tld(tld):
     try:
         # Try to get the NS (nameserver) records for the TLD
         # If it exists, it will have nameservers
-        dns.resolver.resolve(tld + '.', 'NS')
+        dns_resolver.resolve(tld + '.', 'NS')
         tld_cache[tld] = True
         return True
-    except (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer, dns.resolver.NoNameservers):
+    except (dns_resolver.NXDOMAIN, dns_resolver.NoAnswer, dns_resolver.NoNameservers):
         # TLD doesn't exist
         tld_cache[tld] = False
         return False
@@ -47,17 +63,25 @@ def is_valid_tld(tld):
         # If there's any other error, assume it might exist (be cautious)
         return True
 
-def get_repo_languages(owner, repo):
-    url = f"https://api.github.com/repos/{owner}/{repo}/languages"
+repo_language_lookups = SingleFlight("github_languages")
+
+async def get_repo_languages(session: aiohttp.ClientSession, owner, repo):
+    # GitHub owner and repo names are case insensitive
+    return await repo_language_lookups.do(
+        (owner.lower(), repo.lower()), _fetch_repo_languages, session, owner, repo
+    )
+
+async def _fetch_repo_languages(session: aiohttp.ClientSession, owner, repo):
+    url = f"{GITHUB_API_URL}/repos/{owner}/{repo}/languages"
 
     try:
-        response = requests.get(url)
-        response.raise_for_status()
+        async with session.get(url) as response:
+            response.raise_for_status()
 
-        return response.json()
+            return await response.json()
 
-    except requests.exceptions.RequestException as e:
-        print(f"Error fetching data: {e}")
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        log.warning("Error fetching repo languages for %s/%s: %s", owner, repo, e)
         return None
 
 
@@ -128,6 +152,18 @@ async def fix_bsky(message: discord.Message, link: str):
     await message.edit(suppress=True)
 
 
+# Links whose embeds get fixed, earlier sites win when a message has several.
+# Routed through core.router, so the patterns must not have named groups
+EMBED_FIXES = (
+    ("twitter", r"https://(?:www.)?(?:twitter|x)\.com/[a-zA-Z0-9_]+/status/[0-9]+", fix_twitter),
+    ("pixiv", r"https://(?:www.)?pixiv\.net/en/artworks/[0-9]+", fix_pixiv),
+    ("reddit", r"https://(?:www.)?reddit\.com/r/[^/]+/(?:comments|s)/[a-zA-Z0-9]+/?", fix_reddit),
+    ("insta", r"https?://(?:www\.)?instagram\.com/(?:p/[a-zA-Z0-9_-]+|reel/[a-zA-Z0-9_-]+|[a-zA-Z0-9._-]+)/?(?:\?[^\s]*)?", fix_insta),
+    ("bsky", r"https?://bsky\.app/[^\s]+", fix_bsky),
+    ("tiktok", r"https://(?:m|www|vm)?\.?tiktok\.com/(?:[^\s]*\b(?:(?:usr|v|embed|user|video)/|\?shareId=|&item_id=)\d+|\w+)/[^\s]*", fix_tiktok),
+)
+
+
 encodings = {
     "Base16": 'base64.b16encode("{0}".encode("utf-8")).decode("utf-8")',
     "Base32": 'base64.b32encode("{0}".encode("utf-8")).decode("utf-8")',
@@ -147,37 +183,31 @@ decodings = {
 class Utils(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        self.twitter_pattern = re.compile(
-            r"(https://(www.)?(twitter|x)\.com/[a-zA-Z0-9_]+/status/[0-9]+)"
-        )
-        self.pixiv_pattern = re.compile(
-            r"(https://(www.)?(pixiv)\.net/en/artworks/[0-9]+)"
-        )
-        self.reddit_pattern = re.compile(
-            r"(https://(www.)?(reddit)\.com/r/[^/]+/(?:comments|s)/[a-zA-Z0-9]+/?)"
-        )
-        self.insta_pattern = re.compile(
-            r"https?:\/\/(www\.)?instagram\.com\/(p\/[a-zA-Z0-9_-]+|reel\/[a-zA-Z0-9_-]+|[a-zA-Z0-9._-]+)\/?(\?[^\s]*)?"
-        )
-        self.bsky_pattern = re.compile(r"https?:\/\/bsky\.app\/[^\s]+")
-        self.tiktok_pattern = re.compile(
-            r"^.*https:\/\/(?:m|www|vm)?\.?tiktok\.com\/((?:.*\b(?:(?:usr|v|embed|user|video)\/|\?shareId=|\&item_id=)(\d+))|\w+)\/.*"
-        )
+
+    async def cog_load(self):
+        for name, pattern, fixer in EMBED_FIXES:
+            self.bot.router.register(name, pattern, functools.partial(self.fix_embed, fixer), group="embed_fix", starts="h")
+
+    async def cog_unload(self):
+        for name, _, _ in EMBED_FIXES:
+            self.bot.router.unregister(name)
 
     @commands.hybrid_command(
         name="sync",
         description="Sync Command (Owner Only)"
     )
+    @app_commands.describe(force="Sync even if the command schema didn't change")
     @app_commands.allowed_installs(guilds=True, users=True)
     @app_commands.allowed_contexts(guilds=True, dms=True, private_channels=True)
-    async def sync(self, ctx: commands.Context):
+    async def sync(self, ctx: commands.Context, force: bool = False):
         if not ctx.author or ctx.author.id == 277830029399031818:
-            print("=" * 50)
-            print("Synchronizing Slash Commands, Please wait.")
-            print("=" * 50)
+            log.info("Synchronizing Slash Commands, Please wait.")
             await ctx.defer()
-            await self.bot.tree.sync()
-            await ctx.send("Successfully synchronized Slash Commands.")
+            synced = await tree_sync.sync_if_changed(self.bot.tree, force=force)
+            if synced is None:
+                await ctx.send("Command schema unchanged, no sync needed. Use `force` to sync anyway.")
+            else:
+                await ctx.send(f"Successfully synchronized {len(synced)} Slash Commands.")
         else:
             await ctx.send("Missing permissions.", ephemeral=True)
 
@@ -200,7 +230,7 @@ class Utils(commands.Cog):
 
         if not ctx.author:
             return
-        base_url = "https://api.github.com/repos/"
+        base_url = f"{GITHUB_API_URL}/repos/"
         query = ""
         username = ctx.author.name
 
@@ -208,13 +238,15 @@ class Utils(commands.Cog):
 
         await ctx.defer()
 
-        response = None
+        status = None
         try:
-            response = requests.get(base_url + query, timeout=10)
-
-            if response.status_code == 200:
-                data = response.json()
+            async with self.bot.http_session.get(
+                base_url + query, timeout=aiohttp.ClientTimeout(total=10)
+            ) as response:
+                status = response.status
+                data = await response.json() if status == 200 else None
 
+            if status == 200:
                 commit = data["commit"]
                 author = data["author"]
 
@@ -246,9 +278,9 @@ class Utils(commands.Cog):
 
             await ctx.send(embed=embed)
             return
-        except HTTPError:
+        except aiohttp.ClientError:
             await ctx.send(
-                f"Error accessing GitHub: {response.status_code if response is not None else 'Unknown Error'}"
+                f"Error accessing GitHub: {status if status is not None else 'Unknown Error'}"
             )
             return
         except Exception as e:
@@ -274,7 +306,7 @@ class Utils(commands.Cog):
         await ctx.defer()
 
         try:
-            languages = get_repo_languages(user, repo)
+            languages = await get_repo_languages(self.bot.http_session, user, repo)
             if languages:
                 analysis = analyze_languages(languages)
                 sorted_langs = sorted(
@@ -316,15 +348,15 @@ class Utils(commands.Cog):
     @app_commands.allowed_installs(guilds=True, users=True)
     @app_commands.allowed_contexts(guilds=True, dms=True, private_channels=True)
     async def mcname(self, ctx: commands.Context, username: str):
-        url = f"https://api.mojang.com/users/profiles/minecraft/{username}"
+        url = f"{MOJANG_API_URL}/users/profiles/minecraft/{username}"
 
         try:
             await ctx.defer()
-            response = requests.get(url)
-
-            if response.status_code == 200:
-                data = response.json()
+            async with self.bot.http_session.get(url) as response:
+                status = response.status
+                data = await response.json(content_type=None) if status != 204 else {}
 
+            if status == 200:
                 if "name" in data:
                     await ctx.send(
                         f"The username `{data['name']}` is already taken."
@@ -336,7 +368,6 @@ class Utils(commands.Cog):
                     f"The username `{username}` is not available because it is too {'long' if len(username) > 16 else 'short'}."
                 )
             else:
-                data = response.json()
                 if (
                     "errorMessage" in data
                     and "Couldn't find any profile" in data["errorMessage"]
@@ -348,7 +379,7 @@ class Utils(commands.Cog):
                     )
         except Exception as e:
             await ctx.send("Error: Logs")
-            print(e)
+            log.exception("mcname command failed")
 
     @commands.hybrid_command(
         name="avatar",
@@ -384,7 +415,7 @@ class Utils(commands.Cog):
             await ctx.send(embed=embed)
         except Exception as e:
             await ctx.send(f"An error occured.\n```bash\n{e}```")
-            print(e)
+            log.exception("avatar command failed")
 
     @commands.hybrid_command(
         name="encode",
@@ -412,7 +443,7 @@ class Utils(commands.Cog):
             await ctx.send(f"```\n{encoded_message}\n```")
         except Exception as e:
             await ctx.send(f"An error occured.\n```bash\n{e}```")
-            print(e)
+            log.exception("encode command failed")
 
     @commands.hybrid_command(
         name="decode",
@@ -441,7 +472,7 @@ class Utils(commands.Cog):
             await ctx.send(f"```\n{decoded_message}\n```")
         except Exception as e:
             await ctx.send(f"An error occured.\n```bash\n{e}```")
-            print(e)
+            log.exception("decode command failed")
 
     @commands.hybrid_command(
         name="settimezone",
@@ -462,22 +493,12 @@ class Utils(commands.Cog):
         try:
             user_id = ctx.author.id
             username = ctx.author.name
-            users_file = "/root/noemi/nyoetools.py/users.json"
-            
-            # Create file if it doesn't exist
-            if not os.path.exists(users_file):
-                with open(users_file, "w") as f:
-                    json.dump({}, f)
-            
-            with open(users_file, "r") as f:
-                users = json.load(f)
-            users[str(user_id)] = {"timezone": timezone}
-            with open(users_file, "w") as f:
-                json.dump(users, f, indent=4)
+
+            await asyncio.to_thread(users_store.update, str(user_id), {"timezone": timezone})
             await ctx.send(f"Set timezone to {timezone} for user {username}.")
         except Exception as e:
             await ctx.send(f"An error occured.\n```bash\n{e}```")
-            print(e)
+            log.exception("settimezone command failed")
 
     @commands.hybrid_command(
         name="time",
@@ -498,14 +519,8 @@ class Utils(commands.Cog):
                 user_id = ctx.author.id
             else:
                 user_id = user.id
-            
-            users_file = "/root/noemi/nyoetools.py/users.json"
-            if not os.path.exists(users_file):
-                with open(users_file, "w") as f:
-                    json.dump({}, f)
-            
-            with open(users_file, "r") as f:
-                users = json.load(f)
+
+            users = await asyncio.to_thread(users_store.load)
             if str(user_id) not in users:
                 await ctx.send(
                     f"Please set your timezone using `/settimezone <timezone>`{f', {user.mention}' if user else ''}."
@@ -531,7 +546,7 @@ class Utils(commands.Cog):
             )
         except Exception as e:
             await ctx.send(f"An error occured.\n```bash\n{e}```")
-            print(e)
+            log.exception("time command failed")
 
     @commands.hybrid_command(
         name="urban",
@@ -545,16 +560,16 @@ class Utils(commands.Cog):
         ctx: commands.Context,
         term: str,
     ):
-        url = f"https://unofficialurbandictionaryapi.com/api/search?term={term}&strict=true&"
+        url = f"{URBAN_API_URL}/api/search?term={term}&strict=true&"
         formatted = url.replace(" ", "_")
 
         try:
             await ctx.defer()
-            response = requests.get(formatted)
-
-            if response.status_code == 200:
-                data = response.json()
+            async with self.bot.http_session.get(formatted) as response:
+                status = response.status
+                data = await response.json(content_type=None)
 
+            if status == 200:
                 if "found" in data:
                     result = data["data"][0]
 
@@ -581,14 +596,13 @@ class Utils(commands.Cog):
 
                 else:
                     await ctx.send(f"No Search Result for {term}")
-            elif response.status_code == 404:
-                data = response.json()
+            elif status == 404:
                 if "message" in data:
                     message = data["message"]
                     formatted2 = message.replace("this word", f"{term}")
                     await ctx.send(formatted2 + ".")
         except Exception as e:
-            print(e)
+            log.exception("urban command failed")
             await ctx.send(f"An error occured.\n```bash\n{e}```")
 
     @commands.hybrid_command(
@@ -605,10 +619,11 @@ class Utils(commands.Cog):
     ):
         await ctx.defer()
         try:
-            img = f"https://http.cat/{error_code}"
-            meow = requests.get(img)
+            img = f"{HTTPCAT_URL}/{error_code}"
+            async with self.bot.http_session.get(img) as meow:
+                status = meow.status
 
-            if meow.status_code == 200:
+            if status == 200:
                 if error_code == 0:
                     color = 0xFF00FF
                 if error_code >= 100 and error_code < 200:
@@ -632,7 +647,7 @@ class Utils(commands.Cog):
             else:
                 await ctx.send(f"The Error Code `{error_code}` is not valid.")
         except Exception as e:
-            print(e)
+            log.exception("httpcat command failed")
             await ctx.send(f"An error occured.\n```bash\n{e}```")
 
     @commands.hybrid_command(
@@ -664,10 +679,10 @@ class Utils(commands.Cog):
             embed.set_image(url=url)
 
             await ctx.send(embed=embed)
-        except HTTPError:
+        except aiohttp.ClientError:
             await ctx.send("The API is currently unavailable.")
         except Exception as e:
-            print(e)
+            log.exception("mcskin command failed")
             await ctx.send(f"An error occured:\n```bash\n{e}```")
 
     @commands.hybrid_command(
@@ -697,7 +712,7 @@ class Utils(commands.Cog):
                 url = "https://" + url
 
             # Configure Chrome options for headless mode
-            chrome_options = Options()
+            chrome_options = webdriver.ChromeOptions()
             chrome_options.add_argument("--headless")
             chrome_options.add_argument("--no-sandbox")
             chrome_options.add_argument("--disable-dev-shm-usage")
@@ -711,7 +726,7 @@ class Utils(commands.Cog):
 
             driver.get(url)
 
-            WebDriverWait(driver, 10).until(
+            selenium_ui.WebDriverWait(driver, 10).until(
                 lambda d: d.execute_script("return document.readyState") == "complete"
             )
 
@@ -735,7 +750,7 @@ class Utils(commands.Cog):
             await loading_msg.edit(embed=embed, attachments=[screenshot_file])
 
         except Exception as e:
-            print(e)
+            log.exception("screenshot command failed")
             error_embed = discord.Embed(
                 title="❌ Screenshot Failed",
                 description=f"An error occurred while taking the screenshot.",
@@ -802,7 +817,7 @@ class Utils(commands.Cog):
             await ctx.send(embed=embed)
 
         except Exception as e:
-            print(e)
+            log.exception("translate command failed")
             error_msg = str(e)
             if "not supported" in error_msg.lower():
                 await ctx.send(
@@ -824,7 +839,7 @@ class Utils(commands.Cog):
         await ctx.defer()
 
         try:
-            client = OpenAI(
+            client = openai.OpenAI(
                 api_key=os.environ["GROQ_API_KEY"],
                 base_url="https://api.groq.com/openai/v1",
             )
@@ -876,7 +891,7 @@ class Utils(commands.Cog):
                     await ctx.send(chunk)
         
         except Exception as e:
-            print(e)
+            log.exception("ask command failed")
             await ctx.send(f"An error occured:\n```bash\n{e}```")
 
     @commands.hybrid_command(
@@ -898,7 +913,7 @@ class Utils(commands.Cog):
 
             await ctx.send(f"```{text}```")
         except Exception as e:
-            print(e)
+            log.exception("ocr command failed")
             await ctx.send(f"An error occured:\n```bash\n{e}```")
 
     @commands.hybrid_command(
@@ -948,44 +963,24 @@ class Utils(commands.Cog):
         
         # Now check if domain is available
         try:
-            dns.resolver.resolve(domain, 'A')
+            dns_resolver.resolve(domain, 'A')
             await ctx.send(f"❌ The domain `{domain}` is already taken.")
-        except dns.resolver.NXDOMAIN:
+        except dns_resolver.NXDOMAIN:
             await ctx.send(f"✅ The domain `{domain}` appears to be available!")
-        except dns.resolver.NoAnswer:
+        except dns_resolver.NoAnswer:
             await ctx.send(f"❌ The domain `{domain}` is already taken.")
-        except dns.resolver.Timeout:
+        except dns_resolver.Timeout:
             await ctx.send(f"⚠️ The request timed out. Try again in a moment!")
         except Exception as e:
             await ctx.send(f"⚠️ Couldn't check the domain. Error:\n```bash\n{e}```")
         
 
-    @commands.Cog.listener()
-    async def on_message(self, message):
-        if message.author == self.bot.user:
-            return
-
+    async def fix_embed(self, fixer, message, links):
+        """Reply with a fixed embed for the first link of the highest priority site"""
         try:
-            message_content = message.content.strip("<>")
-            if twitter_match := self.twitter_pattern.search(message_content):
-                link = twitter_match.group(0)
-                await fix_twitter(message, link)
-            elif pixiv_match := self.pixiv_pattern.search(message_content):
-                link = pixiv_match.group(0)
-                await fix_pixiv(message, link)
-            elif reddit_match := self.reddit_pattern.search(message.content):
-                link = reddit_match.group(0)
-                await fix_reddit(message, link)
-            elif insta_match := self.insta_pattern.search(message.content):
-                link = insta_match.group(0)
-                await fix_insta(message, link)
-            elif bsky_match := self.bsky_pattern.search(message.content):
-                link = bsky_match.group(0)
-                await fix_bsky(message, link)
-            elif tiktok_match := self.tiktok_pattern.search(message.content):
-                link = tiktok_match.group(0)
-                await fix_tiktok(message, link)
+            await fixer(message, links[0])
         except Exception as e:
+            log.exception("Fixing embed link failed")
             await message.channel.send(f"An error occured:\n`{e}`")
 
 async def setup(bot):
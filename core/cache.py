@@ -0,0 +1,78 @@
+import time
+from collections import OrderedDict
+
+from core.metrics import registry
+
+lookups = registry.counter(
+    "nyoetools_cache_requests_total", "Cache lookups by result", ("cache", "result"))
+entries = registry.gauge(
+    "nyoetools_cache_entries", "Entries currently held in a cache", ("cache",))
+
+# name -> cache, for reporting
+caches = {}
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    An LRU cache whose entries also expire after `ttl` seconds.
+    Once it holds `maxsize` entries, the least recently used one is evicted.
+    """
+
+    def __init__(self, name: str, maxsize: int = 1024, ttl: float = 300):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        entries.set_function(lambda: len(self._data), cache=name)
+        caches[name] = self
+
+    def get(self, key, default=None):
+        item = self._data.get(key, _MISSING)
+        if item is not _MISSING:
+            expires, value = item
+            if expires > time.monotonic():
+                self._data.move_to_end(key)
+                self.hits += 1
+                lookups.inc(cache=self.name, result="hit")
+                return value
+            del self._data[key]
+
+        self.misses += 1
+        lookups.inc(cache=self.name, result="miss")
+        return default
+
+    def set(self, key, value, ttl: float = None):
+        self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def ttl_left(self, key):
+        """Seconds until the entry for key expires, None if there is none"""
+        item = self._data.get(key, _MISSING)
+        if item is _MISSING:
+            return None
+        return max(0.0, item[0] - time.monotonic())
+
+    def pop(self, key, default=None):
+        item = self._data.pop(key, _MISSING)
+        return default if item is _MISSING else item[1]
+
+    def clear(self):
+        self._data.clear()
+
+    def __contains__(self, key):
+        item = self._data.get(key, _MISSING)
+        return item is not _MISSING and item[0] > time.monotonic()
+
+    def __len__(self):
+        return len(self._data)
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
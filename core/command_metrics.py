@@ -0,0 +1,160 @@
+import functools
+import time
+from datetime import datetime, timezone
+
+import discord
+from discord.ext import commands
+
+from core.metrics import registry
+
+invocations = registry.counter(
+    "nyoetools_command_invocations_total", "Commands invoked", ("command", "type"))
+errors = registry.counter(
+    "nyoetools_command_errors_total", "Commands that raised an error", ("command", "type"))
+duration = registry.histogram(
+    "nyoetools_command_duration_seconds", "Total time from invocation to completion", ("command", "type"))
+time_to_defer = registry.histogram(
+    "nyoetools_command_time_to_defer_seconds", "Time until the command acknowledged the invocation", ("command", "type"))
+time_to_first_response = registry.histogram(
+    "nyoetools_command_time_to_first_response_seconds", "Time until the command sent its first actual reply",
+    ("command", "type"))
+
+# Invocations that haven't completed yet are dropped after this long
+MAX_AGE = 900
+
+
+class Invocation:
+    __slots__ = ("kind", "started", "acked", "responded")
+
+    def __init__(self, kind, started):
+        self.kind = kind
+        self.started = started
+        self.acked = None
+        self.responded = None
+
+
+# Keyed by interaction token for app commands (hybrid commands invoked as a
+# slash command included), and by message id for prefix commands
+_active = {}
+
+
+def context_key(ctx: commands.Context):
+    if ctx.interaction is not None:
+        return ctx.interaction.token
+    return ctx.message.id
+
+
+def start(key, kind, created_at: datetime = None):
+    """
+    Track an invocation. Timings count from created_at (the interaction's or message's
+    snowflake time) when given, so it doesn't matter whether the listener or the first
+    defer/reply gets here first.
+    """
+    if key in _active:
+        return
+    started = time.perf_counter()
+    if created_at is not None:
+        started -= max(0.0, (datetime.now(timezone.utc) - created_at).total_seconds())
+    _active[key] = Invocation(kind, started)
+    if len(_active) > 100:
+        _prune()
+
+
+def _prune():
+    cutoff = time.perf_counter() - MAX_AGE
+    for key in [k for k, v in _active.items() if v.started < cutoff]:
+        del _active[key]
+
+
+def mark_ack(key):
+    invocation = _active.get(key)
+    if invocation is not None and invocation.acked is None:
+        invocation.acked = time.perf_counter()
+
+
+def mark_response(key):
+    invocation = _active.get(key)
+    if invocation is not None and invocation.responded is None:
+        invocation.responded = time.perf_counter()
+        if invocation.acked is None:
+            invocation.acked = invocation.responded
+
+
+def finish(key, command_name, failed=False):
+    invocation = _active.pop(key, None)
+    if invocation is None:
+        return
+
+    labels = {"command": command_name, "type": invocation.kind}
+    invocations.inc(**labels)
+    # Always touch the error counter so the series exists before the first error
+    errors.inc(1 if failed else 0, **labels)
+    duration.observe(time.perf_counter() - invocation.started, **labels)
+    if invocation.acked is not None:
+        time_to_defer.observe(invocation.acked - invocation.started, **labels)
+    if invocation.responded is not None:
+        time_to_first_response.observe(invocation.responded - invocation.started, **labels)
+
+
+def _wrap(cls, name, marker, key_of, origin_of):
+    original = getattr(cls, name)
+    if getattr(original, "__metrics_wrapped__", False):
+        return
+
+    @functools.wraps(original)
+    async def wrapper(self, *args, **kwargs):
+        key = key_of(self)
+        if key is not None:
+            # Listeners run as tasks, a command that defers right away can get here before on_interaction did
+            origin = origin_of(self)
+            if origin is not None:
+                start(key, *origin)
+            marker(key)
+        return await original(self, *args, **kwargs)
+
+    wrapper.__metrics_wrapped__ = True
+    wrapper.__metrics_original__ = original
+    setattr(cls, name, wrapper)
+
+
+def _prefix_key(ctx):
+    # Hybrid commands invoked through an interaction are tracked via the interaction itself
+    return ctx.message.id if ctx.interaction is None else None
+
+
+def _interaction_origin(response):
+    interaction = response._parent
+    if interaction.type != discord.InteractionType.application_command:
+        return None
+    return "slash", interaction.created_at
+
+
+def _prefix_origin(ctx):
+    if ctx.command is None:
+        return None
+    return "prefix", ctx.message.created_at
+
+
+_patched = [
+    (discord.InteractionResponse, "defer", mark_ack, lambda r: r._parent.token, _interaction_origin),
+    (discord.InteractionResponse, "send_message", mark_response, lambda r: r._parent.token, _interaction_origin),
+    (discord.InteractionResponse, "edit_message", mark_response, lambda r: r._parent.token, _interaction_origin),
+    (discord.InteractionResponse, "send_modal", mark_response, lambda r: r._parent.token, _interaction_origin),
+    # Followups only ever come after the interaction response, which started the invocation
+    (discord.Webhook, "send", mark_response, lambda w: w.token, lambda w: None),
+    (commands.Context, "defer", mark_ack, _prefix_key, _prefix_origin),
+    (commands.Context, "send", mark_response, _prefix_key, _prefix_origin),
+]
+
+
+def install():
+    """Hook the response methods so time-to-defer and time-to-first-response can be measured"""
+    for cls, name, marker, key_of, origin_of in _patched:
+        _wrap(cls, name, marker, key_of, origin_of)
+
+
+def uninstall():
+    for cls, name, _, _, _ in _patched:
+        original = getattr(getattr(cls, name), "__metrics_original__", None)
+        if original is not None:
+            setattr(cls, name, original)
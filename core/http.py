@@ -0,0 +1,37 @@
+import os
+
+import aiohttp
+
+from core import log
+
+# Defaults for the shared HTTP client, all overridable via environment
+TOTAL_TIMEOUT = float(os.environ.get("HTTP_TIMEOUT", 15))
+CONNECT_TIMEOUT = float(os.environ.get("HTTP_CONNECT_TIMEOUT", 5))
+MAX_CONNECTIONS = int(os.environ.get("HTTP_MAX_CONNECTIONS", 100))
+MAX_CONNECTIONS_PER_HOST = int(os.environ.get("HTTP_MAX_CONNECTIONS_PER_HOST", 10))
+DNS_CACHE_TTL = int(os.environ.get("HTTP_DNS_CACHE_TTL", 300))
+KEEPALIVE_TIMEOUT = float(os.environ.get("HTTP_KEEPALIVE_TIMEOUT", 30))
+
+USER_AGENT = "nyoetools (https://github.com/nyoemii/nyoetools)"
+
+
+def create_session() -> aiohttp.ClientSession:
+    """
+    Create the bot-wide HTTP session. Every cog should use bot.http_session
+    instead of opening its own, so connections (and DNS lookups) are pooled
+    and kept alive across commands. Must be called from a running event loop.
+    """
+    connector = aiohttp.TCPConnector(
+        limit=MAX_CONNECTIONS,
+        limit_per_host=MAX_CONNECTIONS_PER_HOST,
+        use_dns_cache=True,
+        ttl_dns_cache=DNS_CACHE_TTL,
+        keepalive_timeout=KEEPALIVE_TIMEOUT,
+    )
+    timeout = aiohttp.ClientTimeout(total=TOTAL_TIMEOUT, connect=CONNECT_TIMEOUT)
+    return aiohttp.ClientSession(
+        connector=connector,
+        timeout=timeout,
+        headers={"User-Agent": USER_AGENT},
+        trace_configs=[log.http_trace_config()],
+    )
@@ -0,0 +1,86 @@
+import asyncio
+import importlib
+import logging
+import sys
+import time
+import types
+
+log = logging.getLogger(__name__)
+
+# module name -> seconds it took to import
+import_times = {}
+
+
+class LazyModule(types.ModuleType):
+    """Module proxy that only imports the real module on first attribute access."""
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.__dict__["_lazy_module"] = None
+
+    def _load(self):
+        module = self.__dict__["_lazy_module"]
+        if module is None:
+            module = load(self.__name__)
+            self.__dict__["_lazy_module"] = module
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        state = "loaded" if self.__dict__["_lazy_module"] is not None else "not loaded"
+        return f"<lazy module {self.__name__!r} ({state})>"
+
+
+# every module handed out by lazy_import(), in registration order
+_registry = {}
+
+
+def lazy_import(name: str) -> LazyModule:
+    """Return a proxy for `name` that imports it on first use."""
+    if name not in _registry:
+        _registry[name] = LazyModule(name)
+    return _registry[name]
+
+
+def load(name: str):
+    """Import a module now, recording how long it took."""
+    # Always go through import_module: it's a dict lookup once the import is done, and
+    # it waits on the import lock while warm_up is still importing the module in a thread
+    imported = name in sys.modules
+    start = time.perf_counter()
+    module = importlib.import_module(name)
+    if not imported:
+        import_times.setdefault(name, time.perf_counter() - start)
+    return module
+
+
+def pending() -> list:
+    """Names of lazy modules that haven't been imported yet."""
+    return [name for name in _registry if name not in sys.modules]
+
+
+async def warm_up(names=None):
+    """Import lazy modules one by one in a worker thread so first use is instant."""
+    for name in names or pending():
+        try:
+            await asyncio.to_thread(load, name)
+        except Exception as e:
+            log.warning("Failed to warm up %s: %s", name, e)
+
+
+def import_report() -> str:
+    """Table of recorded import times, slowest first."""
+    if not import_times:
+        return "No modules imported lazily yet."
+
+    width = max(len(name) for name in import_times)
+    lines = [f"{'Module'.ljust(width)}  Import time"]
+    for name, seconds in sorted(import_times.items(), key=lambda x: -x[1]):
+        lines.append(f"{name.ljust(width)}  {seconds * 1000:8.1f} ms")
+    lines.append(f"{'Total'.ljust(width)}  {sum(import_times.values()) * 1000:8.1f} ms")
+    return "\n".join(lines)
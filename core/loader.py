@@ -0,0 +1,135 @@
+import ast
+import asyncio
+import importlib.util
+import time
+
+
+class LoadTiming:
+    """
+    How long each stage of loading one extension took, in seconds. load_time is
+    load_extension itself (importing the module and running setup), minus cog_load.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.load_time = 0.0
+        self.cog_load_time = 0.0
+        self.error = None
+
+    @property
+    def total(self):
+        return self.load_time + self.cog_load_time
+
+
+def _depends_on(name: str) -> tuple:
+    """
+    The module level DEPENDS_ON tuple, read from the source so the module
+    isn't executed before load_extension runs it
+    """
+    spec = importlib.util.find_spec(name)
+    if spec is None or spec.origin is None:
+        raise ModuleNotFoundError(f"No extension named {name}")
+    with open(spec.origin, encoding="utf-8") as f:
+        tree = ast.parse(f.read(), spec.origin)
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(
+            isinstance(target, ast.Name) and target.id == "DEPENDS_ON" for target in node.targets
+        ):
+            return tuple(ast.literal_eval(node.value))
+    return ()
+
+
+async def load_extensions(bot, names):
+    """
+    Load extensions concurrently. An extension can list other extensions it
+    needs in a module level `DEPENDS_ON` tuple, those are loaded first.
+    Returns a LoadTiming per extension.
+    """
+    timings = {name: LoadTiming(name) for name in names}
+    depends_on = {}
+
+    for name in names:
+        try:
+            depends_on[name] = _depends_on(name)
+        except Exception as e:
+            timings[name].error = e
+
+    # Attribute time spent in add_cog (which awaits cog_load) to the owning extension
+    original_add_cog = bot.add_cog
+
+    async def timed_add_cog(cog, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await original_add_cog(cog, *args, **kwargs)
+        finally:
+            timing = timings.get(type(cog).__module__)
+            if timing is not None:
+                timing.cog_load_time += time.perf_counter() - start
+
+    tasks = {}
+
+    async def load(name):
+        timing = timings[name]
+        for dependency in depends_on[name]:
+            if dependency not in timings:
+                raise RuntimeError(f"depends on {dependency}, which isn't being loaded")
+            if dependency in tasks:
+                await tasks[dependency]
+            if timings[dependency].error is not None:
+                raise RuntimeError(f"dependency {dependency} failed to load")
+
+        start = time.perf_counter()
+        try:
+            await bot.load_extension(name)
+        finally:
+            timing.load_time = time.perf_counter() - start - timing.cog_load_time
+
+    async def run(name):
+        try:
+            await load(name)
+        except Exception as e:
+            timings[name].error = e
+
+    _check_cycles(depends_on)
+
+    bot.add_cog = timed_add_cog
+    try:
+        for name in depends_on:
+            tasks[name] = asyncio.ensure_future(run(name))
+        await asyncio.gather(*tasks.values())
+    finally:
+        del bot.add_cog
+
+    return list(timings.values())
+
+
+def _check_cycles(depends_on):
+    """Raise if the declared dependencies contain a cycle (it would deadlock)"""
+    visiting, done = set(), set()
+
+    def visit(name, path):
+        if name in done or name not in depends_on:
+            return
+        if name in visiting:
+            raise RuntimeError(f"Circular cog dependency: {' -> '.join(path + [name])}")
+        visiting.add(name)
+        for dependency in depends_on[name]:
+            visit(dependency, path + [name])
+        visiting.discard(name)
+        done.add(name)
+
+    for name in depends_on:
+        visit(name, [])
+
+
+def timing_table(timings) -> str:
+    """Render the per-extension load timings, slowest first"""
+    width = max([len(t.name) for t in timings] + [len("Extension")])
+    lines = [f"{'Extension'.ljust(width)}  {'load':>9}  {'cog_load':>9}  {'total':>9}"]
+    for t in sorted(timings, key=lambda t: -t.total):
+        lines.append(
+            f"{t.name.ljust(width)}  {t.load_time * 1000:7.1f}ms  "
+            f"{t.cog_load_time * 1000:7.1f}ms  {t.total * 1000:7.1f}ms"
+            + (f"  ✗ {t.error}" if t.error is not None else "")
+        )
+    return "\n".join(lines)
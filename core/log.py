@@ -0,0 +1,205 @@
+import atexit
+import contextvars
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+import aiohttp
+
+# Fields bound to the current command invocation, picked up by every record logged while it runs
+_context = contextvars.ContextVar("log_context", default=None)
+
+# Standard LogRecord attributes, anything else on a record came from `extra=`
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "taskName"}
+
+_listener = None
+
+
+def bind(**fields):
+    """Attach fields (command, user_id, ...) to every record logged from the current task"""
+    current = _context.get()
+    _context.set({**current, **fields} if current else fields)
+
+
+def clear():
+    _context.set(None)
+
+
+def bind_command(command_name, user, guild):
+    bind(
+        command=command_name,
+        user_id=user.id if user else None,
+        guild_id=guild.id if guild else None,
+        started=time.perf_counter(),
+    )
+
+
+async def bind_context(ctx):
+    """Bot.before_invoke hook for prefix and hybrid commands"""
+    bind_command(ctx.command.qualified_name if ctx.command else None, ctx.author, ctx.guild)
+
+
+async def bind_interaction(interaction) -> bool:
+    """CommandTree.interaction_check hook for app commands, never rejects anything"""
+    command = interaction.command
+    bind_command(command.qualified_name if command else None, interaction.user, interaction.guild)
+    return True
+
+
+class ContextFilter(logging.Filter):
+    """Copies the bound command context onto the record, in the thread that logged it"""
+
+    def filter(self, record):
+        context = _context.get()
+        if context:
+            for key, value in context.items():
+                if key == "started":
+                    record.duration_ms = round((time.perf_counter() - value) * 1000, 1)
+                elif not hasattr(record, key):
+                    setattr(record, key, value)
+        return True
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Lets the first of several identical warnings/errors through and drops the
+    repeats for `window` seconds. The next one let through carries the number
+    of records that were dropped in between as `suppressed`.
+    """
+
+    def __init__(self, window: float = 60.0, level: int = logging.WARNING):
+        super().__init__()
+        self.window = window
+        self.level = level
+        self._seen = {}
+        self._lock = threading.Lock()
+
+    def _key(self, record):
+        # The formatted message, so "... %s" logged for different URLs aren't treated as repeats
+        try:
+            message = record.getMessage()
+        except Exception:
+            message = str(record.msg)
+        exc_type = record.exc_info[0] if record.exc_info else None
+        return (
+            record.name,
+            record.levelno,
+            message,
+            exc_type.__name__ if exc_type else None,
+        )
+
+    def filter(self, record):
+        if record.levelno < self.level:
+            return True
+
+        key = self._key(record)
+        now = time.monotonic()
+        with self._lock:
+            first_seen, suppressed = self._seen.get(key, (None, 0))
+            if first_seen is not None and now - first_seen < self.window:
+                self._seen[key] = (first_seen, suppressed + 1)
+                return False
+            self._seen[key] = (now, 0)
+            if len(self._seen) > 1000:
+                cutoff = now - self.window
+                self._seen = {k: v for k, v in self._seen.items() if v[0] >= cutoff}
+
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        data = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED and not key.startswith("_"):
+                data[key] = value
+        if record.exc_text:
+            data["exc"] = record.exc_text
+        if record.stack_info:
+            data["stack"] = record.stack_info
+        return json.dumps(data, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    """Human readable output, with the structured fields appended as key=value"""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)-7s %(name)s: %(message)s", "%Y-%m-%d %H:%M:%S")
+
+    def format(self, record):
+        text = super().format(record)
+        fields = " ".join(
+            f"{key}={value}" for key, value in vars(record).items()
+            if key not in _RESERVED and not key.startswith("_")
+        )
+        if fields:
+            first_line, _, rest = text.partition("\n")
+            text = f"{first_line} [{fields}]" + (f"\n{rest}" if rest else "")
+        return text
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record):
+        # Render the message and traceback now, in the calling thread, but keep
+        # them as separate fields instead of the default merged text
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def setup_logging(level=None, fmt=None):
+    """
+    Route all logging through a queue so emitting a record never blocks on
+    stdout; a background thread does the formatting and writing.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    level = level or os.environ.get("LOG_LEVEL", "INFO")
+    fmt = fmt or os.environ.get("LOG_FORMAT", "json")
+
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(TextFormatter() if fmt == "text" else JsonFormatter())
+
+    log_queue = queue.SimpleQueue()
+    handler = _QueueHandler(log_queue)
+    handler.addFilter(RateLimitFilter(window=float(os.environ.get("LOG_DEDUPE_WINDOW", 60))))
+    handler.addFilter(ContextFilter())
+
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(level)
+
+    _listener = logging.handlers.QueueListener(log_queue, stream, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+
+def http_trace_config() -> aiohttp.TraceConfig:
+    """Records the status of the last upstream response in the log context"""
+
+    async def on_request_end(session, trace_context, params):
+        bind(upstream_status=params.response.status)
+
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_request_end.append(on_request_end)
+    return trace_config
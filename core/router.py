@@ -0,0 +1,107 @@
+import asyncio
+import logging
+import re
+
+from core.metrics import registry
+
+log = logging.getLogger(__name__)
+
+routed = registry.counter(
+    "nyoetools_router_messages_total",
+    "Messages seen by the router, result=skipped didn't pass the prefilter",
+    ("result",),
+)
+
+
+class Route:
+    __slots__ = ("name", "pattern", "handler", "group", "starts")
+
+    def __init__(self, name, pattern, handler, group, starts):
+        self.name = name
+        self.pattern = pattern
+        self.handler = handler
+        self.group = group
+        self.starts = starts
+
+
+class MessageRouter:
+    """
+    The one on_message listener for link handlers. Messages without a "/" (no link of
+    any kind) are dropped right away, the rest are scanned once by a single regex made
+    of every route's pattern as a named group, and each route that matched gets called
+    with its matches.
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.routes = {}
+        self._pattern = None
+
+    def register(self, name: str, pattern: str, handler, group: str = None, starts: str = None):
+        """
+        handler(message, links) is awaited with every match of pattern in the message.
+        Of the routes sharing a group only the first registered one that matched runs,
+        with its first match. Patterns may use plain groups but no named ones.
+        starts lists the characters a match can begin with, if every route gives them
+        the scan skips any other position without trying each pattern there.
+        """
+        self.routes[name] = Route(name, pattern, handler, group, starts)
+        self._pattern = None
+
+    def unregister(self, name: str):
+        if self.routes.pop(name, None) is not None:
+            self._pattern = None
+
+    @property
+    def pattern(self):
+        if self._pattern is None and self.routes:
+            combined = "|".join(f"(?P<{name}>{route.pattern})" for name, route in self.routes.items())
+            if all(route.starts for route in self.routes.values()):
+                starts = "".join(sorted(set("".join(route.starts for route in self.routes.values()))))
+                combined = f"(?=[{re.escape(starts)}])(?:{combined})"
+            self._pattern = re.compile(combined)
+        return self._pattern
+
+    def match(self, content: str) -> dict:
+        """route name -> matched links, for the routes that should handle content"""
+        # Every link has a slash, most chat messages don't
+        if "/" not in content or not self.routes:
+            return {}
+
+        found = {}
+        for match in self.pattern.finditer(content):
+            found.setdefault(match.lastgroup, []).append(match.group())
+        if not found:
+            return found
+
+        taken = set()
+        for name, route in self.routes.items():
+            if name not in found or route.group is None:
+                continue
+            if route.group in taken:
+                del found[name]
+            else:
+                taken.add(route.group)
+                found[name] = found[name][:1]
+        return found
+
+    async def dispatch(self, message):
+        if message.author == self.bot.user:
+            return
+
+        if "/" not in message.content:
+            routed.inc(result="skipped")
+            return
+
+        found = self.match(message.content)
+        routed.inc(result="matched" if found else "no_match")
+        if not found:
+            return
+
+        await asyncio.gather(*(self._run(self.routes[name], message, links) for name, links in found.items()))
+
+    async def _run(self, route, message, links):
+        try:
+            await route.handler(message, links)
+        except Exception:
+            log.exception("Message route %s failed", route.name)
@@ -0,0 +1,53 @@
+import os
+
+
+def parse_shard_ids(spec: str) -> list:
+    """Parse a shard id spec like "0-3,6,8-9" into a sorted list of ids"""
+    ids = set()
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        start, sep, end = part.partition("-")
+        if sep:
+            ids.update(range(int(start), int(end) + 1))
+        else:
+            ids.add(int(start))
+    return sorted(ids)
+
+
+def format_shard_ids(ids) -> str:
+    """Inverse of parse_shard_ids, collapsing consecutive ids into ranges"""
+    ids = sorted(ids)
+    parts = []
+    i = 0
+    while i < len(ids):
+        j = i
+        while j + 1 < len(ids) and ids[j + 1] == ids[j] + 1:
+            j += 1
+        parts.append(str(ids[i]) if i == j else f"{ids[i]}-{ids[j]}")
+        i = j + 1
+    return ",".join(parts)
+
+
+def split_shards(shard_count: int, clusters: int) -> list:
+    """Evenly split shard ids 0..shard_count-1 into `clusters` contiguous ranges"""
+    size, extra = divmod(shard_count, clusters)
+    ranges, start = [], 0
+    for i in range(clusters):
+        end = start + size + (1 if i < extra else 0)
+        ranges.append(list(range(start, end)))
+        start = end
+    return [r for r in ranges if r]
+
+
+# Set by launcher.py for each cluster process, all optional for a plain single-process run
+CLUSTER_ID = int(os.environ.get("CLUSTER_ID", 0))
+SHARD_COUNT = int(os.environ["SHARD_COUNT"]) if os.environ.get("SHARD_COUNT") else None
+SHARD_IDS = parse_shard_ids(os.environ["SHARD_IDS"]) if os.environ.get("SHARD_IDS") else None
+SHARDED = os.environ.get("BOT_SHARDED", "0") == "1" or SHARD_COUNT is not None
+
+
+def is_primary_cluster() -> bool:
+    """Only one process should do global work like syncing the command tree"""
+    return CLUSTER_ID == 0
@@ -0,0 +1,57 @@
+import asyncio
+
+from core.metrics import registry
+
+calls = registry.counter(
+    "nyoetools_singleflight_calls_total",
+    "Coalesced upstream calls, result=miss went upstream, result=hit shared an in-flight call",
+    ("group", "result"),
+)
+
+# name -> SingleFlight, for reporting
+groups = {}
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical calls: while a call for `key` is in
+    flight, further callers with the same key wait for it and get the same
+    result (or exception) instead of hitting the upstream again.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+        self._in_flight = {}
+        groups[name] = self
+
+    async def do(self, key, function, *args, **kwargs):
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.hits += 1
+            calls.inc(group=self.name, result="hit")
+        else:
+            self.misses += 1
+            calls.inc(group=self.name, result="miss")
+            # Run the call in its own task so one caller giving up doesn't cancel it for the others
+            task = asyncio.ensure_future(function(*args, **kwargs))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda t: self._done(key, t))
+        return await asyncio.shield(task)
+
+    def _done(self, key, task):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        if not task.cancelled():
+            # Mark the exception as retrieved in case every caller was cancelled
+            task.exception()
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._in_flight)
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
@@ -0,0 +1,57 @@
+import fcntl
+import json
+import os
+import pathlib
+import tempfile
+from contextlib import contextmanager
+
+
+class JsonStore:
+    """
+    A JSON file that several bot processes can share. Every access takes an
+    flock on a sidecar lock file and writes go through an atomic rename, so
+    clusters never see a half written file or lose each other's updates.
+    The methods block, call them through asyncio.to_thread.
+    """
+
+    def __init__(self, path):
+        self.path = pathlib.Path(path)
+        self.lock_path = self.path.with_name(self.path.name + ".lock")
+
+    @contextmanager
+    def _locked(self, exclusive: bool):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.lock_path, "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _read(self) -> dict:
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def load(self) -> dict:
+        with self._locked(exclusive=False):
+            return self._read()
+
+    def get(self, key, default=None):
+        return self.load().get(key, default)
+
+    def update(self, key, value):
+        """Set one key, re-reading the file under the lock so concurrent writers don't clobber each other"""
+        with self._locked(exclusive=True):
+            data = self._read()
+            data[key] = value
+            fd, tmp = tempfile.mkstemp(dir=self.path.parent, prefix=f".{self.path.name}.")
+            try:
+                with os.fdopen(fd, "w") as f:
+                    json.dump(data, f, indent=4)
+                os.replace(tmp, self.path)
+            except BaseException:
+                os.unlink(tmp)
+                raise
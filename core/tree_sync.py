@@ -0,0 +1,44 @@
+import hashlib
+import json
+import os
+import pathlib
+
+# Where the fingerprint of the last synced command tree is stored
+fingerprint_file = pathlib.Path(
+    os.environ.get("TREE_FINGERPRINT_FILE", pathlib.Path(__file__).parent.parent / ".tree_fingerprint")
+)
+
+
+def tree_fingerprint(tree) -> str:
+    """Hash the serialized app command tree so schema changes can be detected"""
+    payload = [command.to_dict(tree) for command in tree.get_commands()]
+    payload.sort(key=lambda c: (c.get("type", 1), c["name"]))
+    serialized = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+
+def stored_fingerprint():
+    try:
+        return fingerprint_file.read_text().strip() or None
+    except OSError:
+        return None
+
+
+def store_fingerprint(fingerprint: str):
+    tmp = fingerprint_file.with_suffix(".tmp")
+    tmp.write_text(fingerprint)
+    tmp.replace(fingerprint_file)
+
+
+async def sync_if_changed(tree, force: bool = False):
+    """
+    Sync the command tree only if its schema changed since the last sync.
+    Returns the list of synced commands, or None if the sync was skipped.
+    """
+    fingerprint = tree_fingerprint(tree)
+    if not force and fingerprint == stored_fingerprint():
+        return None
+
+    synced = await tree.sync()
+    store_fingerprint(fingerprint)
+    return synced
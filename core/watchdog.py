@@ -0,0 +1,145 @@
+import asyncio
+import logging
+import os
+import pathlib
+import sys
+import threading
+import time
+import traceback
+
+log = logging.getLogger(__name__)
+
+PROJECT_ROOT = str(pathlib.Path(__file__).parent.parent)
+
+
+def _is_project_file(filename: str) -> bool:
+    return (
+        filename.startswith(PROJECT_ROOT)
+        and "site-packages" not in filename
+        and filename != __file__
+    )
+
+
+class Stall:
+    """Aggregated stats for one offending (command, code location) pair"""
+
+    def __init__(self, command, location):
+        self.command = command
+        self.location = location
+        self.count = 0
+        self.total = 0.0
+        self.worst = 0.0
+        self.stack = None
+
+    def add(self, duration, stack):
+        self.count += 1
+        self.total += duration
+        if duration >= self.worst:
+            self.worst = duration
+            self.stack = stack
+
+
+class LoopWatchdog:
+    """
+    Measures event loop lag with a heartbeat task and samples the loop
+    thread's stack from a separate thread whenever the heartbeat is late
+    by more than `threshold` seconds, so the blocking code can be named.
+    """
+
+    def __init__(self, threshold: float = 0.25, interval: float = 0.05, resolve_command=None):
+        self.threshold = threshold
+        self.interval = interval
+        # Callable mapping a code object to a command name (or None)
+        self.resolve_command = resolve_command or (lambda code: None)
+        self.stalls = {}
+        self.max_lag = 0.0
+        self.last_lag = 0.0
+        self.started_at = None
+
+        self._last_beat = time.monotonic()
+        self._sample = None
+        self._sampled_beat = None
+        self._loop_thread_id = None
+        self._task = None
+        self._thread = None
+        self._stopping = threading.Event()
+
+    def start(self):
+        """Start watching the running event loop"""
+        if self._task is not None:
+            return
+        self.started_at = time.time()
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stopping.clear()
+        self._task = asyncio.create_task(self._heartbeat())
+        self._thread = threading.Thread(target=self._monitor, name="loop-watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopping.set()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _heartbeat(self):
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(0.0, now - expected)
+            self.last_lag = lag
+            self.max_lag = max(self.max_lag, lag)
+
+            sample, self._sample = self._sample, None
+            self._last_beat = now
+            if lag >= self.threshold:
+                self._record(lag, sample)
+
+    def _monitor(self):
+        """Runs in its own thread, so it still gets to run while the loop is blocked"""
+        while not self._stopping.wait(self.interval / 2):
+            beat = self._last_beat
+            if beat == self._sampled_beat:
+                continue
+            if time.monotonic() - beat - self.interval < self.threshold:
+                continue
+
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            self._sampled_beat = beat
+            self._sample = self._describe(frame)
+
+    def _describe(self, frame):
+        """Summarize a stack sample: (command name, innermost project frame, formatted stack)"""
+        command = None
+        location = None
+        f = frame
+        while f is not None:
+            if command is None:
+                command = self.resolve_command(f.f_code)
+            filename = f.f_code.co_filename
+            if location is None and _is_project_file(filename):
+                location = f"{os.path.relpath(filename, PROJECT_ROOT)}:{f.f_lineno} in {f.f_code.co_name}"
+            f = f.f_back
+
+        stack = "".join(traceback.format_stack(frame, limit=15))
+        return command, location, stack
+
+    def _record(self, lag, sample):
+        command, location, stack = sample or (None, None, None)
+        key = (command, location)
+        stall = self.stalls.get(key)
+        if stall is None:
+            stall = self.stalls[key] = Stall(command, location)
+        stall.add(lag, stack)
+
+        log.warning(
+            "Event loop blocked for %.0f ms",
+            lag * 1000,
+            extra={"command": command, "location": location, "lag_ms": round(lag * 1000, 1), "stack_sample": stack},
+        )
+
+    def worst_offenders(self, limit: int = 10):
+        return sorted(self.stalls.values(), key=lambda s: -s.worst)[:limit]
@@ -0,0 +1,140 @@
+"""
+Run the bot as several cluster processes, each owning a range of shards.
+
+    python launcher.py --shards 8 --clusters 2
+    python launcher.py --shards 8 --cluster 0-3 --cluster 4-7
+    python launcher.py --shards auto --clusters 4
+
+Each cluster is a normal `main.py` process started with SHARD_COUNT,
+SHARD_IDS and CLUSTER_ID set. Crashed clusters are restarted with backoff.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import pathlib
+import signal
+import sys
+
+import aiohttp
+import dotenv
+
+from core import log as logs
+from core.sharding import format_shard_ids, parse_shard_ids, split_shards
+
+log = logging.getLogger("nyoetools.launcher")
+
+MAIN = pathlib.Path(__file__).parent / "main.py"
+
+# Discord allows one IDENTIFY per 5 seconds (per max_concurrency bucket)
+IDENTIFY_INTERVAL = 5.5
+
+
+async def recommended_shard_count(token: str) -> int:
+    async with aiohttp.ClientSession() as session:
+        async with session.get(
+            "https://discord.com/api/v10/gateway/bot",
+            headers={"Authorization": f"Bot {token}"},
+        ) as resp:
+            resp.raise_for_status()
+            data = await resp.json()
+            return data["shards"]
+
+
+class Cluster:
+    def __init__(self, cluster_id: int, shard_ids: list, shard_count: int):
+        self.cluster_id = cluster_id
+        self.shard_ids = shard_ids
+        self.shard_count = shard_count
+        self.process = None
+        self.restarts = 0
+
+    async def start(self):
+        env = dict(
+            os.environ,
+            CLUSTER_ID=str(self.cluster_id),
+            SHARD_COUNT=str(self.shard_count),
+            SHARD_IDS=format_shard_ids(self.shard_ids),
+        )
+        self.process = await asyncio.create_subprocess_exec(sys.executable, str(MAIN), env=env)
+        log.info(
+            "Started cluster %d (shards %s) as pid %d",
+            self.cluster_id, format_shard_ids(self.shard_ids), self.process.pid,
+        )
+
+    async def run(self, stopping: asyncio.Event):
+        """Keep the cluster process alive until the launcher is stopped"""
+        while True:
+            await self.start()
+            code = await self.process.wait()
+            if stopping.is_set():
+                return
+            self.restarts += 1
+            delay = min(60, 2 ** min(self.restarts, 6))
+            log.error("Cluster %d exited with code %s, restarting in %ds", self.cluster_id, code, delay)
+            try:
+                await asyncio.wait_for(stopping.wait(), timeout=delay)
+                return
+            except asyncio.TimeoutError:
+                pass
+
+    def stop(self):
+        if self.process is not None and self.process.returncode is None:
+            self.process.send_signal(signal.SIGINT)
+
+
+async def main(args):
+    dotenv.load_dotenv()
+    logs.setup_logging()
+
+    if args.shards == "auto":
+        shard_count = await recommended_shard_count(os.environ["BOT_TOKEN"])
+        log.info("Discord recommends %d shard(s)", shard_count)
+    else:
+        shard_count = int(args.shards)
+
+    if args.cluster:
+        ranges = [parse_shard_ids(spec) for spec in args.cluster]
+        assigned = [shard for r in ranges for shard in r]
+        if len(assigned) != len(set(assigned)) or any(not 0 <= s < shard_count for s in assigned):
+            raise SystemExit("--cluster ranges must not overlap and must lie within 0..shards-1")
+    else:
+        ranges = split_shards(shard_count, args.clusters)
+
+    clusters = [Cluster(i, shard_ids, shard_count) for i, shard_ids in enumerate(ranges)]
+
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+
+    def shutdown():
+        stopping.set()
+        for cluster in clusters:
+            cluster.stop()
+
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, shutdown)
+
+    tasks = []
+    for cluster in clusters:
+        tasks.append(asyncio.create_task(cluster.run(stopping)))
+        # Give the previous cluster time to identify its shards before starting the next one
+        try:
+            await asyncio.wait_for(stopping.wait(), timeout=len(cluster.shard_ids) * IDENTIFY_INTERVAL)
+            break
+        except asyncio.TimeoutError:
+            pass
+
+    await asyncio.gather(*tasks)
+
+
+def cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--shards", default="auto", help="total shard count, or 'auto' to ask Discord")
+    parser.add_argument("--clusters", type=int, default=1, help="number of processes to split the shards over")
+    parser.add_argument("--cluster", action="append", metavar="IDS",
+                        help="explicit shard ids for one cluster, e.g. 0-3 (repeat per cluster)")
+    asyncio.run(main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    cli()
@@ -1,3 +1,4 @@
+import asyncio
 import discord
 import os
 import dotenv
@@ -5,43 +6,88 @@ import logging
 from discord.ext import commands
 from discord import app_commands
 
+from core import http, lazy, loader, log as logs, router, sharding, tree_sync
+
+log = logging.getLogger('nyoetools')
+
 # Suppress discord.py verbose logging
 logging.getLogger('discord').setLevel(logging.WARNING)
 logging.getLogger('discord.http').setLevel(logging.WARNING)
 
+dotenv.load_dotenv()
+token = os.environ["BOT_TOKEN"]
+
 intents = discord.Intents.default()
 intents.message_content = True
-bot = commands.Bot(command_prefix='nt!', intents=intents)
+if sharding.SHARDED:
+    # One gateway connection per shard in this process, see launcher.py for running several processes
+    bot = commands.AutoShardedBot(
+        command_prefix='nt!',
+        intents=intents,
+        shard_count=sharding.SHARD_COUNT,
+        shard_ids=sharding.SHARD_IDS,
+    )
+else:
+    bot = commands.Bot(command_prefix='nt!', intents=intents)
+# One on_message for every cog that reacts to links, they register their patterns on it
+bot.router = router.MessageRouter(bot)
+bot.add_listener(bot.router.dispatch, 'on_message')
+# Import the lazily loaded cog dependencies in the background once we're online
+warm_up_enabled = os.environ.get("LAZY_WARMUP", "1") != "0"
+warm_up_task = None
 
-dotenv.load_dotenv()
-token = os.environ["BOT_TOKEN"]
+logs.setup_logging()
+log.info('🚀 Bot starting...')
 
-print('=' * 50)
-print('🚀 Bot starting...')
-print('=' * 50)
+# Bind command name, user/guild id and start time to every record logged while a command runs
+bot.before_invoke(logs.bind_context)
+bot.tree.interaction_check = logs.bind_interaction
 
 @bot.event
 async def on_connect():
-    print('✓ Connected to Discord')
+    log.info('✓ Connected to Discord')
 
 @bot.event
-async def on_ready():
-    # Load all cogs from the cogs directory
+async def setup_hook():
+    # Runs once before connecting, unlike on_ready which fires again after every reconnect
     await load_cogs()
-    
-    # Sync slash commands
+
+    # Sync slash commands, but only if the command schema actually changed.
+    # The command tree is global, so only the first cluster needs to do it
+    if not sharding.is_primary_cluster():
+        return
     try:
-        synced = await bot.tree.sync()
-        print(f'✓ Synced {len(synced)} command(s)')
-    except Exception as e:
-        print(f'✗ Failed to sync commands: {e}')
-
-    print('\n' + '=' * 50)
-    print(f'✨ {bot.user.name} is online! ✨')
-    print(f'Bot ID: {bot.user.id}')
-    print(f'Connected to {len(bot.guilds)} server(s)')
-    print('=' * 50)
-    print()
+        synced = await tree_sync.sync_if_changed(bot.tree)
+        if synced is None:
+            log.info('✓ Command tree unchanged, skipped sync')
+        else:
+            log.info('✓ Synced %d command(s)', len(synced))
+    except Exception:
+        log.exception('✗ Failed to sync commands')
+
+@bot.event
+async def on_ready():
+    log.info(
+        '✨ %s is online! ✨', bot.user.name,
+        extra={
+            'bot_id': bot.user.id,
+            'guild_count': len(bot.guilds),
+            'cluster_id': sharding.CLUSTER_ID,
+            'shard_ids': sorted(bot.shards) if isinstance(bot, commands.AutoShardedBot) else None,
+        },
+    )
+
+    global warm_up_task
+    if warm_up_enabled and warm_up_task is None:
+        warm_up_task = asyncio.create_task(warm_up())
+
+async def warm_up():
+    """Import heavy cog dependencies in the background and print the import report"""
+    await lazy.warm_up()
+    log.info(
+        '📦 Module import report\n%s', lazy.import_report(),
+        extra={'import_ms': {name: round(s * 1000, 1) for name, s in lazy.import_times.items()}},
+    )
 
 @bot.event
 async def on_command_error(ctx, error):
@@ -76,28 +122,50 @@ async def on_command_error(ctx, error):
     elif isinstance(error, commands.CommandInvokeError):
         # Handle errors that occur during command execution
         original = error.original
-        print(f"Error in command {ctx.command}: {original}")
+        log.error("Error in command %s", ctx.command, exc_info=original)
         await ctx.send(f"❌ An error occurred while executing the command.")
     else:
         # Log other errors
-        print(f"Unhandled error: {error}")
+        log.error("Unhandled error in command %s", ctx.command, exc_info=error)
         await ctx.send(f"❌ An unexpected error occurred.")
 
 async def load_cogs():
     """Load all cog files from the cogs directory"""
     import pathlib
     cogs_dir = pathlib.Path(__file__).parent / 'cogs'
-    
-    for filepath in cogs_dir.glob('*.py'):
-        if filepath.name.startswith('_'):
-            continue
-        
-        cog_name = f'cogs.{filepath.stem}'
-        try:
-            await bot.load_extension(cog_name)
-            print(f'✓ Loaded cog: {cog_name}')
-        except Exception as e:
-            print(f'✗ Failed to load cog {cog_name}: {e}')
 
+    cog_names = [
+        f'cogs.{filepath.stem}'
+        for filepath in sorted(cogs_dir.glob('*.py'))
+        if not filepath.name.startswith('_')
+    ]
+
+    timings = await loader.load_extensions(bot, cog_names)
+    for timing in timings:
+        if timing.error is None:
+            log.info('✓ Loaded cog: %s', timing.name)
+        else:
+            log.error('✗ Failed to load cog %s: %s', timing.name, timing.error)
+
+    log.info(
+        'Cog load timings\n%s', loader.timing_table(timings),
+        extra={'timings': {
+            t.name: {
+                'load_ms': round(t.load_time * 1000, 1),
+                'cog_load_ms': round(t.cog_load_time * 1000, 1),
+            }
+            for t in timings
+        }},
+    )
+
+async def main():
+    # One pooled HTTP session shared by every cog, closed when the bot shuts down
+    async with http.create_session() as session:
+        bot.http_session = session
+        async with bot:
+            await bot.start(token)
 
-bot.run(token)
\ No newline at end of file
+try:
+    asyncio.run(main())
+except KeyboardInterrupt:
+    pass
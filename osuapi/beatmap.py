@@ -0,0 +1,197 @@
+import asyncio
+import hashlib
+import logging
+import math
+import os
+import pathlib
+from array import array
+
+from core.cache import TTLCache
+from core.singleflight import SingleFlight
+
+log = logging.getLogger(__name__)
+
+# Where downloaded .osu files are kept, they're a few KB each and never need fetching twice
+beatmap_dir = pathlib.Path(
+    os.environ.get("OSU_BEATMAP_DIR", pathlib.Path(__file__).parent.parent / "osu_beatmaps")
+)
+
+CIRCLE = 1
+SLIDER = 2
+SPINNER = 8
+
+
+class Beatmap:
+    """
+    A parsed .osu file. Hit objects live in parallel arrays (one entry per object)
+    instead of an object each, a marathon map has tens of thousands of them.
+    """
+    __slots__ = (
+        "beatmap_id", "checksum", "mode", "title", "artist", "creator", "version",
+        "hp", "cs", "od", "ar", "slider_multiplier", "tick_rate",
+        "x", "y", "time", "kind", "circles", "sliders", "spinners", "max_combo",
+    )
+
+    def __init__(self, beatmap_id: int, checksum: str):
+        self.beatmap_id = beatmap_id
+        self.checksum = checksum
+        self.mode = 0
+        self.title = self.artist = self.creator = self.version = "?"
+        self.hp = self.cs = self.od = 5.0
+        self.ar = None
+        self.slider_multiplier = 1.4
+        self.tick_rate = 1.0
+        self.x = array("f")
+        self.y = array("f")
+        self.time = array("d")
+        self.kind = array("B")  # CIRCLE, SLIDER or SPINNER
+        self.circles = self.sliders = self.spinners = 0
+        self.max_combo = 0
+
+    def __len__(self):
+        return len(self.time)
+
+
+def parse(data: bytes, beatmap_id: int) -> Beatmap:
+    """Parse the parts of a .osu file the difficulty calculation needs"""
+    beatmap = Beatmap(beatmap_id, hashlib.md5(data).hexdigest())
+    section = None
+    # Timing points: when they start and the slider velocity multiplier they set (1 for uninherited ones)
+    timing_times, svs = array("d"), array("d")
+    slider_combo = []  # (time, pixel length, slides) to work out the max combo once timing is known
+
+    for raw in data.decode("utf-8", errors="replace").splitlines():
+        line = raw.strip()
+        if not line or line.startswith("//"):
+            continue
+        if line.startswith("[") and line.endswith("]"):
+            section = line[1:-1]
+            continue
+
+        if section in ("General", "Metadata", "Difficulty"):
+            key, _, value = line.partition(":")
+            key, value = key.strip(), value.strip()
+            if key == "Mode":
+                beatmap.mode = int(value)
+            elif key in ("Title", "Artist", "Creator", "Version"):
+                setattr(beatmap, key.lower(), value)
+            elif key == "HPDrainRate":
+                beatmap.hp = float(value)
+            elif key == "CircleSize":
+                beatmap.cs = float(value)
+            elif key == "OverallDifficulty":
+                beatmap.od = float(value)
+            elif key == "ApproachRate":
+                beatmap.ar = float(value)
+            elif key == "SliderMultiplier":
+                beatmap.slider_multiplier = float(value)
+            elif key == "SliderTickRate":
+                beatmap.tick_rate = float(value)
+
+        elif section == "TimingPoints":
+            parts = line.split(",")
+            if len(parts) < 2:
+                continue
+            beat_length = float(parts[1])
+            uninherited = len(parts) < 7 or parts[6] == "1"
+            timing_times.append(float(parts[0]))
+            # Inherited points store the multiplier as a negative inverse percentage
+            svs.append(1.0 if uninherited or beat_length >= 0 else 100.0 / -beat_length)
+
+        elif section == "HitObjects":
+            parts = line.split(",")
+            if len(parts) < 4:
+                continue
+            kind = int(parts[3])
+            if kind & CIRCLE:
+                kind = CIRCLE
+                beatmap.circles += 1
+            elif kind & SLIDER:
+                kind = SLIDER
+                beatmap.sliders += 1
+                if len(parts) > 7:
+                    slider_combo.append((float(parts[2]), float(parts[7]), max(1, int(parts[6]))))
+            elif kind & SPINNER:
+                kind = SPINNER
+                beatmap.spinners += 1
+            else:
+                continue  # mania holds
+            beatmap.x.append(float(parts[0]))
+            beatmap.y.append(float(parts[1]))
+            beatmap.time.append(float(parts[2]))
+            beatmap.kind.append(kind)
+
+    if beatmap.ar is None:
+        # Files older than v8 only have OD, which AR used to follow
+        beatmap.ar = beatmap.od
+
+    beatmap.max_combo = beatmap.circles + beatmap.spinners
+    # Sliders are in time order, so the timing point in effect only ever moves forward
+    point, sv = 0, 1.0
+    for when, pixel_length, slides in slider_combo:
+        while point < len(timing_times) and timing_times[point] <= when:
+            sv = svs[point]
+            point += 1
+        px_per_beat = 100.0 * beatmap.slider_multiplier * sv
+        beats = pixel_length * slides / px_per_beat
+        ticks = max(0, math.ceil((beats - 0.1) / slides * beatmap.tick_rate) - 1)
+        # head, ticks and a repeat/tail per slide
+        beatmap.max_combo += ticks * slides + slides + 1
+    return beatmap
+
+
+class BeatmapFiles:
+    """.osu files downloaded once to disk, parsed ones kept in memory"""
+
+    def __init__(self, session, base_url: str, path=beatmap_dir, maxsize: int = 64):
+        self._session = session  # callable returning the aiohttp session
+        self.base_url = base_url.rstrip("/")
+        self.path = pathlib.Path(path)
+        self.parsed = TTLCache("osu_beatmap_files", maxsize=maxsize, ttl=24 * 60 * 60)
+        self.downloads = SingleFlight("osu_beatmap_files")
+
+    def _file(self, beatmap_id: int) -> pathlib.Path:
+        return self.path / f"{beatmap_id}.osu"
+
+    def _read(self, beatmap_id: int):
+        try:
+            return self._file(beatmap_id).read_bytes()
+        except OSError:
+            return None
+
+    def _write(self, beatmap_id: int, data: bytes):
+        self.path.mkdir(parents=True, exist_ok=True)
+        tmp = self._file(beatmap_id).with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_bytes(data)
+        tmp.replace(self._file(beatmap_id))
+
+    async def get(self, beatmap_id: int, checksum: str = None):
+        """
+        The parsed beatmap, or None if it can't be downloaded. With a checksum
+        (from a replay) a cached copy that doesn't match is downloaded again.
+        """
+        beatmap = self.parsed.get(beatmap_id)
+        if beatmap is not None and checksum in (None, beatmap.checksum):
+            return beatmap
+        return await self.downloads.do((beatmap_id, checksum), self._load, beatmap_id, checksum)
+
+    async def _load(self, beatmap_id: int, checksum: str):
+        data = await asyncio.to_thread(self._read, beatmap_id)
+        if data is None or (checksum and hashlib.md5(data).hexdigest() != checksum):
+            data = await self._download(beatmap_id)
+            if data is None:
+                return None
+            await asyncio.to_thread(self._write, beatmap_id, data)
+
+        beatmap = await asyncio.to_thread(parse, data, beatmap_id)
+        self.parsed.set(beatmap_id, beatmap)
+        return beatmap
+
+    async def _download(self, beatmap_id: int):
+        async with self._session().get(f"{self.base_url}/osu/{beatmap_id}") as resp:
+            if resp.status != 200:
+                log.warning("Downloading beatmap %s failed with %s", beatmap_id, resp.status)
+                return None
+            data = await resp.read()
+        # Deleted maps come back as an empty 200
+        return data or None
@@ -0,0 +1,136 @@
+import asyncio
+import collections
+import json
+import os
+import pathlib
+import sqlite3
+import threading
+import time
+
+from core.cache import TTLCache, caches, lookups
+
+# Where looked up beatmapsets are kept between restarts
+cache_file = pathlib.Path(
+    os.environ.get("OSU_CACHE_FILE", pathlib.Path(__file__).parent.parent / "osu_cache.sqlite3")
+)
+
+HOUR = 60 * 60
+DAY = 24 * HOUR
+
+# How long a beatmapset is trusted, by its status. Ranked/loved maps are practically frozen,
+# qualified ones get ranked (or disqualified) soon and pending/WIP ones change all the time.
+STATUS_TTLS = {
+    "ranked": 30 * DAY,
+    "approved": 30 * DAY,
+    "loved": 30 * DAY,
+    "qualified": HOUR,
+    "graveyard": DAY,
+    "pending": 10 * 60,
+    "wip": 10 * 60,
+}
+DEFAULT_TTL = 10 * 60
+
+
+def ttl_for(beatmapset: dict) -> int:
+    return STATUS_TTLS.get(beatmapset.get("status"), DEFAULT_TTL)
+
+
+class BeatmapsetCache:
+    """
+    Beatmapset lookups cached in two tiers: an in-memory LRU in front of a SQLite file,
+    so a restart doesn't have to fetch every popular map again.
+    """
+
+    def __init__(self, path=cache_file, maxsize: int = 512, name: str = "osu_beatmapsets"):
+        self.name = name
+        self.path = path
+        self.memory = TTLCache(f"{name}_memory", maxsize=maxsize, ttl=DEFAULT_TTL)
+        self.hits = 0
+        self.misses = 0
+        # Lookups per beatmapset since it was last stored, tells which ones are worth refreshing early
+        self.demand = collections.Counter()
+        self._db = None
+        # One connection shared by the executor threads, sqlite3 connections aren't safe to use concurrently
+        self._lock = threading.Lock()
+        caches[name] = self
+
+    def _connect(self):
+        if self._db is None:
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS beatmapsets ("
+                "id INTEGER PRIMARY KEY, status TEXT, data TEXT NOT NULL, expires REAL NOT NULL)"
+            )
+            self._db.execute("DELETE FROM beatmapsets WHERE expires < ?", (time.time(),))
+            self._db.commit()
+        return self._db
+
+    def _load(self, beatmapset_id: int):
+        with self._lock:
+            return self._connect().execute(
+                "SELECT data, expires FROM beatmapsets WHERE id = ? AND expires > ?", (beatmapset_id, time.time())
+            ).fetchone()
+
+    def _store(self, beatmapset_id: int, status: str, data: str, expires: float):
+        with self._lock:
+            db = self._connect()
+            db.execute(
+                "INSERT OR REPLACE INTO beatmapsets (id, status, data, expires) VALUES (?, ?, ?, ?)",
+                (beatmapset_id, status, data, expires)
+            )
+            db.commit()
+
+    async def get(self, beatmapset_id: int):
+        """The cached beatmapset, or None if it isn't cached (or expired)"""
+        self.demand[beatmapset_id] += 1
+        beatmapset = self.memory.get(beatmapset_id)
+        if beatmapset is not None:
+            self.hits += 1
+            return beatmapset
+
+        row = await asyncio.to_thread(self._load, beatmapset_id)
+        if row is None:
+            self.misses += 1
+            lookups.inc(cache=f"{self.name}_disk", result="miss")
+            return None
+
+        self.hits += 1
+        lookups.inc(cache=f"{self.name}_disk", result="hit")
+        data, expires = row
+        beatmapset = json.loads(data)
+        self.memory.set(beatmapset_id, beatmapset, ttl=expires - time.time())
+        return beatmapset
+
+    async def set(self, beatmapset_id: int, beatmapset: dict):
+        self.demand.pop(beatmapset_id, None)
+        ttl = ttl_for(beatmapset)
+        self.memory.set(beatmapset_id, beatmapset, ttl=ttl)
+        data = json.dumps(beatmapset, separators=(",", ":"))
+        await asyncio.to_thread(self._store, beatmapset_id, beatmapset.get("status"), data, time.time() + ttl)
+
+    def warm_candidates(self, within: float, limit: int, min_demand: int = 2) -> list:
+        """Beatmapsets in demand that expire within `within` seconds, most wanted first"""
+        # Forget demand for sets that dropped out of memory (or were never found)
+        for beatmapset_id in list(self.demand):
+            if beatmapset_id not in self.memory:
+                del self.demand[beatmapset_id]
+        candidates = [
+            beatmapset_id for beatmapset_id, count in self.demand.most_common()
+            if count >= min_demand and (self.memory.ttl_left(beatmapset_id) or 0) < within
+        ]
+        return candidates[:limit]
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def __len__(self):
+        return len(self.memory)
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
@@ -0,0 +1,156 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+import time
+
+from core.metrics import registry
+
+log = logging.getLogger(__name__)
+
+# Request priorities, lower goes first
+INTERACTIVE = 0
+BACKGROUND = 10
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BACKGROUND: "background"}
+
+# The osu! API asks for at most 60 requests a minute, with some room for bursts
+RATE_LIMIT = int(os.environ.get("OSU_RATE_LIMIT", 60))
+RATE_BURST = int(os.environ.get("OSU_RATE_BURST", 10))
+# How often one request is retried after a 429 before giving up
+MAX_RETRIES = 3
+
+queue_depth = registry.gauge(
+    "nyoetools_osu_queue_depth", "osu! API requests waiting for the rate limiter", ("priority",))
+queue_wait = registry.histogram(
+    "nyoetools_osu_queue_wait_seconds", "Time osu! API requests spent waiting for the rate limiter", ("priority",))
+responses = registry.counter(
+    "nyoetools_osu_requests_total", "osu! API responses by status", ("status",))
+
+
+class TokenBucket:
+    """Allows `rate` requests per second on average and up to `capacity` at once"""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self) -> float:
+        """Seconds until a request can be made"""
+        self._refill()
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self):
+        self._refill()
+        self.tokens -= 1
+
+    def empty(self):
+        self._refill()
+        self.tokens = min(self.tokens, 0.0)
+
+
+class PriorityLimiter:
+    """
+    Hands out the token bucket's slots to waiting requests by priority, so an
+    interactive lookup never queues behind a batch of background work.
+    """
+
+    def __init__(self, bucket: TokenBucket):
+        self.bucket = bucket
+        self.paused_until = 0.0
+        self._waiters = []  # heap of (priority, sequence, future)
+        self._sequence = itertools.count()
+        self._dispatcher = None
+        for priority, name in PRIORITY_NAMES.items():
+            queue_depth.set_function(lambda p=priority: self.depth(p), priority=name)
+
+    def depth(self, priority: int = None) -> int:
+        return sum(1 for p, _, f in self._waiters if not f.done() and (priority is None or p == priority))
+
+    def pause(self, seconds: float):
+        """Hold every request for a while (the API told us to back off)"""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        self.bucket.empty()
+
+    def _ready_in(self) -> float:
+        return max(self.paused_until - time.monotonic(), self.bucket.wait_time())
+
+    async def acquire(self, priority: int = INTERACTIVE):
+        started = time.monotonic()
+        if not self._waiters and self._ready_in() <= 0:
+            self.bucket.take()
+        else:
+            future = asyncio.get_running_loop().create_future()
+            heapq.heappush(self._waiters, (priority, next(self._sequence), future))
+            if self._dispatcher is None or self._dispatcher.done():
+                self._dispatcher = asyncio.create_task(self._dispatch())
+            await future
+        queue_wait.observe(time.monotonic() - started, priority=PRIORITY_NAMES.get(priority, str(priority)))
+
+    async def _dispatch(self):
+        while self._waiters:
+            # Requests whose caller gave up don't get a slot
+            while self._waiters and self._waiters[0][2].done():
+                heapq.heappop(self._waiters)
+            if not self._waiters:
+                break
+            delay = self._ready_in()
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                self.bucket.take()
+                future.set_result(None)
+
+
+class OsuClient:
+    """
+    osu! API v2 client: every request goes through the rate limiter in priority order,
+    429s pause everyone for Retry-After and the request is retried.
+    """
+
+    def __init__(self, session, base_url: str, tokens, rate_limit: int = RATE_LIMIT, burst: int = RATE_BURST):
+        self._session = session  # callable returning the aiohttp session
+        self.base_url = base_url.rstrip("/")
+        self.tokens = tokens
+        self.limiter = PriorityLimiter(TokenBucket(rate_limit / 60, burst))
+
+    async def get(self, path: str, params=None, priority: int = INTERACTIVE):
+        """GET an API v2 endpoint, returns the JSON or None if it failed"""
+        for attempt in range(MAX_RETRIES + 1):
+            token = await self.tokens.get()
+            if not token:
+                return None
+
+            await self.limiter.acquire(priority)
+            headers = {
+                'Authorization': f'Bearer {token}',
+                'Content-Type': 'application/json',
+                'Accept': 'application/json'
+            }
+            async with self._session().get(f"{self.base_url}/api/v2/{path}", params=params, headers=headers) as resp:
+                responses.inc(status=str(resp.status))
+                if resp.status == 200:
+                    return await resp.json()
+
+                if resp.status == 429:
+                    retry_after = float(resp.headers.get("Retry-After", 2 ** attempt))
+                    log.warning("⏳ osu! API rate limited, pausing for %.1fs", retry_after)
+                    self.limiter.pause(retry_after)
+                    continue
+                if resp.status == 401 and attempt == 0:
+                    # Token got revoked or expired early, get a new one and try once more
+                    self.tokens.invalidate()
+                    continue
+                if resp.status != 404:
+                    log.warning("osu! API request %s failed with %s", path, resp.status)
+                return None
+        return None
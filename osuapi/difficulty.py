@@ -0,0 +1,270 @@
+"""
+Star rating and pp estimates for osu!standard, computed locally. This is the classic
+ppv2 strain model from before the 2021 rework (no rhythm or flashlight skills, old
+slider and length handling), so the numbers land near what osu! shows but won't match
+it exactly. Show them as estimates.
+"""
+import asyncio
+import math
+from typing import Optional
+
+from core.cache import TTLCache
+from core.singleflight import SingleFlight
+from osuapi.beatmap import SPINNER, Beatmap, BeatmapFiles
+from osuapi.mods import MOD_VALUES
+
+NF, EZ, HD, HR = MOD_VALUES["NF"], MOD_VALUES["EZ"], MOD_VALUES["HD"], MOD_VALUES["HR"]
+DT, HT, FL, SO = MOD_VALUES["DT"], MOD_VALUES["HT"], MOD_VALUES["FL"], MOD_VALUES["SO"]
+# Only these change the map itself, the rest only change the pp
+DIFFICULTY_MODS = EZ | HR | DT | HT
+
+# The classic osu!standard strain model (ppv2): every object adds aim and speed
+# strain that decays over time, the peaks of each 400ms section make up the difficulty
+AIM, SPEED = 0, 1
+DECAY_BASE = (0.15, 0.3)
+WEIGHT_SCALING = (26.25, 1400.0)
+STRAIN_STEP = 400.0
+DECAY_WEIGHT = 0.9
+STAR_SCALING = 0.0675
+# Distances (in normalized pixels) where speed strain steps up, from overlapping notes to jumps
+SINGLE_SPACING = 125.0
+STREAM_SPACING = 110.0
+ALMOST_DIAMETER = 90.0
+NORMALIZED_RADIUS = 52.0
+
+DAY = 24 * 60 * 60
+
+
+class DifficultyAttributes:
+    """Star rating of one beatmap with one set of mods, plus what pp needs from the map"""
+    __slots__ = (
+        "beatmap_id", "name", "stars", "aim", "speed",
+        "ar", "od", "cs", "max_combo", "circles", "sliders", "spinners",
+    )
+
+    def __init__(self, beatmap: Beatmap, aim: float, speed: float, ar: float, od: float, cs: float):
+        self.beatmap_id = beatmap.beatmap_id
+        self.name = f"{beatmap.artist} - {beatmap.title} [{beatmap.version}]"
+        self.aim = aim
+        self.speed = speed
+        self.stars = aim + speed + abs(speed - aim) * 0.5
+        self.ar = ar
+        self.od = od
+        self.cs = cs
+        self.max_combo = beatmap.max_combo
+        self.circles = beatmap.circles
+        self.sliders = beatmap.sliders
+        self.spinners = beatmap.spinners
+
+    @property
+    def objects(self) -> int:
+        return self.circles + self.sliders + self.spinners
+
+
+def speed_multiplier(mods: int) -> float:
+    if mods & DT:
+        return 1.5
+    if mods & HT:
+        return 0.75
+    return 1.0
+
+
+def adjusted_settings(beatmap: Beatmap, mods: int):
+    """AR, OD and CS as they play with the mods, rate changes included"""
+    ar, od, cs = beatmap.ar, beatmap.od, beatmap.cs
+    if mods & HR:
+        ar, od, cs = min(10.0, ar * 1.4), min(10.0, od * 1.4), min(10.0, cs * 1.3)
+    elif mods & EZ:
+        ar, od, cs = ar * 0.5, od * 0.5, cs * 0.5
+
+    speed = speed_multiplier(mods)
+    if speed != 1.0:
+        # Rate changes shrink the windows in real time, turn them back into AR/OD
+        preempt = (1800 - 120 * ar if ar < 5 else 1200 - 150 * (ar - 5)) / speed
+        ar = (1800 - preempt) / 120 if preempt > 1200 else 5 + (1200 - preempt) / 150
+        great_window = (80 - 6 * od) / speed
+        od = (80 - great_window) / 6
+    return ar, od, cs
+
+
+def _difficulty(peaks: list) -> float:
+    peaks.sort(reverse=True)
+    total, weight = 0.0, 1.0
+    for peak in peaks:
+        total += peak * weight
+        weight *= DECAY_WEIGHT
+    return total
+
+
+def _speed_value(distance: float) -> float:
+    if distance > SINGLE_SPACING:
+        return 2.5
+    if distance > STREAM_SPACING:
+        return 1.6 + 0.9 * (distance - STREAM_SPACING) / (SINGLE_SPACING - STREAM_SPACING)
+    if distance > ALMOST_DIAMETER:
+        return 1.2 + 0.4 * (distance - ALMOST_DIAMETER) / (STREAM_SPACING - ALMOST_DIAMETER)
+    if distance > ALMOST_DIAMETER / 2:
+        return 0.95 + 0.25 * (distance - ALMOST_DIAMETER / 2) / (ALMOST_DIAMETER / 2)
+    return 0.95
+
+
+def calculate(beatmap: Beatmap, mods: int = 0) -> DifficultyAttributes:
+    """Estimated (classic ppv2) star rating of an osu!standard beatmap with the given mods. CPU bound, run it in a thread"""
+    ar, od, cs = adjusted_settings(beatmap, mods)
+    speed = speed_multiplier(mods)
+
+    # Distances are measured in multiples of the circle size, small circles get a little extra
+    radius = 32 * (1 - 0.7 * (cs - 5) / 5)
+    scale = NORMALIZED_RADIUS / radius
+    if radius < 30:
+        scale *= 1 + min(30 - radius, 5) / 50
+
+    xs, ys, times, kinds = beatmap.x, beatmap.y, beatmap.time, beatmap.kind
+    peaks = ([], [])
+    if len(times) < 2:
+        return DifficultyAttributes(beatmap, 0.0, 0.0, ar, od, cs)
+
+    strain = [0.0, 0.0]
+    section_peak = [0.0, 0.0]
+    section_end = math.ceil(times[0] / speed / STRAIN_STEP) * STRAIN_STEP
+    previous_time = times[0] / speed
+    previous_spinner = kinds[0] == SPINNER
+
+    for i in range(1, len(times)):
+        now = times[i] / speed
+        # A new section starts with whatever strain is left over from the last one
+        while now > section_end:
+            for skill in (AIM, SPEED):
+                peaks[skill].append(section_peak[skill])
+                section_peak[skill] = strain[skill] * DECAY_BASE[skill] ** ((section_end - previous_time) / 1000)
+            section_end += STRAIN_STEP
+
+        delta = now - previous_time
+        spinner = kinds[i] == SPINNER
+        if spinner or previous_spinner:
+            distance = 0.0
+        else:
+            distance = math.hypot(xs[i] - xs[i - 1], ys[i] - ys[i - 1]) * scale
+
+        values = (distance ** 0.99 if distance else 0.0, 0.0 if spinner else _speed_value(distance))
+        for skill in (AIM, SPEED):
+            strain[skill] = (
+                strain[skill] * DECAY_BASE[skill] ** (delta / 1000)
+                + values[skill] * WEIGHT_SCALING[skill] / max(delta, 50)
+            )
+            section_peak[skill] = max(section_peak[skill], strain[skill])
+
+        previous_time = now
+        previous_spinner = spinner
+
+    for skill in (AIM, SPEED):
+        peaks[skill].append(section_peak[skill])
+
+    aim = math.sqrt(_difficulty(peaks[AIM])) * STAR_SCALING
+    speed_stars = math.sqrt(_difficulty(peaks[SPEED])) * STAR_SCALING
+    return DifficultyAttributes(beatmap, aim, speed_stars, ar, od, cs)
+
+
+def hits_for_accuracy(objects: int, accuracy: float, misses: int = 0):
+    """300s, 100s and 50s that make up an accuracy (in percent), 100s first"""
+    misses = min(misses, objects)
+    max_300 = objects - misses
+    accuracy = max(0.0, min(accuracy / 100, max_300 / objects if objects else 1.0))
+    # accuracy = (6 * n300 + 2 * n100) / (6 * objects) with n300 = max_300 - n100
+    n100 = round(-3 * ((accuracy - 1) * objects + misses) * 0.5)
+    n50 = 0
+    if n100 > max_300:
+        # Not reachable with 100s alone
+        n100 = 0
+        n50 = round(-6 * ((accuracy - 1) * objects + misses) * 0.2)
+        n50 = min(max_300, n50)
+    n100 = max(0, min(n100, max_300 - n50))
+    return max_300 - n100 - n50, n100, n50
+
+
+def performance(attributes: DifficultyAttributes, mods: int, n300: int = None, n100: int = 0, n50: int = 0,
+                misses: int = 0, combo: int = None) -> float:
+    """Estimated (classic ppv2) pp for a score on the map, n300 defaults to every object that wasn't hit otherwise"""
+    objects = attributes.objects
+    if n300 is None:
+        n300 = max(0, objects - n100 - n50 - misses)
+    combo = attributes.max_combo if combo is None else combo
+    total_hits = n300 + n100 + n50 + misses
+    if not total_hits:
+        return 0.0
+    accuracy = (n300 * 300 + n100 * 100 + n50 * 50) / (total_hits * 300)
+    ar, od = attributes.ar, attributes.od
+
+    length_bonus = 0.95 + 0.4 * min(1.0, objects / 2000)
+    if objects > 2000:
+        length_bonus += math.log10(objects / 2000) * 0.5
+    miss_penalty = 0.97 ** misses
+    combo_break = min((combo / attributes.max_combo) ** 0.8, 1.0) if attributes.max_combo else 1.0
+    ar_bonus = 1.0
+    if ar > 10.33:
+        ar_bonus += 0.3 * (ar - 10.33)
+    elif ar < 8:
+        ar_bonus += 0.01 * (8 - ar)
+
+    def base(stars):
+        return (5 * max(1.0, stars / STAR_SCALING) - 4) ** 3 / 100000
+
+    aim = base(attributes.aim) * length_bonus * miss_penalty * combo_break * ar_bonus
+    if mods & HD:
+        aim *= 1 + 0.04 * (12 - ar)
+    if mods & FL:
+        flashlight_bonus = 1 + 0.35 * min(1.0, objects / 200)
+        if objects > 200:
+            flashlight_bonus += 0.3 * min(1.0, (objects - 200) / 300)
+        if objects > 500:
+            flashlight_bonus += (objects - 500) / 1200
+        aim *= flashlight_bonus
+    aim *= (0.5 + accuracy / 2) * (0.98 + od ** 2 / 2500)
+
+    speed = base(attributes.speed) * length_bonus * miss_penalty * combo_break
+    if ar > 10.33:
+        speed *= ar_bonus
+    if mods & HD:
+        speed *= 1 + 0.04 * (12 - ar)
+    speed *= (0.02 + accuracy) * (0.96 + od ** 2 / 1600)
+
+    # Accuracy only counts on circles, sliders and spinners are too lenient
+    circle_accuracy = 0.0
+    if attributes.circles:
+        circle_300 = n300 - (objects - attributes.circles)
+        circle_accuracy = max(0.0, (circle_300 * 6 + n100 * 2 + n50) / (attributes.circles * 6))
+    acc = 1.52163 ** od * circle_accuracy ** 24 * 2.83 * min(1.15, (attributes.circles / 1000) ** 0.3)
+    if mods & HD:
+        acc *= 1.08
+    if mods & FL:
+        acc *= 1.02
+
+    multiplier = 1.12
+    if mods & NF:
+        multiplier *= 0.9
+    if mods & SO:
+        multiplier *= 0.95
+    return (aim ** 1.1 + speed ** 1.1 + acc ** 1.1) ** (1 / 1.1) * multiplier
+
+
+class DifficultyCalculator:
+    """Star ratings from downloaded .osu files, memoized per (beatmap, mods)"""
+
+    def __init__(self, files: BeatmapFiles, maxsize: int = 2048):
+        self.files = files
+        self.results = TTLCache("osu_difficulty", maxsize=maxsize, ttl=7 * DAY)
+        self.calculations = SingleFlight("osu_difficulty")
+
+    async def attributes(self, beatmap_id: int, mods: int = 0, checksum: str = None) -> Optional[DifficultyAttributes]:
+        """None if the beatmap can't be downloaded or isn't osu!standard"""
+        beatmap = await self.files.get(beatmap_id, checksum)
+        if beatmap is None or beatmap.mode != 0:
+            return None
+
+        # The file's checksum is part of the key, so an updated map isn't served old results
+        key = (beatmap_id, beatmap.checksum, int(mods) & DIFFICULTY_MODS)
+        attributes = self.results.get(key)
+        if attributes is None:
+            attributes = await self.calculations.do(key, asyncio.to_thread, calculate, beatmap, int(mods))
+            self.results.set(key, attributes)
+        return attributes
@@ -0,0 +1,45 @@
+MOD_VALUES = {
+    "NF": 1,
+    "EZ": 2,
+    "HD": 8,
+    "HR": 16,
+    "SD": 32,
+    "DT": 64,
+    "RX": 128,
+    "HT": 256,
+    "NC": 576,
+    "FL": 1024,
+    "SO": 4096,
+    "PF": 16416
+}
+
+
+def calculate_mods(mods: list):
+    return sum(MOD_VALUES.get(mod, 0) for mod in mods)
+
+
+def decode_mods(mods_int):
+    """Decode the mods integer into a readable mod string."""
+    if mods_int == 0:
+        return "+NM"
+    mods_list = []
+    for mod, value in sorted(MOD_VALUES.items(), key=lambda x: -x[1]): # Sorts by value descending
+        if mods_int & value == value: # Checks if the mod is active, NC and PF need every one of their bits
+            mods_list.append(mod)
+            mods_int &= ~value # NC/PF include DT/SD, so those aren't listed again
+    return "+" + "".join(mods_list)
+
+
+def parse_mods(text: str) -> int:
+    """"HDDT", "+hd,dt" or "NM" into the mods integer, raises ValueError for unknown mods"""
+    letters = "".join(c for c in text.upper() if c.isalpha())
+    if letters in ("", "NM"):
+        return 0
+    names = [letters[i:i + 2] for i in range(0, len(letters), 2)]
+    unknown = [name for name in names if name not in MOD_VALUES]
+    if unknown:
+        raise ValueError(f"Unknown mod(s): {', '.join(unknown)}")
+    mods = 0
+    for name in names:
+        mods |= MOD_VALUES[name]
+    return mods
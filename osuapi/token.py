@@ -0,0 +1,145 @@
+import asyncio
+import json
+import logging
+import os
+import pathlib
+import time
+
+from core.metrics import registry
+from core.singleflight import SingleFlight
+
+log = logging.getLogger(__name__)
+
+refreshes = registry.counter(
+    "nyoetools_osu_token_refreshes_total", "osu! OAuth token requests by what triggered them", ("trigger", "result"))
+
+# Where the current token is kept so a restart doesn't need a new one
+token_file = pathlib.Path(
+    os.environ.get("OSU_TOKEN_FILE", pathlib.Path(__file__).parent.parent / ".osu_token")
+)
+
+# A token is only handed out while it has at least this long left (seconds)
+EXPIRY_MARGIN = 60
+# The background task replaces the token this long before it expires
+REFRESH_AHEAD = 5 * 60
+# Wait before retrying a failed background refresh
+RETRY_DELAY = 30
+
+
+class TokenManager:
+    """
+    osu! API client credentials token. Concurrent callers share one refresh, a background
+    task swaps the token before it expires, and it's persisted to disk until it does.
+    """
+
+    def __init__(self, session, token_url: str, client_id: str, client_secret: str, path=token_file):
+        self._session = session  # callable returning the aiohttp session
+        self.token_url = token_url
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.path = pathlib.Path(path)
+        self.access_token = None
+        self.expires_at = 0.0
+        # The last token the API turned down, so it isn't read back from the file
+        self.rejected = None
+        self._refreshes = SingleFlight("osu_token")
+        self._task = None
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.client_id and self.client_secret)
+
+    def valid(self) -> bool:
+        return self.access_token is not None and time.time() < self.expires_at - EXPIRY_MARGIN
+
+    def start(self):
+        """Load a saved token and start refreshing in the background"""
+        self._load()
+        if self.configured and self._task is None:
+            self._task = asyncio.create_task(self._refresher())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    def invalidate(self):
+        """Forget the token, e.g. after the API rejected it"""
+        self.rejected = self.access_token
+        self.access_token = None
+        self.expires_at = 0.0
+
+    async def get(self):
+        """A valid access token, or None if there is none to be had"""
+        if self.valid():
+            return self.access_token
+        if not self.configured:
+            return None
+        return await self.refresh("request")
+
+    async def refresh(self, trigger: str):
+        return await self._refreshes.do("token", self._refresh, trigger)
+
+    async def _refresh(self, trigger: str):
+        # Another cluster process may have refreshed it already
+        if self._load() and (trigger == "request" or self.expires_at - time.time() > REFRESH_AHEAD):
+            return self.access_token
+
+        data = {
+            'client_id': self.client_id,
+            'client_secret': self.client_secret,
+            'grant_type': 'client_credentials',
+            'scope': 'public'
+        }
+        for attempt in range(2):
+            async with self._session().post(self.token_url, data=data) as resp:
+                if resp.status == 429 and attempt == 0:
+                    # Rate limited like any other endpoint, wait as told and try once more
+                    await asyncio.sleep(float(resp.headers.get("Retry-After", 1)))
+                    continue
+                if resp.status != 200:
+                    refreshes.inc(trigger=trigger, result="error")
+                    log.warning("osu! token request failed with %s", resp.status)
+                    return None
+                token_data = await resp.json()
+                break
+
+        refreshes.inc(trigger=trigger, result="ok")
+        self.access_token = token_data['access_token']
+        self.expires_at = time.time() + token_data['expires_in']
+        await asyncio.to_thread(self._save)
+        return self.access_token
+
+    async def _refresher(self):
+        while True:
+            await asyncio.sleep(max(0, self.expires_at - REFRESH_AHEAD - time.time()))
+            try:
+                if await self.refresh("background"):
+                    continue
+            except Exception:
+                log.exception("Background osu! token refresh failed")
+            await asyncio.sleep(RETRY_DELAY)
+
+    def _load(self) -> bool:
+        """Take the saved token if it's still valid"""
+        try:
+            saved = json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            return False
+        if saved.get('client_id') != self.client_id or saved.get('expires_at', 0) <= self.expires_at:
+            return self.valid()
+        if saved.get('access_token') == self.rejected:
+            return self.valid()
+        self.access_token = saved['access_token']
+        self.expires_at = saved['expires_at']
+        return self.valid()
+
+    def _save(self):
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({
+            'client_id': self.client_id,
+            'access_token': self.access_token,
+            'expires_at': self.expires_at,
+        }))
+        os.chmod(tmp, 0o600)
+        tmp.replace(self.path)
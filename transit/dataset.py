@@ -0,0 +1,292 @@
+import bisect
+import csv
+import logging
+import mmap
+import os
+import struct
+
+from transit.stations import normalize
+
+log = logging.getLogger(__name__)
+
+# Index file layout (little endian):
+#   header
+#   stations: (id, name, normalized name) as (offset, length) pairs into the string blob, sorted by id
+#   names:    station numbers sorted by normalized name
+#   tokens:   (offset, length) of a normalized name word + the station it belongs to, sorted by word
+#   blob:     utf-8 strings
+MAGIC = b"NTSI"
+VERSION = 1
+HEADER = struct.Struct("<4sHIIQq")   # magic, version, stations, tokens, source size, source mtime_ns
+STATION = struct.Struct("<IHIHIH")
+NAME = struct.Struct("<I")
+TOKEN = struct.Struct("<IHI")
+
+# How many stations a search looks at before settling for what it found
+NAME_SCAN_LIMIT = 256
+SCAN_LIMIT = 1000
+
+# Column names we know from GTFS stops.txt and the DB station list exports
+ID_COLUMNS = ("EVA_NR", "eva", "stop_id", "id")
+NAME_COLUMNS = ("NAME", "stop_name", "name")
+
+
+def read_stops(path: str):
+    """Yield (id, name) for every station in a GTFS stops.txt or CSV export"""
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        sample = f.read(4096)
+        f.seek(0)
+        dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+        reader = csv.DictReader(f, dialect=dialect)
+        columns = reader.fieldnames or []
+        id_column = next((c for c in ID_COLUMNS if c in columns), None)
+        name_column = next((c for c in NAME_COLUMNS if c in columns), None)
+        if not id_column or not name_column:
+            raise ValueError(f"{path} has no id/name columns (got {columns})")
+
+        for row in reader:
+            # GTFS lists every platform as its own stop, only keep the stations they belong to
+            if row.get("parent_station") or row.get("location_type", "0") not in ("", "0", "1"):
+                continue
+            station_id, name = row[id_column].strip(), row[name_column].strip()
+            if station_id and name:
+                yield station_id, name
+
+
+def build_index(source: str, target: str):
+    """Write the search index for `source` to `target` (atomically)"""
+    stat = os.stat(source)
+    stations = sorted(dict(read_stops(source)).items())
+
+    blob = bytearray()
+    strings = {}
+
+    def intern(text: str):
+        if text not in strings:
+            data = text.encode("utf-8")
+            strings[text] = (len(blob), len(data))
+            blob.extend(data)
+        return strings[text]
+
+    station_rows = []
+    names = []
+    tokens = []
+    for index, (station_id, name) in enumerate(stations):
+        key = normalize(name)
+        station_rows.append((*intern(station_id), *intern(name), *intern(key)))
+        names.append((key, index))
+        for token in set(key.split()):
+            tokens.append((token, index))
+    names.sort()
+    tokens.sort()
+
+    tmp = f"{target}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(station_rows), len(tokens), stat.st_size, stat.st_mtime_ns))
+        for row in station_rows:
+            f.write(STATION.pack(*row))
+        for _, index in names:
+            f.write(NAME.pack(index))
+        for token, index in tokens:
+            f.write(TOKEN.pack(*intern(token), index))
+        f.write(blob)
+    os.replace(tmp, target)
+    return len(station_rows)
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Levenshtein distance, giving up (returning limit + 1) once it can't stay within limit"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+class _Tokens:
+    """Sequence view of the sorted token table so bisect can run straight on the mmap"""
+
+    def __init__(self, index):
+        self.index = index
+
+    def __len__(self):
+        return self.index.token_count
+
+    def __getitem__(self, i):
+        return self.index.token(i)[0]
+
+
+class _Names:
+    def __init__(self, index):
+        self.index = index
+
+    def __len__(self):
+        return self.index.station_count
+
+    def __getitem__(self, i):
+        return self.index.normalized_name(self.index.name_station(i))
+
+
+class _Ids:
+    def __init__(self, index):
+        self.index = index
+
+    def __len__(self):
+        return self.index.station_count
+
+    def __getitem__(self, i):
+        return self.index.string(*self.index.station_row(i)[0:2])
+
+
+class StationDataset:
+    """
+    Station search over a local stops dataset, so resolving a name needs no network.
+    The parsed dataset lives in a compact index file that is memory mapped, not loaded.
+    """
+
+    def __init__(self, source: str, index_path: str = None):
+        self.source = source
+        self.index_path = index_path or f"{source}.idx"
+        self._file = None
+        self._map = None
+        self.station_count = 0
+        self.token_count = 0
+
+    def __len__(self):
+        return self.station_count
+
+    def __bool__(self):
+        return self._map is not None
+
+    def _stale(self) -> bool:
+        try:
+            with open(self.index_path, "rb") as f:
+                header = HEADER.unpack(f.read(HEADER.size))
+        except (OSError, struct.error):
+            return True
+        stat = os.stat(self.source)
+        return header[0] != MAGIC or header[1] != VERSION or header[4:] != (stat.st_size, stat.st_mtime_ns)
+
+    def rebuild(self) -> bool:
+        """Rebuild the index file if the dataset changed since it was built. Blocking, run it in a thread."""
+        if not self._stale():
+            return False
+        count = build_index(self.source, self.index_path)
+        log.info("🚉 Built station index with %d stations from %s", count, self.source)
+        return True
+
+    def open(self):
+        """Map the index file, replacing the previous mapping. Call it from the thread that searches."""
+        file = open(self.index_path, "rb")
+        mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        _, _, stations, tokens, _, _ = HEADER.unpack_from(mapped, 0)
+        old_file, old_map = self._file, self._map
+        # Swap everything in one go so a search never sees half of each index
+        self._file, self._map = file, mapped
+        self.station_count, self.token_count = stations, tokens
+        self._names_at = HEADER.size + stations * STATION.size
+        self._tokens_at = self._names_at + stations * NAME.size
+        self._blob_at = self._tokens_at + tokens * TOKEN.size
+        if old_map is not None:
+            old_map.close()
+            old_file.close()
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._file.close()
+            self._file = self._map = None
+
+    def string(self, offset: int, length: int) -> str:
+        start = self._blob_at + offset
+        return self._map[start:start + length].decode("utf-8")
+
+    def station_row(self, i: int):
+        return STATION.unpack_from(self._map, HEADER.size + i * STATION.size)
+
+    def name_station(self, i: int) -> int:
+        return NAME.unpack_from(self._map, self._names_at + i * NAME.size)[0]
+
+    def token(self, i: int):
+        offset, length, station = TOKEN.unpack_from(self._map, self._tokens_at + i * TOKEN.size)
+        return self.string(offset, length), station
+
+    def station(self, i: int) -> dict:
+        id_offset, id_length, name_offset, name_length, _, _ = self.station_row(i)
+        return {"type": "station", "id": self.string(id_offset, id_length), "name": self.string(name_offset, name_length)}
+
+    def normalized_name(self, i: int) -> str:
+        return self.string(*self.station_row(i)[4:6])
+
+    def get(self, station_id: str):
+        if not self:
+            return None
+        ids = _Ids(self)
+        i = bisect.bisect_left(ids, station_id)
+        if i < len(ids) and ids[i] == station_id:
+            return self.station(i)
+        return None
+
+    def _prefix_range(self, prefix: str, table=_Tokens):
+        items = table(self)
+        start = bisect.bisect_left(items, prefix)
+        end = bisect.bisect_left(items, prefix + "\uffff", start)
+        return range(start, end)
+
+    def _fuzzy(self, token: str) -> set:
+        """Stations with a word within a small edit distance of the token (typo tolerance)"""
+        stations = set()
+        if len(token) < 4:
+            return stations
+        limit = 1 if len(token) < 7 else 2
+        previous, close = None, False
+        # Only words sharing the first two letters are compared, typos there are rare and it keeps this cheap
+        for i in self._prefix_range(token[:2]):
+            word, station = self.token(i)
+            if word != previous:
+                previous, close = word, edit_distance(token, word[:len(token) + limit], limit) <= limit
+            if close:
+                stations.add(station)
+                if len(stations) >= SCAN_LIMIT:
+                    break
+        return stations
+
+    def search(self, query: str, limit: int = 25, fuzzy: bool = True) -> list:
+        """Best matching stations for a (partial, misspelled) name, best first"""
+        key = normalize(query)
+        if not self or not key:
+            return []
+
+        # Names starting with the whole query ("munchen" -> "munchen hbf") come straight out of the
+        # sorted name table, which covers most lookups with a single bisect. Shorter names first,
+        # the main station of a town is usually just "<town> Hbf".
+        prefixed = [self.name_station(i) for i in self._prefix_range(key, _Names)[:NAME_SCAN_LIMIT]]
+        found = sorted(prefixed, key=lambda i: len(self.normalized_name(i)))[:limit]
+        if len(found) < limit:
+            found += [i for i in self._search_words(key, fuzzy, limit) if i not in found][:limit - len(found)]
+        return [self.station(i) for i in found]
+
+    def _search_words(self, key: str, fuzzy: bool, limit: int) -> list:
+        # Start from the rarest word and only check the others against its stations' names,
+        # so a common word like "hbf" never has to be expanded into all of its stations
+        ranges = sorted(((len(r), token, r) for token in set(key.split()) for r in [self._prefix_range(token)]))
+        _, token, first = ranges[0]
+        candidates = {self.token(i)[1] for i in first[:SCAN_LIMIT]}
+        if not candidates and fuzzy:
+            candidates = self._fuzzy(token)
+
+        scored = []
+        for i in candidates:
+            name = self.normalized_name(i)
+            words = name.split()
+            if all(any(w.startswith(t) for w in words) or (fuzzy and not r) for _, t, r in ranges[1:]):
+                scored.append((len(name), name, i))
+
+        scored.sort()
+        return [s[2] for s in scored[:limit]]
@@ -0,0 +1,155 @@
+import sys
+from datetime import datetime
+from typing import Optional, Tuple
+
+
+def parse_time(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    return datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+
+def name_of(place: Optional[dict]) -> str:
+    # Station names repeat across every journey of a search, share one string for each
+    return sys.intern((place or {}).get('name') or '?')
+
+
+class Remark:
+    """A hint or status message attached to a journey or leg"""
+    __slots__ = ("summary", "text")
+
+    def __init__(self, summary: Optional[str], text: Optional[str]):
+        self.summary = summary
+        self.text = text
+
+    @classmethod
+    def from_api(cls, data: dict) -> "Remark":
+        return cls(data.get('summary') or None, data.get('text') or None)
+
+
+class Leg:
+    """One ride (or walk) of a journey"""
+    __slots__ = (
+        "trip_id", "line_name", "origin", "destination", "departure", "arrival",
+        "planned_departure", "planned_arrival", "remarks",
+    )
+
+    def __init__(self, trip_id, line_name, origin, destination, departure, arrival,
+                 planned_departure, planned_arrival, remarks):
+        self.trip_id: Optional[str] = trip_id
+        self.line_name: Optional[str] = line_name
+        self.origin: str = origin
+        self.destination: str = destination
+        self.departure: Optional[datetime] = departure  # realtime when known
+        self.arrival: Optional[datetime] = arrival
+        self.planned_departure: Optional[datetime] = planned_departure
+        self.planned_arrival: Optional[datetime] = planned_arrival
+        self.remarks: Tuple[Remark, ...] = remarks
+
+    @classmethod
+    def from_api(cls, data: dict) -> "Leg":
+        line = data.get('line') or {}
+        return cls(
+            data.get('tripId'),
+            sys.intern(line['name']) if line.get('name') else None,
+            name_of(data.get('origin')),
+            name_of(data.get('destination')),
+            parse_time(data.get('departure') or data.get('plannedDeparture')),
+            parse_time(data.get('arrival') or data.get('plannedArrival')),
+            parse_time(data.get('plannedDeparture') or data.get('departure')),
+            parse_time(data.get('plannedArrival') or data.get('arrival')),
+            tuple(Remark.from_api(r) for r in data.get('remarks') or ()),
+        )
+
+
+class Journey:
+    """
+    The parts of a transport.rest journey the bot actually shows. The raw JSON (polylines,
+    stopovers, platforms, operators...) is dropped right after parsing.
+    """
+    __slots__ = ("legs", "remarks", "price", "currency")
+
+    def __init__(self, legs, remarks, price, currency):
+        self.legs: Tuple[Leg, ...] = legs
+        self.remarks: Tuple[Remark, ...] = remarks
+        self.price: Optional[float] = price
+        self.currency: Optional[str] = currency
+
+    @classmethod
+    def from_api(cls, data: dict) -> "Journey":
+        price = data.get('price') or {}
+        return cls(
+            tuple(Leg.from_api(leg) for leg in data.get('legs') or ()),
+            tuple(Remark.from_api(r) for r in data.get('remarks') or ()),
+            price.get('amount'),
+            price.get('currency', 'EUR') if price.get('amount') is not None else None,
+        )
+
+    @property
+    def departure(self) -> datetime:
+        return self.legs[0].departure
+
+    @property
+    def arrival(self) -> datetime:
+        return self.legs[-1].arrival
+
+    @property
+    def key(self) -> tuple:
+        """
+        Identifies the same connection across searches: each leg's trip (or line, for walks)
+        and its timetable, so a delay update between pages doesn't make it look new
+        """
+        return tuple(
+            (leg.trip_id or leg.line_name, leg.origin, leg.planned_departure, leg.planned_arrival)
+            for leg in self.legs
+        )
+
+
+class Departure:
+    """One row of a station's departure board"""
+    __slots__ = ("trip_id", "line_name", "direction", "planned", "delay", "platform", "cancelled")
+
+    def __init__(self, trip_id, line_name, direction, planned, delay, platform, cancelled):
+        self.trip_id: Optional[str] = trip_id
+        self.line_name: str = line_name
+        self.direction: str = direction
+        self.planned: datetime = planned
+        self.delay: Optional[int] = delay  # seconds, None when there is no live data
+        self.platform: Optional[str] = platform
+        self.cancelled: bool = cancelled
+
+    @classmethod
+    def from_api(cls, data: dict) -> "Departure":
+        line = data.get('line') or {}
+        return cls(
+            data.get('tripId'),
+            sys.intern(line.get('name') or '?'),
+            sys.intern(data.get('direction') or '?'),
+            parse_time(data.get('plannedWhen') or data.get('when')),
+            data.get('delay'),
+            data.get('platform') or data.get('plannedPlatform'),
+            bool(data.get('cancelled')),
+        )
+
+    @property
+    def state(self) -> tuple:
+        """Everything that changes what the board shows"""
+        return (self.trip_id, self.planned, self.delay, self.platform, self.cancelled)
+
+
+def deep_sizeof(obj, seen: set = None) -> int:
+    """Approximate memory held by obj and everything it references (shared objects counted once)"""
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, (str, bytes, int, float, bool, datetime)) or obj is None:
+        return size
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(k, seen) + deep_sizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_sizeof(item, seen) for item in obj)
+    for slot in getattr(type(obj), '__slots__', ()):
+        size += deep_sizeof(getattr(obj, slot, None), seen)
+    return size
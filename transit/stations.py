@@ -0,0 +1,118 @@
+import bisect
+import re
+import unicodedata
+
+_UMLAUTS = str.maketrans({"ä": "a", "ö": "o", "ü": "u", "ß": "ss"})
+_NON_WORD = re.compile(r"[^\w]+")
+
+
+def normalize(text: str) -> str:
+    """Case, accent and punctuation insensitive form of a station name ("München Hbf." -> "munchen hbf")"""
+    text = text.casefold().translate(_UMLAUTS)
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return " ".join(_NON_WORD.sub(" ", text).split())
+
+
+def trigrams(text: str) -> set:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class StationIndex:
+    """
+    In-memory search index over every station the API has ever returned.
+    Supports prefix matching on any word of a name ("berl hb" -> "Berlin Hbf")
+    and falls back to trigram similarity for typos.
+    """
+
+    def __init__(self, maxsize: int = 50_000):
+        self.maxsize = maxsize
+        self.stations = {}
+        self._names = {}       # id -> normalized name
+        self._tokens = []      # sorted (token, id) pairs for prefix search
+        self._trigrams = {}    # trigram -> set of ids
+
+    def __len__(self):
+        return len(self.stations)
+
+    def __contains__(self, station_id):
+        return station_id in self.stations
+
+    def add(self, station: dict):
+        """Index a station/stop dict from the /locations endpoint (only id, name and type are kept)"""
+        station_id = station.get("id")
+        name = station.get("name")
+        if not station_id or not name or station.get("type") not in ("station", "stop"):
+            return
+        if station_id in self.stations:
+            return
+        if len(self.stations) >= self.maxsize:
+            return
+
+        key = normalize(name)
+        self.stations[station_id] = {"type": station["type"], "id": station_id, "name": name}
+        self._names[station_id] = key
+        for token in set(key.split()):
+            bisect.insort(self._tokens, (token, station_id))
+        for gram in trigrams(key):
+            self._trigrams.setdefault(gram, set()).add(station_id)
+
+    def get(self, station_id):
+        return self.stations.get(station_id)
+
+    def _prefix_ids(self, prefix: str) -> set:
+        ids = set()
+        i = bisect.bisect_left(self._tokens, (prefix, ""))
+        while i < len(self._tokens) and self._tokens[i][0].startswith(prefix):
+            ids.add(self._tokens[i][1])
+            i += 1
+        return ids
+
+    def exact(self, query: str):
+        """The station whose normalized name equals the query, if any"""
+        key = normalize(query)
+        if not key:
+            return None
+        for station_id in self._prefix_ids(key.split()[0]):
+            if self._names[station_id] == key:
+                return self.stations[station_id]
+        return None
+
+    def search(self, query: str, limit: int = 25, min_similarity: float = 0.35) -> list:
+        """Best matching stations for a (partial) name, best first"""
+        key = normalize(query)
+        if not key:
+            return []
+        tokens = key.split()
+
+        # Every query word has to be the start of some word in the name
+        candidates = None
+        for token in sorted(tokens, key=len, reverse=True):
+            ids = self._prefix_ids(token)
+            candidates = ids if candidates is None else candidates & ids
+            if not candidates:
+                break
+
+        scored = []
+        for station_id in candidates or ():
+            name = self._names[station_id]
+            rank = 0 if name == key else 1 if name.startswith(key) else 2
+            scored.append((rank, len(name), name, station_id))
+
+        if len(scored) < limit:
+            seen = {s[3] for s in scored}
+            query_grams = trigrams(key)
+            shared = {}
+            for gram in query_grams:
+                for station_id in self._trigrams.get(gram, ()):
+                    if station_id not in seen:
+                        shared[station_id] = shared.get(station_id, 0) + 1
+            for station_id, count in shared.items():
+                name = self._names[station_id]
+                similarity = count / (len(query_grams) + len(trigrams(name)) - count)
+                if similarity >= min_similarity:
+                    scored.append((3, -similarity, name, station_id))
+
+        scored.sort()
+        return [self.stations[s[3]] for s in scored[:limit]]